@@ -0,0 +1,168 @@
+"""
+Service: backup_table
+Module: statement_semaphore
+Author: Sourav Hazra
+"""
+import os
+import random
+import time
+import uuid
+from functools import lru_cache
+
+import boto3
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+
+from helpers.retry_policy import StatementError
+
+
+@lru_cache(maxsize=None)
+def get_dynamodb_resource():
+    """
+    Create the DynamoDB resource once per Lambda container, RedshiftHelper being created for every query
+    :return: DynamoDB resource
+    """
+    return boto3.resource("dynamodb")
+
+
+class StatementSemaphore:
+    """
+    Counting semaphore in DynamoDB limiting the statements running through the Data API across all Lambdas.
+    The semaphore has `limit` slots stored as items of the table, a statement holds a slot while it runs and
+    slots of crashed Lambdas free themselves when their lease expires. Without a table name the semaphore
+    lets every statement through
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for StatementSemaphore
+        :param kwargs: Dict
+        """
+        self.__logger = kwargs.get("logger")
+        self.__table_name = kwargs.get("table_name") or os.getenv("STATEMENT_SEMAPHORE_TABLE_NAME")
+        self.__name = kwargs.get("name") or os.getenv("STATEMENT_SEMAPHORE_NAME") or "redshift-data-api"
+        self.__dynamodb = kwargs.get("dynamodb") or (get_dynamodb_resource() if self.__table_name else None)
+        self.limit = int(kwargs.get("limit") or os.getenv("STATEMENT_CONCURRENCY_LIMIT") or 10)
+        self.ttl_seconds = int(kwargs.get("ttl_seconds") or os.getenv("STATEMENT_SEMAPHORE_TTL_SECONDS") or 300)
+        self.wait_seconds = float(kwargs.get("wait_seconds") or os.getenv("STATEMENT_SEMAPHORE_WAIT_SECONDS") or 300)
+
+    def __get_free_slots(self, now):
+        """
+        Get the slots of the semaphore which are not held or whose lease expired
+        :param now: int
+        :return: List
+        """
+        response = self.__dynamodb.Table(self.__table_name).query(
+            KeyConditionExpression=Key("semaphoreName").eq(self.__name),
+            ConsistentRead=True
+        )
+        held_slots = {int(item.get("slotId")) for item in response.get("Items") if item.get("expiresAt") >= now}
+        free_slots = [slot for slot in range(self.limit) if slot not in held_slots]
+        random.shuffle(free_slots)
+        return free_slots
+
+    def __take_slot(self, slot, owner, now):
+        """
+        Take a slot if it is still free or expired
+        :param slot: int, owner: String, now: int
+        :return: bool
+        """
+        try:
+            self.__dynamodb.Table(self.__table_name).put_item(
+                Item={
+                    "semaphoreName": self.__name,
+                    "slotId": slot,
+                    "ownerId": owner,
+                    "expiresAt": now + self.ttl_seconds
+                },
+                ConditionExpression="attribute_not_exists(slotId) OR expiresAt < :now",
+                ExpressionAttributeValues={
+                    ":now": now
+                }
+            )
+        except ClientError as exception:
+            if exception.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def acquire(self):
+        """
+        Acquire a slot, waiting with backoff while all slots are held until wait_seconds pass. The semaphore
+        lets the statement through when DynamoDB cannot be reached, so the limiter never stops the loads
+        :return: [Dict, None]
+        :raises StatementError: when no slot frees up in time
+        """
+        if not self.__table_name:
+            return None
+
+        owner = str(uuid.uuid4())
+        deadline = time.time() + self.wait_seconds
+        delay = 0.5
+        while True:
+            now = int(time.time())
+            try:
+                for slot in self.__get_free_slots(now):
+                    if self.__take_slot(slot, owner, now):
+                        return {"slot": slot, "ownerId": owner, "renewedAt": now}
+            except Exception as exception:
+                self.__logger.warning(f"Running statement without a semaphore slot: {exception}")
+                return None
+
+            if time.time() + delay > deadline:
+                raise StatementError(f"No statement slot of {self.__name} freed up in {self.wait_seconds}s",
+                                     transient=False)
+
+            self.__logger.info(f"All {self.limit} statement slots of {self.__name} are held, waiting {delay}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 5)
+
+    def renew(self, slot):
+        """
+        Extend the lease of a held slot once a third of ttl_seconds passed since it was last renewed
+        :param slot: Dict
+        :return: None
+        """
+        now = int(time.time())
+        if not slot or now - slot.get("renewedAt") < self.ttl_seconds / 3:
+            return
+
+        try:
+            self.__dynamodb.Table(self.__table_name).update_item(
+                Key={
+                    "semaphoreName": self.__name,
+                    "slotId": slot.get("slot")
+                },
+                UpdateExpression="set expiresAt=:expiresAt",
+                ConditionExpression="ownerId = :owner",
+                ExpressionAttributeValues={
+                    ":expiresAt": now + self.ttl_seconds,
+                    ":owner": slot.get("ownerId")
+                }
+            )
+            slot["renewedAt"] = now
+        except Exception as exception:
+            self.__logger.warning(f"Error in renewing statement slot {slot.get('slot')}: {exception}")
+
+    def release(self, slot):
+        """
+        Release a held slot
+        :param slot: Dict
+        :return: None
+        """
+        if not slot:
+            return
+
+        try:
+            self.__dynamodb.Table(self.__table_name).delete_item(
+                Key={
+                    "semaphoreName": self.__name,
+                    "slotId": slot.get("slot")
+                },
+                ConditionExpression="ownerId = :owner",
+                ExpressionAttributeValues={
+                    ":owner": slot.get("ownerId")
+                }
+            )
+        except Exception as exception:
+            self.__logger.warning(f"Error in releasing statement slot {slot.get('slot')}: {exception}")
@@ -0,0 +1,122 @@
+"""
+Service: backup_table
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.backup_service import BackupService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+s3 = session.resource('s3')
+logger = Logger(service="BackupTable")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to back up a table to S3 when the monthlyBackUp flag is set by etl_invoker
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the Lambda event
+        database_name = event.get("input").get("databaseName")
+        table_name = event.get("input").get("tableName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName")
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name=table_name)
+
+        if not event.get("input").get("monthlyBackUp"):
+            logger.info("Backup not scheduled for this run")
+            return {
+                'statusCode': 200,
+                'message': "SKIPPED"
+            }
+
+        # Initialize BackupService
+        backup = BackupService(
+            redshift=client_redshift,
+            s3={
+                "resource": s3,
+                "bucket_name": os.getenv("S3_BUCKET_NAME"),
+                "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json",
+                "backup_bucket_name": os.getenv("BACKUP_BUCKET_NAME"),
+                "s3_backup_prefix": f"{os.getenv('BACKUP_PATH')}/{database_name}/{table_name}/",
+                "s3_backup_manifest_key": f"{os.getenv('BACKUP_MANIFEST_PATH')}/{database_name}/{table_name}.json"
+            },
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            backup_params={
+                "iam_role": os.getenv("BACKUP_IAM_ROLE")
+            },
+            logger=logger
+        )
+
+        logger.info("Backing up table")
+        response = backup.backup_table(
+            schema=database_name,
+            table=table_name
+        )
+
+        if response == -1:
+            logger.error("Error in fetching schema")
+            return {
+                'statusCode': 404,
+                'message': json.dumps('Error in fetching schema')
+            }
+        if response == -2:
+            logger.error("Error in getting changed rows")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in getting changed rows')
+            }
+        if response == -3:
+            logger.error("Error in getting table size")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in getting table size')
+            }
+        if response == -4:
+            logger.error("Error in unloading table")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in unloading table')
+            }
+        if response == -5:
+            logger.error("Error in writing backup manifest")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in writing backup manifest')
+            }
+        if response == -6:
+            logger.error("Error in checking watermark column")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in checking watermark column')
+            }
+
+        logger.info("Table backed up successfully")
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'backup': response
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
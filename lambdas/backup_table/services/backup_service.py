@@ -0,0 +1,329 @@
+"""
+Service: backup_table
+Module: backup_service
+Author: Sourav Hazra
+"""
+import json
+import math
+from datetime import datetime
+
+from helpers.redshift_helper import RedshiftHelper
+from helpers.s3_helper import S3Helper
+
+# Range of MAXFILESIZE accepted by UNLOAD
+MIN_FILE_SIZE_MB = 5
+MAX_FILE_SIZE_MB = 6200
+
+
+class BackupService:
+    """
+    Service class to back up a table to S3 as Parquet, unloading only the rows changed since the last backup
+    and a full image once a quarter
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for BackupService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__s3 = dependencies.get("s3").get("resource")
+        self.__s3_bucket_name = dependencies.get("s3").get("bucket_name")
+        self.__s3_schema_key = dependencies.get("s3").get("s3_schema_key")
+        self.__s3_backup_bucket_name = dependencies.get("s3").get("backup_bucket_name")
+        self.__s3_backup_prefix = dependencies.get("s3").get("s3_backup_prefix")
+        self.__s3_backup_manifest_key = dependencies.get("s3").get("s3_backup_manifest_key")
+        self.__redshift = redshift
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.__iam_role = dependencies.get("backup_params", {}).get("iam_role")
+
+    def get_table_schema(self):
+        """
+        Fetch the table schema stored in S3
+        :return: [Dict, int]
+        """
+        self.__logger.info(f"Getting schema from S3 using key: {self.__s3_schema_key}")
+
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in getting schema from S3 using key: {self.__s3_schema_key}")
+            return -1
+
+        return json.loads(schema)
+
+    def get_backup_manifest(self):
+        """
+        Fetch the backup manifest of the table listing its last full image and the increments taken since.
+        Tables without a manifest have not been backed up yet
+        :return: Dict
+        """
+        manifest = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_backup_bucket_name,
+            key=self.__s3_backup_manifest_key
+        )
+
+        if not manifest:
+            self.__logger.warning(f"No backup manifest found at {self.__s3_backup_manifest_key}")
+            return {}
+
+        return json.loads(manifest)
+
+    @staticmethod
+    def is_full_backup_due(manifest, watermark_column, backup_time):
+        """
+        Check if a full image of the table is due: the table has no full image yet, it was taken in an
+        earlier quarter, or the table has no watermark column to select the changed rows by
+        :param manifest: Dict, watermark_column: str, backup_time: datetime
+        :return: bool
+        """
+        full_image = manifest.get("fullImage")
+
+        if not full_image or not watermark_column or manifest.get("watermarkColumn") != watermark_column:
+            return True
+
+        full_image_time = datetime.fromisoformat(full_image.get("backedUpAt"))
+
+        return (full_image_time.year, (full_image_time.month - 1) // 3) != \
+            (backup_time.year, (backup_time.month - 1) // 3)
+
+    def __run_query(self, redshift, sql_query):
+        """
+        Run a SQL query in Redshift and fetch its records
+        :param redshift: RedshiftHelper, sql_query: String
+        :return: [List, None]
+        """
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return None
+
+        return redshift.get_query_results(query_id=query_id)
+
+    @staticmethod
+    def frame_changed_rows_predicate(watermark_column, from_watermark, to_watermark=None):
+        """
+        Frame the predicate selecting the rows changed after from_watermark and up to to_watermark
+        :param watermark_column: str, from_watermark: str, to_watermark: str
+        :return: str
+        """
+        conditions = []
+        if from_watermark:
+            value = from_watermark.replace("'", "''")
+            conditions.append(f"\"{watermark_column}\" > '{value}'")
+        if to_watermark:
+            value = to_watermark.replace("'", "''")
+            conditions.append(f"\"{watermark_column}\" <= '{value}'")
+
+        return " AND ".join(conditions)
+
+    def get_changed_rows(self, schema_name, table_name, watermark_column, from_watermark):
+        """
+        Count the rows changed since the watermark of the last backup and get the new watermark
+        :param schema_name: str, table_name: str, watermark_column: str, from_watermark: str
+        :return: [Dict, None]
+        """
+        predicate = self.frame_changed_rows_predicate(watermark_column, from_watermark)
+        where = f" WHERE {predicate}" if predicate else ""
+        max_watermark = f'CAST(MAX("{watermark_column}") AS VARCHAR)' if watermark_column else "NULL"
+
+        records = self.__run_query(
+            RedshiftHelper(redshift=self.__redshift, logger=self.__logger),
+            f"SELECT COUNT(*), {max_watermark} FROM {schema_name}.{table_name}{where};"
+        )
+
+        if not records:
+            return None
+
+        return {
+            "rows": records[0][0].get("longValue"),
+            "watermark": records[0][1].get("stringValue")
+        }
+
+    def is_watermark_nullable(self, schema_name, table_name, watermark_column):
+        """
+        Check if the watermark column of the table accepts NULL, as rows without a watermark are never selected
+        by the changed rows predicate of an increment
+        :param schema_name: str, table_name: str, watermark_column: str
+        :return: [bool, None]
+        """
+        records = self.__run_query(
+            RedshiftHelper(redshift=self.__redshift, logger=self.__logger),
+            f"SELECT is_nullable FROM svv_columns WHERE table_schema = '{schema_name}' "
+            f"AND table_name = '{table_name}' AND column_name = '{watermark_column}';"
+        )
+
+        if records is None:
+            return None
+
+        return not records or records[0][0].get("stringValue") != "NO"
+
+    def get_max_file_size(self, schema_name, table_name, rows):
+        """
+        Size the Parquet files of the backup so that every slice of the cluster writes one file, estimating
+        the size of the rows backed up from the average row size of the table
+        :param schema_name: str, table_name: str, rows: int
+        :return: [int, None]
+        """
+        records = self.__run_query(
+            RedshiftHelper(redshift=self.__redshift, logger=self.__logger),
+            f"SELECT (SELECT COUNT(*) FROM stv_slices), size, tbl_rows FROM svv_table_info "
+            f"WHERE \"schema\" = '{schema_name}' AND \"table\" = '{table_name}';"
+        )
+
+        if records is None:
+            return None
+
+        if not records or not records[0][2].get("longValue"):
+            return MIN_FILE_SIZE_MB
+
+        slice_count = records[0][0].get("longValue")
+        backup_size_mb = records[0][1].get("longValue") * rows / records[0][2].get("longValue")
+
+        return max(MIN_FILE_SIZE_MB, min(MAX_FILE_SIZE_MB, math.ceil(backup_size_mb / slice_count)))
+
+    def frame_unload_query(self, schema_name, table_name, predicate, path, partition_column, max_file_size):
+        """
+        Frame the UNLOAD query writing the rows selected by the predicate to S3 as Parquet
+        :param schema_name: str, table_name: str, predicate: str, path: str, partition_column: str,
+        max_file_size: int
+        :return: str
+        """
+        where = f" WHERE {predicate}" if predicate else ""
+        select_query = f"SELECT * FROM {schema_name}.{table_name}{where}".replace("'", "''")
+        # Partition columns are kept in the files as well so that restore_table can COPY them back
+        partition_by = f' PARTITION BY ("{partition_column}") INCLUDE' if partition_column else ""
+
+        return f"UNLOAD ('{select_query}') TO '{path}' IAM_ROLE '{self.__iam_role}' " \
+               f"FORMAT AS PARQUET{partition_by} MAXFILESIZE {max_file_size} MB MANIFEST;"
+
+    def backup_table(self, **backup_args):
+        """
+        Back up the table to S3 as Parquet. A full image of all the rows is unloaded once a quarter, otherwise
+        only the rows changed since the watermark of the last backup, set by the timestampCheckpointColumn of
+        the schema. Tables whose watermark column accepts NULL are always backed up as full images, so rows
+        without a watermark are never left out. Every backup is recorded in the backup manifest of the table
+        so that the table can be restored from its full image and the increments taken since
+        :param backup_args: Dict
+        :return: [Dict, -1, -2, -3, -4, -5, -6]
+        """
+        schema_name = backup_args.get("schema")
+        table_name = backup_args.get("table")
+
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        table_configurations = schema.get("tableConfigurations") or {}
+        watermark_column = table_configurations.get("timestampCheckpointColumn")
+        backup_time = datetime.utcnow()
+
+        manifest = self.get_backup_manifest()
+        full_backup = self.is_full_backup_due(manifest, watermark_column, backup_time)
+
+        if not full_backup:
+            nullable_watermark = self.is_watermark_nullable(schema_name, table_name, watermark_column)
+
+            if nullable_watermark is None:
+                self.__logger.error(f"Error in checking watermark column {watermark_column}")
+                return -6
+
+            if nullable_watermark:
+                self.__logger.warning(f"Taking a full image since {watermark_column} accepts NULL")
+                full_backup = True
+
+        from_watermark = None if full_backup else manifest.get("watermark")
+
+        changed_rows = self.get_changed_rows(schema_name, table_name, watermark_column, from_watermark)
+
+        if not changed_rows:
+            self.__logger.error(f"Error in getting rows changed since {from_watermark}")
+            return -2
+
+        if not full_backup and not changed_rows.get("rows"):
+            self.__logger.info(f"No rows changed since {from_watermark}")
+            return {
+                "backupType": "none",
+                "rows": 0,
+                "watermark": from_watermark
+            }
+
+        max_file_size = self.get_max_file_size(schema_name, table_name, changed_rows.get("rows"))
+
+        if not max_file_size:
+            self.__logger.error(f"Error in getting size of {table_name}")
+            return -3
+
+        backup_type = "full" if full_backup else "incremental"
+        backup_id = f"{backup_type}-{backup_time.strftime('%Y%m%dT%H%M%S')}"
+        path = f"s3://{self.__s3_backup_bucket_name}/{self.__s3_backup_prefix}{backup_id}/"
+        predicate = self.frame_changed_rows_predicate(
+            watermark_column, from_watermark, changed_rows.get("watermark")
+        ) if not full_backup else ""
+
+        sql_query = self.frame_unload_query(
+            schema_name, table_name, predicate, path, table_configurations.get("backupPartitionColumn"),
+            max_file_size
+        )
+
+        self.__logger.info(f"Backing up {table_name} using: {sql_query}")
+
+        query_id = RedshiftHelper(redshift=self.__redshift, logger=self.__logger).run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in unloading {table_name}")
+            return -4
+
+        backup = {
+            "backupId": backup_id,
+            "path": path,
+            "fromWatermark": from_watermark,
+            "watermark": changed_rows.get("watermark"),
+            "rows": changed_rows.get("rows"),
+            "backedUpAt": backup_time.isoformat()
+        }
+
+        if full_backup:
+            manifest = {
+                "watermarkColumn": watermark_column,
+                "fullImage": backup,
+                "increments": []
+            }
+        else:
+            manifest.get("increments").append(backup)
+        manifest["watermark"] = changed_rows.get("watermark")
+
+        response = S3Helper(logger=self.__logger).put_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_backup_bucket_name,
+            key=self.__s3_backup_manifest_key,
+            body=json.dumps(manifest)
+        )
+
+        if not response:
+            self.__logger.error(f"Error in writing backup manifest to {self.__s3_backup_manifest_key}")
+            return -5
+
+        return {
+            "backupType": backup_type,
+            **backup
+        }
@@ -0,0 +1,139 @@
+"""
+Service: check_columns
+Module: retry_policy
+Author: Sourav Hazra
+"""
+import os
+import random
+import time
+
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, ReadTimeoutError
+
+# Data API error codes of requests which can succeed when sent again
+TRANSIENT_ERROR_CODES = (
+    "ThrottlingException",
+    "ActiveStatementsExceededException",
+    "ActiveSessionsExceededException",
+    "InternalServerException",
+    "DatabaseConnectionException"
+)
+
+# Data API error codes of statements which were refused before being accepted, so they can be submitted again
+REJECTED_ERROR_CODES = (
+    "ThrottlingException",
+    "ActiveStatementsExceededException",
+    "ActiveSessionsExceededException"
+)
+
+# Error text of statements which failed because of concurrent work on the cluster
+TRANSIENT_ERROR_MESSAGES = (
+    "error: 1023",
+    "serializable isolation violation",
+    "deadlock detected",
+    "conflict with concurrent transaction",
+    "connection limit",
+    "too many active statements"
+)
+
+
+class RetryPolicy:
+    """
+    Retry policy for Redshift Data API calls and statements. Transient failures such as throttling, too many
+    active statements or serializable isolation violations are retried with exponential backoff and full
+    jitter within an attempt and wait budget, every other failure such as a syntax or permission error fails
+    fast
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for RetryPolicy
+        :param kwargs: Dict
+        """
+        self.__logger = kwargs.get("logger")
+        self.max_attempts = int(kwargs.get("max_attempts") or os.getenv("REDSHIFT_RETRY_ATTEMPTS") or 3)
+        self.budget_seconds = float(kwargs.get("budget_seconds") or os.getenv("REDSHIFT_RETRY_BUDGET_SECONDS") or 30)
+        self.base_delay_seconds = float(kwargs.get("base_delay_seconds") or 1)
+        self.max_delay_seconds = float(kwargs.get("max_delay_seconds") or 10)
+
+    @staticmethod
+    def is_transient_message(message):
+        """
+        Check if the error text of a statement or a Data API error is one of a transient failure
+        :param message: String
+        :return: bool
+        """
+        message = (message or "").lower()
+        return any(pattern in message for pattern in TRANSIENT_ERROR_MESSAGES)
+
+    @staticmethod
+    def is_rejected(exception):
+        """
+        Check if submitting a statement failed because the Data API refused it. A timed out or otherwise
+        failed submit may have been accepted and the statement may be running, so it is not submitted again
+        :param exception: Exception
+        :return: bool
+        """
+        return isinstance(exception, ClientError) and \
+            exception.response.get("Error", {}).get("Code") in REJECTED_ERROR_CODES
+
+    def is_transient(self, exception):
+        """
+        Classify a failure from its botocore exception or the error text of the failed statement
+        :param exception: Exception
+        :return: bool
+        """
+        if isinstance(exception, StatementError):
+            return exception.transient
+        if isinstance(exception, ClientError):
+            error = exception.response.get("Error", {})
+            return error.get("Code") in TRANSIENT_ERROR_CODES or self.is_transient_message(error.get("Message"))
+        return isinstance(exception, (BotoConnectionError, ReadTimeoutError))
+
+    def get_delay(self, attempt):
+        """
+        Get the backoff before the next attempt, drawn between 0 and an exponentially growing cap
+        :param attempt: int
+        :return: float
+        """
+        return random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1)))
+
+    def call(self, function, *args, **kwargs):
+        """
+        Call a function, calling it again after a backoff while it fails with a transient failure, there are
+        attempts left and the time spent waiting stays within budget_seconds
+        :param function: Callable
+        :return: Result of the function
+        """
+        attempt = 1
+        waited = 0
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as exception:
+                if attempt >= self.max_attempts or not self.is_transient(exception):
+                    raise
+
+                delay = self.get_delay(attempt)
+                if waited + delay > self.budget_seconds:
+                    raise
+
+                if self.__logger:
+                    self.__logger.warning(f"Transient failure on attempt {attempt} of {self.max_attempts}, "
+                                          f"retrying in {delay:.1f}s: {exception}")
+                time.sleep(delay)
+                waited += delay
+                attempt += 1
+
+
+class StatementError(Exception):
+    """
+    Failure of a statement run through the Data API, carrying the error text of describe_statement
+    """
+
+    def __init__(self, message, transient=None):
+        """
+        Constructor method for StatementError
+        :param message: String, transient: bool
+        """
+        super().__init__(message)
+        self.transient = RetryPolicy.is_transient_message(message) if transient is None else transient
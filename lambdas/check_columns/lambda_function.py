@@ -5,11 +5,13 @@ Author: Sourav Hazra
 """
 import json
 import os
+import uuid
 
 from aws_lambda_powertools import Logger
 from botocore.client import Config
 import boto3
 
+from helpers.lease_helper import LeaseHelper
 from services.redshift_service import RedshiftService
 
 # Initialize AWS service connections
@@ -17,9 +19,38 @@ session = boto3.session.Session()
 config = Config(connect_timeout=5, read_timeout=5)
 client_redshift = session.client("redshift-data", config=config)
 s3 = session.resource('s3')
+dynamodb = session.resource('dynamodb')
 logger = Logger(service="CheckColumns")
 
 
+def get_table_lease(context):
+    """
+    Initialize the LeaseHelper serializing the loads of a table, when LEASE_TABLE_NAME is set. The lease is
+    owned by the invocation, so a retry of a step never shares it with the attempt it replaces. Waiters give
+    up after LEASE_WAIT_SECONDS or a minute before the invocation times out
+    :param context: Lambda context
+    :return: [LeaseHelper, None]
+    """
+    if not os.getenv("LEASE_TABLE_NAME"):
+        return None
+
+    wait_seconds = int(os.getenv("LEASE_WAIT_SECONDS", "600"))
+    if context:
+        wait_seconds = min(wait_seconds, context.get_remaining_time_in_millis() // 1000 - 60)
+
+    owner = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+
+    return LeaseHelper(
+        dynamodb=dynamodb,
+        table_name=os.getenv("LEASE_TABLE_NAME"),
+        owner=owner,
+        ttl_seconds=int(os.getenv("LEASE_TTL_SECONDS", "300")),
+        poll_seconds=int(os.getenv("LEASE_POLL_SECONDS", "5")),
+        wait_seconds=wait_seconds,
+        logger=logger
+    )
+
+
 def lambda_handler(event, context):
     """
     Lambda event handler to get table schema from S3 and make main table and staging table
@@ -32,88 +63,180 @@ def lambda_handler(event, context):
         # Get the input from the Lambda event
         database_name = event.get("input").get("databaseName")
         table_name = event.get("input").get("tableName")
-        staging_table_name = event.get("input").get("stagingTableName")
-        redshift_database_name = event.get("input").get("redshiftDatabaseName")
 
         logger.append_keys(database_name=database_name)
         logger.append_keys(table_name=table_name)
 
-        # Initialize RedshiftService
-        redshift = RedshiftService(
-            redshift=client_redshift,
-            s3={
-                "resource": s3,
-                "bucket_name": os.getenv("S3_BUCKET_NAME"),
-                "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json"
-            },
-            redshift_params={
-                "database_name": redshift_database_name,
-                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
-                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
-            },
-            logger=logger
-
-        )
-
-        # Get the table schema from config file
-        logger.info("Getting table schema from config file")
-        schema = redshift.get_table_schema_from_definition()
-
-        if schema == -1:
-            return {
-                'statusCode': 500,
-                'message': json.dumps('Error in fetching schema for table')
-            }
-
-        # Make the main table consistent with schema
-        logger.info("Making main table consistent with schema")
-        response = redshift.make_table_consistent_with_definition(
-            database_name=redshift_database_name,
-            schema_name=database_name,
-            table_name=table_name,
-            schema=schema
-        )
+        lease = get_table_lease(context)
+        response = lease.acquire(database_name, table_name, event.get("input").get("leaseToken")) if lease else True
 
-        if response == -1:
+        if response is None:
+            logger.error("Error in acquiring table lease")
             return {
                 'statusCode': 500,
-                'message': json.dumps('Error in getting schema from Redshift')
+                'message': json.dumps('Error in acquiring table lease')
             }
-        if response == -2:
+        if not response:
+            logger.error("Table is being loaded by another execution")
             return {
-                'statusCode': 500,
-                'message': json.dumps('Error in adding/deleting columns')
+                'statusCode': 409,
+                'message': json.dumps('Table is being loaded by another execution')
             }
 
-        # Make the staging table consistent with schema
-        logger.info("Making staging table consistent with schema")
-        response = redshift.make_table_consistent_with_definition(
-            database_name=redshift_database_name,
-            schema_name=database_name,
-            table_name=staging_table_name,
-            schema=schema
-        )
+        try:
+            response = check_columns(event)
+        except Exception:
+            if lease:
+                lease.release(database_name, table_name)
+            raise
 
-        if response == -1:
-            return {
-                'statusCode': 500,
-                'message': json.dumps('Error in getting schema from Redshift')
-            }
-        if response == -2:
-            return {
-                'statusCode': 500,
-                'message': json.dumps('Error in adding/deleting columns')
-            }
+        # Within an execution the next step takes the lease over with the leaseToken of the output, the load or
+        # a failed step releases it
+        if lease and event.get("input").get("executionId") and response.get("statusCode") == 200:
+            lease.detach(database_name, table_name)
+            return {**response, "leaseToken": lease.owner}
+        if lease:
+            lease.release(database_name, table_name)
+        return response
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+
+
+def check_columns(event):
+    """
+    Make the main table and staging table consistent with the table schema
+    :param event: Dict
+    :return: Dict
+    """
+    database_name = event.get("input").get("databaseName")
+    table_name = event.get("input").get("tableName")
+    staging_table_name = event.get("input").get("stagingTableName")
+    redshift_database_name = event.get("input").get("redshiftDatabaseName")
+
+    # Initialize RedshiftService
+    redshift = RedshiftService(
+        redshift=client_redshift,
+        s3={
+            "resource": s3,
+            "bucket_name": os.getenv("S3_BUCKET_NAME"),
+            "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json"
+        },
+        redshift_params={
+            "database_name": redshift_database_name,
+            "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+            "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS"),
+            "varchar_headroom_pct": int(os.getenv("VARCHAR_HEADROOM_PCT", "25"))
+        },
+        logger=logger
+
+    )
 
+    # Get the table schema from config file
+    logger.info("Getting table schema from config file")
+    schema = redshift.get_table_schema_from_definition()
+
+    if schema == -1:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in fetching schema for table')
+        }
+
+    # Make the main table consistent with schema, including the row hash column kept only in the main table
+    logger.info("Making main table consistent with schema")
+    response = redshift.make_table_consistent_with_definition(
+        database_name=redshift_database_name,
+        schema_name=database_name,
+        table_name=table_name,
+        schema=schema,
+        row_hash=True
+    )
+
+    if response == -1:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting schema from Redshift')
+        }
+    if response == -2:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in adding/deleting columns')
+        }
+
+    # Tables staged through a temporary table in incremental_load have no staging table to reconcile
+    staging_mode = (((schema or {}).get("tableConfigurations") or {}).get("stagingMode") or "").lower()
+    if staging_mode in ("temp", "spectrum"):
+        logger.info(f"Skipping staging table for {staging_mode} staging mode")
         return {
             'statusCode': 200,
             'message': "SUCCESS"
         }
-    except Exception as exception:
-        logger.exception(f"Exception encountered in lambda function: {exception}")
+
+    # Make the staging table consistent with schema
+    logger.info("Making staging table consistent with schema")
+    response = redshift.make_table_consistent_with_definition(
+        database_name=redshift_database_name,
+        schema_name=database_name,
+        table_name=staging_table_name,
+        schema=schema
+    )
+
+    if response == -1:
         return {
-            "statusCode": 500,
-            "message": "Exception encountered in lambda function"
+            'statusCode': 500,
+            'message': json.dumps('Error in getting schema from Redshift')
         }
-    
-    
\ No newline at end of file
+    if response == -2:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in adding/deleting columns')
+        }
+
+    # Keep the right-sized varchar columns of the staging table at the largest width so no data is cut off
+    logger.info("Widening varchar columns of staging table")
+    response = redshift.widen_staging_varchar_columns(
+        database_name=redshift_database_name,
+        schema_name=database_name,
+        staging_table_name=staging_table_name,
+        schema=schema
+    )
+
+    if response == -1:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in measuring varchar columns')
+        }
+    if response == -2:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in widening varchar columns')
+        }
+
+    # Widen the right-sized varchar columns of the main table which are too narrow for the staged data
+    logger.info("Widening varchar columns of main table")
+    response = redshift.widen_varchar_columns(
+        database_name=redshift_database_name,
+        schema_name=database_name,
+        table_name=table_name,
+        staging_table_name=staging_table_name,
+        schema=schema
+    )
+
+    if response == -1:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in measuring varchar columns')
+        }
+    if response == -2:
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in widening varchar columns')
+        }
+
+    return {
+        'statusCode': 200,
+        'message': "SUCCESS"
+    }
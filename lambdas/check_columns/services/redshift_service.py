@@ -4,11 +4,18 @@ Module: redshift_service
 Author: Sourav Hazra
 """
 import json
+import math
+import re
 from copy import deepcopy
 
 from helpers.redshift_helper import RedshiftHelper
 from helpers.s3_helper import S3Helper
 
+# Largest length of a varchar column in Redshift
+VARCHAR_MAX_LENGTH = 65535
+# Data type of the row hash column, an MD5 hex digest
+ROW_HASH_DATA_TYPE = "char(32)"
+
 
 class RedshiftService:
     """
@@ -24,6 +31,9 @@ class RedshiftService:
         self.__database_name = dependencies.get("redshift_params").get("database_name")
         self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
         self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.varchar_headroom_pct = dependencies.get("redshift_params").get("varchar_headroom_pct")
+        if self.varchar_headroom_pct is None:
+            self.varchar_headroom_pct = 25
 
     def get_table_schema_from_definition(self):
         """
@@ -118,10 +128,11 @@ class RedshiftService:
             return None
         return True
 
-    def make_table_consistent_with_definition(self, database_name, schema_name, table_name, schema):
+    def make_table_consistent_with_definition(self, database_name, schema_name, table_name, schema, row_hash=False):
         """
-        Make an existing table in Redshift consistent with the Redshift schema definition
-        :param database_name: String, schema_name: String, table_name: String, schema: Dict
+        Make an existing table in Redshift consistent with the Redshift schema definition. With row_hash the
+        rowHashColumn of the tableConfigurations is part of the definition
+        :param database_name: String, schema_name: String, table_name: String, schema: Dict, row_hash: bool
         :return: [True, None]
         """
         self.__logger.info(f"Making table {database_name}.{schema_name}.{table_name} consistent")
@@ -143,6 +154,9 @@ class RedshiftService:
 
         columns = redshift.get_query_results(query_id=query_id)
         column_definition = deepcopy(schema.get("columns"))
+        row_hash_column = (schema.get("tableConfigurations") or {}).get("rowHashColumn")
+        if row_hash and row_hash_column:
+            column_definition[row_hash_column] = ROW_HASH_DATA_TYPE
         columns_to_drop = []
         for column in columns:
             column_name = list(column[2].values())[0]
@@ -163,3 +177,147 @@ class RedshiftService:
             if not add_column or not drop_column:
                 return -2
         return True
+
+
+    @staticmethod
+    def get_varchar_length(max_octet_length, headroom_pct):
+        """
+        Size a varchar column from the longest value seen, adding headroom and rounding up to a multiple of 16
+        :param max_octet_length: int, headroom_pct: int
+        :return: int
+        """
+        length = math.ceil(int(max_octet_length) * (1 + float(headroom_pct) / 100))
+        length = max(16, math.ceil(length / 16) * 16)
+        return min(length, VARCHAR_MAX_LENGTH)
+
+    def __get_right_sized_columns(self, redshift, database_name, schema_name, table_name, schema):
+        """
+        Get the width of the varchar columns of a table in Redshift narrower than the largest varchar. Only
+        columns defined as plain varchar in the schema are right-sized and so can be widened
+        :param redshift: RedshiftHelper, database_name: String, schema_name: String, table_name: String,
+        schema: Dict
+        :return: [Dict, None]
+        """
+        sql_query = f"""
+        select * from pg_get_cols('{database_name}.{schema_name}.{table_name}')
+        cols(view_schema name, view_name name, col_name name, col_type varchar, col_num int);
+        """
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return None
+
+        column_widths = {}
+        for column in redshift.get_query_results(query_id=query_id) or []:
+            column_name = list(column[2].values())[0]
+            width = re.match(r"character varying\((\d+)\)", list(column[3].values())[0])
+            if schema.get("columns").get(column_name) == "varchar" and width \
+                    and int(width.group(1)) < VARCHAR_MAX_LENGTH:
+                column_widths[column_name] = int(width.group(1))
+        return column_widths
+
+    def __alter_varchar_width(self, redshift, database_name, schema_name, table_name, column_name, width):
+        """
+        Alter the width of a varchar column of a table in Redshift. ALTER COLUMN cannot run in a transaction
+        so every column is altered on its own
+        :param redshift: RedshiftHelper, database_name: String, schema_name: String, table_name: String,
+        column_name: String, width: int
+        :return: [str, None]
+        """
+        return redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"""
+            ALTER TABLE {database_name}.{schema_name}.{table_name} ALTER COLUMN "{column_name}" TYPE varchar({width});
+            """,
+            cluster_identifier=self.cluster_identifier
+        )
+
+    def widen_staging_varchar_columns(self, database_name, schema_name, staging_table_name, schema):
+        """
+        Give the right-sized varchar columns of the staging table the largest varchar width, so that data
+        longer than the main table column is staged in full and widen_varchar_columns can measure it instead
+        of the COPY rejecting or truncating it
+        :param database_name: String, schema_name: String, staging_table_name: String, schema: Dict
+        :return: [True, -1, -2]
+        """
+        self.__logger.info(f"Checking varchar widths of {database_name}.{schema_name}.{staging_table_name}")
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        column_widths = self.__get_right_sized_columns(
+            redshift, database_name, schema_name, staging_table_name, schema
+        )
+
+        if column_widths is None:
+            return -1
+
+        for column_name, width in column_widths.items():
+            self.__logger.info(f"Widening staging column {column_name} from varchar({width}) "
+                               f"to varchar({VARCHAR_MAX_LENGTH})")
+
+            if not self.__alter_varchar_width(
+                    redshift, database_name, schema_name, staging_table_name, column_name, VARCHAR_MAX_LENGTH
+            ):
+                self.__logger.error(f"Failed to widen staging column {column_name}")
+                return -2
+        return True
+
+    def widen_varchar_columns(self, database_name, schema_name, table_name, staging_table_name, schema):
+        """
+        Widen the right-sized varchar columns of a table in Redshift when the incoming data in the staging
+        table is longer than the current width
+        :param database_name: String, schema_name: String, table_name: String, staging_table_name: String,
+        schema: Dict
+        :return: [True, -1, -2]
+        """
+        self.__logger.info(f"Checking varchar widths of {database_name}.{schema_name}.{table_name}")
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        column_widths = self.__get_right_sized_columns(redshift, database_name, schema_name, table_name, schema)
+
+        if column_widths is None:
+            return -1
+
+        if not column_widths:
+            self.__logger.info("No right-sized varchar columns to check")
+            return True
+
+        # Measure the incoming data of all the right-sized columns in a single scan of the staging table
+        select_list = ",".join([f'max(octet_length("{column_name}"))' for column_name in column_widths])
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"select {select_list} from {database_name}.{schema_name}.{staging_table_name};",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return -1
+
+        records = redshift.get_query_results(query_id=query_id)
+
+        if not records:
+            return -1
+
+        for (column_name, width), field in zip(list(column_widths.items()), records[0]):
+            if field.get("isNull") or int(list(field.values())[0]) <= width:
+                continue
+
+            new_width = self.get_varchar_length(list(field.values())[0], self.varchar_headroom_pct)
+
+            self.__logger.info(f"Widening column {column_name} from varchar({width}) to varchar({new_width})")
+
+            if not self.__alter_varchar_width(
+                    redshift, database_name, schema_name, table_name, column_name, new_width
+            ):
+                self.__logger.error(f"Failed to widen {column_name}")
+                return -2
+
+            self.__logger.info(f"{column_name} has been widened")
+        return True
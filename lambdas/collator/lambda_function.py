@@ -12,8 +12,9 @@ def lambda_handler(event, context):
     """
     Get the status code of all the parallel executions and check if all parallel executions
     have executed successfully. If all have status code 200, extract the input from the event
-    and pass it to output else if a single execution gives status code as 500, return error
-    message
+    and pass it to output along with the tables loaded by the parallel executions else if a single
+    execution gives status code as 500, return error message. Grouped incremental loads pass on all the tables
+    loaded by the group
     :param event: Dict
     :param context: Dict
     :return: Dict
@@ -26,6 +27,7 @@ def lambda_handler(event, context):
 
         logger.info("Collating outputs from parallel run")
 
+        loaded_tables = []
         for job_output in job_outputs:
             logger.info("Parallel run executed successfully")
             if job_output.get("statusCode") != 200:
@@ -36,7 +38,16 @@ def lambda_handler(event, context):
                         "message": "Parallel job failed"
                     }
                 }
+            if job_output.get("tableName"):
+                loaded_tables.append(job_output.get("tableName"))
+            # Grouped loads report every table they loaded
+            loaded_tables += job_output.get("loadedTables") or []
         event.pop("jobRunnerOutput")
+
+        # Pass on the tables loaded in this run for the post-load stages
+        if loaded_tables:
+            logger.info(f"Tables loaded in this run: {loaded_tables}")
+            event["loadedTables"] = loaded_tables
         return event
     except Exception as exception:
         logger.exception(f"Exception encountered in lambda function: {exception}")
@@ -0,0 +1,196 @@
+"""
+Service: copy_staging
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+import uuid
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from helpers.lease_helper import LeaseHelper
+from services.redshift_service import RedshiftService
+
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+s3 = session.resource('s3')
+dynamodb = session.resource('dynamodb')
+logger = Logger(service="CopyStaging")
+
+
+def get_table_lease(context):
+    """
+    Initialize the LeaseHelper serializing the loads of a table, when LEASE_TABLE_NAME is set. The lease is
+    owned by the invocation, so a retry of a step never shares it with the attempt it replaces. Waiters give
+    up after LEASE_WAIT_SECONDS or a minute before the invocation times out
+    :param context: Lambda context
+    :return: [LeaseHelper, None]
+    """
+    if not os.getenv("LEASE_TABLE_NAME"):
+        return None
+
+    wait_seconds = int(os.getenv("LEASE_WAIT_SECONDS", "600"))
+    if context:
+        wait_seconds = min(wait_seconds, context.get_remaining_time_in_millis() // 1000 - 60)
+
+    owner = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+
+    return LeaseHelper(
+        dynamodb=dynamodb,
+        table_name=os.getenv("LEASE_TABLE_NAME"),
+        owner=owner,
+        ttl_seconds=int(os.getenv("LEASE_TTL_SECONDS", "300")),
+        poll_seconds=int(os.getenv("LEASE_POLL_SECONDS", "5")),
+        wait_seconds=wait_seconds,
+        logger=logger
+    )
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to load the staging table in Redshift from its data files in S3
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        database_name = event.get("input").get("databaseName")
+        table_name = event.get("input").get("tableName")
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name=table_name)
+
+        lease = get_table_lease(context)
+        response = lease.acquire(database_name, table_name, event.get("input").get("leaseToken")) if lease else True
+
+        if response is None:
+            logger.error("Error in acquiring table lease")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in acquiring table lease')
+            }
+        if not response:
+            logger.error("Table is being loaded by another execution")
+            return {
+                'statusCode': 409,
+                'message': json.dumps('Table is being loaded by another execution')
+            }
+
+        try:
+            response = copy_staging(event)
+        except Exception:
+            if lease:
+                lease.release(database_name, table_name)
+            raise
+
+        # Within an execution the next step takes the lease over with the leaseToken of the output, the load or
+        # a failed step releases it
+        if lease and event.get("input").get("executionId") and response.get("statusCode") == 200:
+            lease.detach(database_name, table_name)
+            return {**response, "leaseToken": lease.owner}
+        if lease:
+            lease.release(database_name, table_name)
+        return response
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+
+
+def copy_staging(event):
+    """
+    Load the staging table from its data files in S3
+    :param event: Dict
+    :return: Dict
+    """
+    database_name = event.get("input").get("databaseName")
+    table_name = event.get("input").get("tableName")
+    staging_table_name = event.get("input").get("stagingTableName")
+    redshift_database_name = event.get("input").get("redshiftDatabaseName")
+
+    redshift = RedshiftService(
+        redshift=client_redshift,
+        s3={
+            "resource": s3,
+            "bucket_name": os.getenv("S3_BUCKET_NAME"),
+            "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json",
+            "data_bucket_name": os.getenv("DATA_BUCKET_NAME"),
+            "s3_data_prefix": event.get("input").get("s3Prefix") or
+                              f"{os.getenv('STAGING_DATA_PATH')}/{database_name}/{table_name}/",
+            "s3_manifest_key": f"{os.getenv('MANIFEST_PATH')}/{database_name}/{table_name}.manifest"
+        },
+        redshift_params={
+            "database_name": redshift_database_name,
+            "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+            "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+        },
+        copy_params={
+            "iam_role": os.getenv("COPY_IAM_ROLE"),
+            "copy_format": os.getenv("COPY_FORMAT"),
+            "max_errors": os.getenv("COPY_MAX_ERRORS"),
+            "size_tolerance_pct": os.getenv("FILE_SIZE_TOLERANCE_PCT")
+        },
+        logger=logger
+    )
+
+    logger.info("Loading staging table")
+    response = redshift.copy_staging_table(
+        schema=database_name,
+        staging_table=staging_table_name
+    )
+
+    if response == -1:
+        logger.error("No data files found")
+        return {
+            'statusCode': 404,
+            'message': json.dumps('No data files found')
+        }
+    if response == -2:
+        logger.error("Error in getting slice count")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting slice count')
+        }
+    if response == -3:
+        logger.error("Data files use different compressions")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Data files use different compressions')
+        }
+    if response == -4:
+        logger.error("Error in writing manifest")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in writing manifest')
+        }
+    if response == -5:
+        logger.error("Error in executing COPY")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in executing COPY')
+        }
+    if response == -6:
+        logger.error("Error in getting load statistics")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting load statistics')
+        }
+    if response == -7:
+        logger.error("Error in fetching schema")
+        return {
+            'statusCode': 404,
+            'message': json.dumps('Error in fetching schema')
+        }
+
+    logger.info("Staging table loaded successfully")
+    return {
+        'statusCode': 200,
+        'message': "SUCCESS",
+        'loadStatistics': response
+    }
@@ -0,0 +1,345 @@
+"""
+Service: copy_staging
+Module: redshift_service
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from helpers.redshift_helper import RedshiftHelper
+from helpers.s3_helper import S3Helper
+
+# COPY compression options by data file extension
+COMPRESSION_EXTENSIONS = {
+    ".gz": "GZIP",
+    ".bz2": "BZIP2",
+    ".lzo": "LZOP",
+    ".zst": "ZSTD"
+}
+LOAD_ERRORS_REPORTED = 10
+
+
+class RedshiftService:
+    """
+    Redshift Service for loading staging tables from S3 with COPY
+    """
+
+    def __init__(self, redshift, **dependencies):
+        self.__s3 = dependencies.get("s3").get("resource")
+        self.__s3_bucket_name = dependencies.get("s3").get("bucket_name")
+        self.__s3_schema_key = dependencies.get("s3").get("s3_schema_key")
+        self.__s3_data_bucket_name = dependencies.get("s3").get("data_bucket_name")
+        self.__s3_data_prefix = dependencies.get("s3").get("s3_data_prefix")
+        self.__s3_manifest_key = dependencies.get("s3").get("s3_manifest_key")
+        self.__redshift = redshift
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.__iam_role = dependencies.get("copy_params").get("iam_role")
+        self.__copy_format = dependencies.get("copy_params").get("copy_format") or "CSV"
+        self.__max_errors = int(dependencies.get("copy_params").get("max_errors") or 0)
+        self.__size_tolerance_pct = float(dependencies.get("copy_params").get("size_tolerance_pct") or 50)
+
+    def get_staging_mode(self):
+        """
+        Get the staging mode of the table from the tableConfigurations of its schema
+        :return: [str, -1]
+        """
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in fetching schema from {self.__s3_schema_key}")
+            return -1
+
+        return ((json.loads(schema).get("tableConfigurations") or {}).get("stagingMode") or "permanent").lower()
+
+    def get_data_files(self):
+        """
+        List the data files of the staging table in S3, leaving out folder markers and empty objects
+        :return: [List, -1]
+        """
+        files = S3Helper(logger=self.__logger).list_objects(
+            s3=self.__s3,
+            bucket_name=self.__s3_data_bucket_name,
+            prefix=self.__s3_data_prefix
+        )
+
+        if files is None:
+            self.__logger.error(f"Error in listing data files in {self.__s3_data_prefix}")
+            return -1
+
+        files = [
+            file for file in files
+            if file.get("size") and not file.get("key").endswith("/") and file.get("key") != self.__s3_manifest_key
+        ]
+
+        if not files:
+            self.__logger.error(f"No data files found in {self.__s3_data_prefix}")
+            return -1
+
+        return files
+
+    def get_slice_count(self):
+        """
+        Get the number of slices in the cluster
+        :return: [int, None]
+        """
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query="SELECT COUNT(*) FROM stv_slices;",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return None
+
+        records = redshift.get_query_results(query_id=query_id)
+
+        if not records:
+            return None
+
+        return records[0][0].get("longValue")
+
+    def check_file_layout(self, files, slice_count):
+        """
+        Check that the data files can be loaded evenly by all the slices of the cluster: the number of files
+        should be a multiple of the slice count and the file sizes within size_tolerance_pct of the mean size.
+        Files outside the tolerance are flagged so they can be split or merged upstream
+        :param files: List, slice_count: int
+        :return: Dict
+        """
+        total_bytes = sum([file.get("size") for file in files])
+        mean_bytes = total_bytes / len(files)
+        tolerance = mean_bytes * self.__size_tolerance_pct / 100
+
+        flagged_files = [
+            file.get("key") for file in files if abs(file.get("size") - mean_bytes) > tolerance
+        ]
+
+        file_layout = {
+            "sliceCount": slice_count,
+            "fileCount": len(files),
+            "totalBytes": total_bytes,
+            "fileCountAligned": len(files) % slice_count == 0,
+            "recommendedFileCount": -(-len(files) // slice_count) * slice_count,
+            "flaggedFiles": flagged_files
+        }
+
+        if not file_layout["fileCountAligned"]:
+            self.__logger.warning(
+                f"{len(files)} data files are not a multiple of {slice_count} slices, "
+                f"split them into {file_layout['recommendedFileCount']} files"
+            )
+        if flagged_files:
+            self.__logger.warning(
+                f"Data files differing from the mean size {int(mean_bytes)} by more than "
+                f"{self.__size_tolerance_pct}%: {flagged_files}"
+            )
+
+        return file_layout
+
+    @staticmethod
+    def get_compression(files):
+        """
+        Get the COPY compression option of the data files from their extension
+        :param files: List
+        :return: [str, None]
+        """
+        compressions = {
+            COMPRESSION_EXTENSIONS.get(os.path.splitext(file.get("key"))[1].lower(), "") for file in files
+        }
+
+        if len(compressions) > 1:
+            return None
+
+        return compressions.pop()
+
+    def frame_manifest(self, files):
+        """
+        Frame the COPY manifest listing every data file as mandatory
+        :param files: List
+        :return: str
+        """
+        return json.dumps({
+            "entries": [
+                {
+                    "url": f"s3://{self.__s3_data_bucket_name}/{file.get('key')}",
+                    "mandatory": True,
+                    "meta": {
+                        "content_length": file.get("size")
+                    }
+                }
+                for file in files
+            ]
+        })
+
+    def frame_copy_query(self, schema_name, staging_table_name, compression):
+        """
+        Frame the COPY query loading the staging table from the manifest
+        :param schema_name: str, staging_table_name: str, compression: str
+        :return: str
+        """
+        options = [self.__copy_format]
+        if compression:
+            options.append(compression)
+        options += [f"MAXERROR {self.__max_errors}", "COMPUPDATE OFF", "STATUPDATE OFF"]
+
+        return f"COPY {schema_name}.{staging_table_name} " \
+               f"FROM 's3://{self.__s3_data_bucket_name}/{self.__s3_manifest_key}' " \
+               f"IAM_ROLE '{self.__iam_role}' MANIFEST {' '.join(options)};"
+
+    def get_load_statistics(self, copy_query_id):
+        """
+        Get the lines scanned and the load errors of a COPY from stl_load_commits and stl_load_errors. The
+        COPY is the last statement of its batch
+        :param copy_query_id: str
+        :return: [Dict, None]
+        """
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        response = redshift.describe_query(copy_query_id)
+
+        if not response:
+            return None
+
+        sub_statements = response.get("SubStatements")
+        redshift_query_id = (sub_statements[-1] if sub_statements else response).get("RedshiftQueryId")
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"SELECT (SELECT COALESCE(SUM(lines_scanned), 0) FROM stl_load_commits "
+                  f"WHERE query = {redshift_query_id}), "
+                  f"(SELECT COUNT(*) FROM stl_load_errors WHERE query = {redshift_query_id});",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return None
+
+        records = redshift.get_query_results(query_id=query_id)
+
+        if not records:
+            return None
+
+        load_statistics = {
+            "linesScanned": records[0][0].get("longValue"),
+            "loadErrors": records[0][1].get("longValue"),
+            "errors": []
+        }
+
+        if not load_statistics["loadErrors"]:
+            return load_statistics
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"SELECT TRIM(filename), line_number, TRIM(colname), TRIM(err_reason) FROM stl_load_errors "
+                  f"WHERE query = {redshift_query_id} ORDER BY filename, line_number LIMIT {LOAD_ERRORS_REPORTED};",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        for record in (redshift.get_query_results(query_id=query_id) if query_id else None) or []:
+            load_statistics["errors"].append({
+                "fileName": record[0].get("stringValue"),
+                "lineNumber": record[1].get("longValue"),
+                "columnName": record[2].get("stringValue"),
+                "reason": record[3].get("stringValue")
+            })
+
+        return load_statistics
+
+    def copy_staging_table(self, **copy_args):
+        """
+        Load the staging table from the data files in S3 with a single COPY over a manifest, so all the slices
+        of the cluster load files in parallel. For tables in temp staging mode only the manifest is written,
+        incremental_load copies it into a temporary table in the session loading the main table. Tables in
+        spectrum staging mode are read from their data files by incremental_load and are not copied at all
+        :param copy_args: Dict
+        :return: [Dict, -1, -2, -3, -4, -5, -6, -7]
+        """
+        schema_name = copy_args.get("schema")
+        staging_table_name = copy_args.get("staging_table")
+
+        staging_mode = self.get_staging_mode()
+
+        if staging_mode == -1:
+            return -7
+
+        if staging_mode == "spectrum":
+            self.__logger.info(f"Skipping COPY of {staging_table_name} read through Spectrum")
+            return {"stagingMode": staging_mode}
+
+        files = self.get_data_files()
+
+        if files == -1:
+            return -1
+
+        slice_count = self.get_slice_count()
+
+        if not slice_count:
+            self.__logger.error("Error in getting slice count")
+            return -2
+
+        file_layout = self.check_file_layout(files, slice_count)
+
+        compression = self.get_compression(files)
+
+        if compression is None:
+            self.__logger.error(f"Data files in {self.__s3_data_prefix} use different compressions")
+            return -3
+
+        response = S3Helper(logger=self.__logger).put_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_data_bucket_name,
+            key=self.__s3_manifest_key,
+            body=self.frame_manifest(files)
+        )
+
+        if not response:
+            self.__logger.error(f"Error in writing manifest to {self.__s3_manifest_key}")
+            return -4
+
+        if staging_mode == "temp":
+            self.__logger.info(f"Manifest written for temporary staging of {staging_table_name}")
+            return {**file_layout, "stagingMode": staging_mode}
+
+        # DELETE rather than TRUNCATE, which commits on its own, so a failed COPY leaves the staging rows as they were
+        sql_queries = [
+            f"DELETE FROM {schema_name}.{staging_table_name};",
+            self.frame_copy_query(schema_name, staging_table_name, compression)
+        ]
+
+        self.__logger.info(f"Replacing rows of {staging_table_name} using: {sql_queries}")
+
+        query_id = RedshiftHelper(redshift=self.__redshift, logger=self.__logger).run_batch_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            queries=sql_queries,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in loading {staging_table_name}")
+            return -5
+
+        load_statistics = self.get_load_statistics(query_id)
+
+        if not load_statistics:
+            self.__logger.error(f"Error in getting load statistics of {staging_table_name}")
+            return -6
+
+        if load_statistics.get("loadErrors"):
+            self.__logger.warning(
+                f"{load_statistics.get('loadErrors')} rows rejected while loading {staging_table_name}: "
+                f"{load_statistics.get('errors')}"
+            )
+
+        return {**file_layout, **load_statistics}
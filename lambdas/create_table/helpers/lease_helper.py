@@ -0,0 +1,185 @@
+"""
+Service: create_table
+Module: lease_helper
+Author: Sourav Hazra
+"""
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+class LeaseHelper:
+    """
+    Lease Helper holding a lease per (database, table) in DynamoDB so that only one load works on a table at
+    a time. Every invocation holds leases under its own owner token, and takes over a lease from the previous
+    step of its execution only by presenting that step's token. Leases expire after ttl_seconds unless renewed
+    by the heartbeat, so a crashed holder never blocks a table for longer than that
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for Lease Helper
+        """
+        self.__dynamodb = kwargs.get("dynamodb")
+        self.__logger = kwargs.get("logger")
+        self.__table_name = kwargs.get("table_name")
+        self.owner = kwargs.get("owner")
+        self.__ttl_seconds = kwargs.get("ttl_seconds") or 300
+        self.__poll_seconds = kwargs.get("poll_seconds") or 5
+        self.__deadline = time.time() + (kwargs.get("wait_seconds") or 0)
+        self.__leases = set()
+        self.__heartbeat = None
+        self.__stop_heartbeat = threading.Event()
+
+    def __put_lease(self, database_name, table_name, lease_token=None):
+        """
+        Take the lease if it is free, expired, already held by this owner or handed over with lease_token
+        :param database_name: String, table_name: String, lease_token: String
+        :return: [True, False, None]
+        """
+        now = int(time.time())
+        condition = "attribute_not_exists(tableName) OR expiresAt < :now OR ownerId = :owner"
+        values = {
+            ":now": now,
+            ":owner": self.owner
+        }
+        if lease_token:
+            condition += " OR ownerId = :token"
+            values[":token"] = lease_token
+        try:
+            self.__dynamodb.Table(self.__table_name).put_item(
+                Item={
+                    "databaseName": database_name,
+                    "tableName": table_name,
+                    "ownerId": self.owner,
+                    "acquiredAt": now,
+                    "expiresAt": now + self.__ttl_seconds
+                },
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values
+            )
+        except ClientError as exception:
+            if exception.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            self.__logger.exception(f"Error encountered in acquiring lease of {table_name}: {exception}")
+            return None
+        except Exception as exception:
+            self.__logger.exception(f"Error encountered in acquiring lease of {table_name}: {exception}")
+            return None
+        return True
+
+    def acquire(self, database_name, table_name, lease_token=None):
+        """
+        Acquire the lease of a table, waiting in line for the current holder to release it or let it expire
+        until the wait deadline of this helper. The lease_token handed over by the previous step of the same
+        execution takes the lease over from that step
+        :param database_name: String, table_name: String, lease_token: String
+        :return: [True, False, None]
+        """
+        while True:
+            response = self.__put_lease(database_name, table_name, lease_token)
+
+            if response:
+                self.__logger.info(f"Acquired lease of {database_name}.{table_name}")
+                self.__leases.add((database_name, table_name))
+                self.start_heartbeat()
+                return True
+            if response is None:
+                return None
+            if time.time() + self.__poll_seconds > self.__deadline:
+                self.__logger.warning(f"Lease of {database_name}.{table_name} is held by another load")
+                return False
+
+            self.__logger.info(f"Waiting for lease of {database_name}.{table_name}")
+            time.sleep(self.__poll_seconds)
+
+    def renew(self, database_name, table_name):
+        """
+        Extend the lease of a table held by this owner by ttl_seconds
+        :param database_name: String, table_name: String
+        :return: [True, None]
+        """
+        try:
+            self.__dynamodb.Table(self.__table_name).update_item(
+                Key={
+                    "databaseName": database_name,
+                    "tableName": table_name
+                },
+                UpdateExpression="set expiresAt=:expiresAt",
+                ConditionExpression="ownerId = :owner",
+                ExpressionAttributeValues={
+                    ":expiresAt": int(time.time()) + self.__ttl_seconds,
+                    ":owner": self.owner
+                }
+            )
+        except Exception as exception:
+            self.__logger.exception(f"Error encountered in renewing lease of {table_name}: {exception}")
+            return None
+        return True
+
+    def release(self, database_name, table_name):
+        """
+        Release the lease of a table held by this owner
+        :param database_name: String, table_name: String
+        :return: [True, None]
+        """
+        self.__leases.discard((database_name, table_name))
+        if not self.__leases:
+            self.stop_heartbeat()
+
+        try:
+            self.__dynamodb.Table(self.__table_name).delete_item(
+                Key={
+                    "databaseName": database_name,
+                    "tableName": table_name
+                },
+                ConditionExpression="ownerId = :owner",
+                ExpressionAttributeValues={
+                    ":owner": self.owner
+                }
+            )
+        except Exception as exception:
+            self.__logger.exception(f"Error encountered in releasing lease of {table_name}: {exception}")
+            return None
+        return True
+
+    def detach(self, database_name, table_name):
+        """
+        Stop renewing the lease of a table without releasing it, so the next step takes it over with the owner
+        token of this helper before it expires
+        :param database_name: String, table_name: String
+        :return: None
+        """
+        self.__leases.discard((database_name, table_name))
+        if not self.__leases:
+            self.stop_heartbeat()
+
+    def start_heartbeat(self):
+        """
+        Renew the leases held by this owner every third of ttl_seconds in a background thread
+        :return: None
+        """
+        if self.__heartbeat:
+            return
+
+        def heartbeat():
+            while not self.__stop_heartbeat.wait(self.__ttl_seconds / 3):
+                for database_name, table_name in list(self.__leases):
+                    self.renew(database_name, table_name)
+
+        self.__stop_heartbeat.clear()
+        self.__heartbeat = threading.Thread(target=heartbeat, daemon=True)
+        self.__heartbeat.start()
+
+    def stop_heartbeat(self):
+        """
+        Stop renewing the leases held by this owner
+        :return: None
+        """
+        if not self.__heartbeat:
+            return
+
+        self.__stop_heartbeat.set()
+        self.__heartbeat.join()
+        self.__heartbeat = None
@@ -28,3 +28,15 @@ class S3Helper:
         except Exception as exception:
             self.__logger.exception(f"Exception in fetching {key} from {bucket_name}: {exception}")
             return None
+
+
+    def put_object(self, s3, bucket_name, key, body):
+        """
+        Write the contents of an object to a given S3 bucket with the specified key
+        """
+        try:
+            s3.Object(bucket_name, key).put(Body=body)
+        except Exception as exception:
+            self.__logger.exception(f"Exception in writing {key} to {bucket_name}: {exception}")
+            return None
+        return True
@@ -5,10 +5,12 @@ Author: Sourav Hazra
 """
 import json
 import os
+import uuid
 
 from botocore.client import Config
 import boto3
 
+from helpers.lease_helper import LeaseHelper
 from services.redshift_service import RedshiftService
 from aws_lambda_powertools import Logger
 
@@ -17,9 +19,38 @@ session = boto3.session.Session()
 config = Config(connect_timeout=5, read_timeout=5)
 client_redshift = session.client("redshift-data", config=config)
 s3 = session.resource('s3')
+dynamodb = session.resource('dynamodb')
 logger = Logger(service="CreateTable")
 
 
+def get_table_lease(context):
+    """
+    Initialize the LeaseHelper serializing the loads of a table, when LEASE_TABLE_NAME is set. The lease is
+    owned by the invocation, so a retry of a step never shares it with the attempt it replaces. Waiters give
+    up after LEASE_WAIT_SECONDS or a minute before the invocation times out
+    :param context: Lambda context
+    :return: [LeaseHelper, None]
+    """
+    if not os.getenv("LEASE_TABLE_NAME"):
+        return None
+
+    wait_seconds = int(os.getenv("LEASE_WAIT_SECONDS", "600"))
+    if context:
+        wait_seconds = min(wait_seconds, context.get_remaining_time_in_millis() // 1000 - 60)
+
+    owner = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+
+    return LeaseHelper(
+        dynamodb=dynamodb,
+        table_name=os.getenv("LEASE_TABLE_NAME"),
+        owner=owner,
+        ttl_seconds=int(os.getenv("LEASE_TTL_SECONDS", "300")),
+        poll_seconds=int(os.getenv("LEASE_POLL_SECONDS", "5")),
+        wait_seconds=wait_seconds,
+        logger=logger
+    )
+
+
 def lambda_handler(event, context):
     """
     Lambda event handler to fetch the create table stored procedure from S3 and execute it to create
@@ -32,83 +63,208 @@ def lambda_handler(event, context):
         # Get the input from the Lambda event
         database_name = event.get("input").get("databaseName")
         table_name = event.get("input").get("tableName")
-        staging_table_name = event.get("input").get("stagingTableName")
-        redshift_database_name = event.get("input").get("redshiftDatabaseName")
 
         logger.append_keys(database_name=database_name)
         logger.append_keys(table_name=table_name)
 
-        logger.info("Creating table")
-
-        # Initialize RedshiftService
-        redshift = RedshiftService(
-            redshift=client_redshift,
-            s3={
-                "resource": s3,
-                "bucket_name": os.getenv("S3_BUCKET_NAME"),
-                "s3_create_proc_key": os.getenv('CREATE_PROC_PATH'),
-                "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json"
-            },
-            redshift_params={
-                "database_name": redshift_database_name,
-                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
-                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
-            },
-            logger=logger
+        lease = get_table_lease(context)
+        response = lease.acquire(database_name, table_name, event.get("input").get("leaseToken")) if lease else True
 
-        )
+        if response is None:
+            logger.error("Error in acquiring table lease")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in acquiring table lease')
+            }
+        if not response:
+            logger.error("Table is being loaded by another execution")
+            return {
+                'statusCode': 409,
+                'message': json.dumps('Table is being loaded by another execution')
+            }
+
+        try:
+            response = create_table(event)
+        except Exception:
+            if lease:
+                lease.release(database_name, table_name)
+            raise
+
+        # Within an execution the next step takes the lease over with the leaseToken of the output, the load or
+        # a failed step releases it
+        if lease and event.get("input").get("executionId") and response.get("statusCode") == 200:
+            lease.detach(database_name, table_name)
+            return {**response, "leaseToken": lease.owner}
+        if lease:
+            lease.release(database_name, table_name)
+        return response
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+
+
+def create_table(event):
+    """
+    Create the main and staging tables, or analyze compression or profile the varchar columns of
+    the table for the ANALYZE_COMPRESSION and PROFILE_VARCHAR modes
+    :param event: Dict
+    :return: Dict
+    """
+    database_name = event.get("input").get("databaseName")
+    table_name = event.get("input").get("tableName")
+    staging_table_name = event.get("input").get("stagingTableName")
+    redshift_database_name = event.get("input").get("redshiftDatabaseName")
+    mode = event.get("input").get("mode")
+
+    # Initialize RedshiftService
+    redshift = RedshiftService(
+        redshift=client_redshift,
+        s3={
+            "resource": s3,
+            "bucket_name": os.getenv("S3_BUCKET_NAME"),
+            "s3_create_proc_key": os.getenv('CREATE_PROC_PATH'),
+            "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json",
+            "s3_compression_report_key": f"{os.getenv('COMPRESSION_REPORT_PATH')}/{database_name}/{table_name}.json",
+            "s3_varchar_profile_key": f"{os.getenv('VARCHAR_PROFILE_PATH')}/{database_name}/{table_name}.json"
+            if os.getenv('VARCHAR_PROFILE_PATH') else None
+        },
+        redshift_params={
+            "database_name": redshift_database_name,
+            "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+            "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS"),
+            "varchar_headroom_pct": int(os.getenv("VARCHAR_HEADROOM_PCT", "25"))
+        },
+        logger=logger
 
-        # Dynamically frame the create table stored procedure based on the main table name, schema name, staging table
-        # name and database name
-        response = redshift.frame_create_table_stored_procedure()
+    )
+
+    if mode == "ANALYZE_COMPRESSION":
+        logger.info("Analyzing compression of existing table")
+
+        # Run ANALYZE COMPRESSION on the main table and record the suggested re-encodings
+        response = redshift.analyze_table_compression(
+            schema=database_name,
+            table=table_name
+        )
 
         if response == -1:
-            logger.error("Error in reading SQL query")
-            return {
-                'statusCode': 404,
-                'message': json.dumps('Error in reading SQL query')
-            }
-        if response == -2:
-            logger.error("Error in executing SQL query")
+            logger.error("Error in analyzing compression")
             return {
                 'statusCode': 500,
-                'message': json.dumps('Error in executing SQL query')
+                'message': json.dumps('Error in analyzing compression')
             }
-        if response == -3:
-            logger.error("Error in getting stored procedure name")
+        if response == -2:
+            logger.error("Error in recording compression report")
             return {
                 'statusCode': 500,
-                'message': json.dumps('Error in getting stored procedure name')
+                'message': json.dumps('Error in recording compression report')
             }
 
-        logger.info("Executing CreateTable stored procedure")
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS"
+        }
 
-        # Execute framed stored procedure
-        response = redshift.execute_create_table_stored_procedure(
-            proc_name=response,
+    if mode == "PROFILE_VARCHAR":
+        logger.info("Profiling varchar columns of staging table")
+
+        # Measure the varchar columns in the staging table and record the lengths for the generated DDL
+        response = redshift.profile_varchar_columns(
             schema=database_name,
-            table=table_name,
-            staging_table=staging_table_name,
+            staging_table=staging_table_name
         )
 
         if response == -1:
-            logger.error(f"Error in creating table {table_name}")
+            logger.error("Error in fetching schema")
+            return {
+                'statusCode': 404,
+                'message': json.dumps('Error in fetching schema')
+            }
+        if response == -2:
+            logger.error("Error in profiling varchar columns")
             return {
                 'statusCode': 500,
-                'message': json.dumps('Error in executing SQL query')
+                'message': json.dumps('Error in profiling varchar columns')
+            }
+        if response == -3:
+            logger.error("Error in recording varchar profile")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in recording varchar profile')
             }
-
-        logger.info(f"{table_name} created successfully under database {database_name}")
 
         return {
             'statusCode': 200,
             'message': "SUCCESS"
         }
-    except Exception as exception:
-        logger.exception(f"Exception encountered in lambda function: {exception}")
+
+    logger.info("Creating table")
+
+    # Dynamically frame the create table stored procedure based on the main table name, schema name, staging table
+    # name and database name
+    response = redshift.frame_create_table_stored_procedure()
+
+    if response == -1:
+        logger.error("Error in reading SQL query")
         return {
-            "statusCode": 500,
-            "message": "Exception encountered in lambda function"
+            'statusCode': 404,
+            'message': json.dumps('Error in reading SQL query')
+        }
+    if response == -2:
+        logger.error("Error in executing SQL query")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in executing SQL query')
+        }
+    if response == -3:
+        logger.error("Error in getting stored procedure name")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting stored procedure name')
+        }
+
+    logger.info("Executing CreateTable stored procedure")
+
+    # Execute framed stored procedure
+    response = redshift.execute_create_table_stored_procedure(
+        proc_name=response,
+        schema=database_name,
+        table=table_name,
+        staging_table=staging_table_name,
+    )
+
+    if response == -1:
+        logger.error(f"Error in creating table {table_name}")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in executing SQL query')
+        }
+
+    # Keep the right-sized varchar columns of the staging table at the largest width so no data is cut off
+    response = redshift.widen_staging_varchar_columns(
+        schema=database_name,
+        staging_table=staging_table_name
+    )
+
+    if response == -1:
+        logger.error("Error in fetching schema")
+        return {
+            'statusCode': 404,
+            'message': json.dumps('Error in fetching schema')
         }
-    
-    
\ No newline at end of file
+    if response == -2:
+        logger.error("Error in widening varchar columns of staging table")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in widening varchar columns')
+        }
+
+    logger.info(f"{table_name} created successfully under database {database_name}")
+
+    return {
+        'statusCode': 200,
+        'message': "SUCCESS"
+    }
@@ -4,10 +4,34 @@ Module: redshift_service
 Author: Sourav Hazra
 """
 import json
+import math
+import re
+from datetime import datetime
 
 from helpers.redshift_helper import RedshiftHelper
 from helpers.s3_helper import S3Helper
 
+# Column compression encodings picked from the schema data types
+AZ64_DATA_TYPES = (
+    "smallint", "int2", "integer", "int", "int4", "bigint", "int8", "decimal", "numeric",
+    "date", "timestamp", "timestamp without time zone", "timestamptz", "timestamp with time zone"
+)
+ZSTD_DATA_TYPES = (
+    "char", "character", "nchar", "bpchar", "varchar", "character varying", "nvarchar", "text",
+    "real", "float4", "float", "float8", "double precision"
+)
+RAW_DATA_TYPES = ("boolean", "bool")
+
+# Largest length of a varchar column in Redshift
+VARCHAR_MAX_LENGTH = 65535
+
+# Keys in redshiftConfigurations and tableConfigurations which are not rendered as table attributes
+NON_DDL_REDSHIFT_CONFIGURATIONS = ("columnEncodings",)
+NON_DDL_TABLE_CONFIGURATIONS = (
+    "loadMode", "loadChunks", "timestampCheckpointColumn", "recordCheckpointColumn", "dedupOrderColumn",
+    "rowHashColumn", "stagingMode", "backupPartitionColumn"
+)
+
 
 class RedshiftService:
     """
@@ -18,11 +42,89 @@ class RedshiftService:
         self.__s3_bucket_name = dependencies.get("s3").get("bucket_name")
         self.__s3_create_proc_key = dependencies.get("s3").get("s3_create_proc_key")
         self.__s3_schema_key = dependencies.get("s3").get("s3_schema_key")
+        self.__s3_compression_report_key = dependencies.get("s3").get("s3_compression_report_key")
+        self.__s3_varchar_profile_key = dependencies.get("s3").get("s3_varchar_profile_key")
         self.__redshift = redshift
         self.__logger = dependencies.get("logger")
         self.__database_name = dependencies.get("redshift_params").get("database_name")
         self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
         self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.varchar_headroom_pct = dependencies.get("redshift_params").get("varchar_headroom_pct")
+        if self.varchar_headroom_pct is None:
+            self.varchar_headroom_pct = 25
+
+    @staticmethod
+    def quote_columns(value):
+        """
+        Quote each column of a comma separated column list from the schema config
+        :param value: str
+        :return: str
+        """
+        return ",".join([f'"{column.strip().strip(chr(34))}"' for column in value.split(",")])
+
+    @staticmethod
+    def get_varchar_length(max_octet_length, headroom_pct):
+        """
+        Size a varchar column from the longest value seen, adding headroom and rounding up to a multiple of 16
+        :param max_octet_length: int, headroom_pct: int
+        :return: int
+        """
+        length = math.ceil(int(max_octet_length) * (1 + float(headroom_pct) / 100))
+        length = max(16, math.ceil(length / 16) * 16)
+        return min(length, VARCHAR_MAX_LENGTH)
+
+    def __get_varchar_profile(self):
+        """
+        Fetch the varchar length profile of the table from S3 if the table has been profiled
+        :return: Dict
+        """
+        if not self.__s3_varchar_profile_key:
+            return {}
+
+        profile = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_varchar_profile_key
+        )
+
+        if not profile:
+            self.__logger.info(f"No varchar profile found using key: {self.__s3_varchar_profile_key}")
+            return {}
+
+        return json.loads(profile).get("columns") or {}
+
+    @staticmethod
+    def get_column_encodings(schema):
+        """
+        Pick the compression encoding of every column from its data type. The leading sort key column is
+        kept RAW so that zone maps stay effective and columnEncodings in redshiftConfigurations override
+        the picked encodings
+        :param schema: Dict
+        :return: Dict
+        """
+        redshift_configurations = schema.get("redshiftConfigurations") or {}
+
+        leading_sort_key = None
+        for attr, value in redshift_configurations.items():
+            if attr.lower().endswith("sortkey") and value:
+                leading_sort_key = value.split(",")[0].strip().strip('"')
+                break
+
+        column_encodings = {}
+        for column_name, data_type in schema.get("columns").items():
+            base_data_type = data_type.split("(")[0].strip().lower()
+            if column_name == leading_sort_key or base_data_type in RAW_DATA_TYPES:
+                column_encodings[column_name] = "raw"
+            elif base_data_type in AZ64_DATA_TYPES:
+                column_encodings[column_name] = "az64"
+            elif base_data_type in ZSTD_DATA_TYPES:
+                column_encodings[column_name] = "zstd"
+
+        for column_name, encoding in (redshift_configurations.get("columnEncodings") or {}).items():
+            if column_name in schema.get("columns"):
+                column_encodings[column_name] = encoding.lower()
+
+        return column_encodings
 
     def frame_create_table_stored_procedure(self):
         """
@@ -45,24 +147,31 @@ class RedshiftService:
 
         schema = json.loads(schema)
 
-        # Frame the table columns along with their corresponding data type
+        # Frame the table columns along with their corresponding data type and compression encoding
+        column_encodings = self.get_column_encodings(schema)
+        varchar_profile = self.__get_varchar_profile()
         table_columns = ""
         for column_name, data_type in schema.get("columns").items():
-            data_type = "varchar(65535)" if data_type == "varchar" else data_type
-            table_columns += f'"{column_name}" {data_type},'
+            if data_type == "varchar" and varchar_profile.get(column_name):
+                data_type = f"varchar({self.get_varchar_length(varchar_profile.get(column_name), self.varchar_headroom_pct)})"
+            data_type = f"varchar({VARCHAR_MAX_LENGTH})" if data_type == "varchar" else data_type
+            encoding = f" encode {column_encodings.get(column_name)}" if column_encodings.get(column_name) else ""
+            table_columns += f'"{column_name}" {data_type}{encoding},'
 
         table_columns = table_columns[:-1]
         # Frame the table constraints like primary key, foreign key etc.
         table_constraints = ""
         if schema.get("tableConfigurations"):
             for attr, value in schema.get("tableConfigurations").items():
+                if attr in NON_DDL_TABLE_CONFIGURATIONS:
+                    continue
                 temp = ""
                 for k in attr:
                     if k.isupper():
                         temp += f" {k.lower()}"
                     else:
                         temp += k
-                table_constraints += f'{temp}("{value}"),'
+                table_constraints += f'{temp}({self.quote_columns(value)}),'
 
         table_schema = f"{table_columns},{table_constraints}"[:-1]
 
@@ -70,13 +179,18 @@ class RedshiftService:
         redshift_config = ""
         if schema.get("redshiftConfigurations"):
             for attr, value in schema.get("redshiftConfigurations").items():
+                if attr in NON_DDL_REDSHIFT_CONFIGURATIONS:
+                    continue
+                if attr.lower() == "diststyle":
+                    redshift_config += f'diststyle {value} '
+                    continue
                 temp = ""
                 for k in attr:
                     if k.isupper():
                         temp += f" {k.lower()}"
                     else:
                         temp += k
-                redshift_config += f'{temp}("{value}") '
+                redshift_config += f'{temp}({self.quote_columns(value)}) '
             redshift_config = redshift_config.strip()
 
         self.__logger.info(f"Getting stored procedure from S3 using key: {self.__s3_create_proc_key}")
@@ -146,3 +260,235 @@ class RedshiftService:
             return -1
 
         return query_results
+
+    def widen_staging_varchar_columns(self, **table_args):
+        """
+        Give the right-sized varchar columns of the staging table the largest varchar width. The stored
+        procedure creates the staging table from the same DDL as the main table, and data longer than the
+        main table column has to be staged in full for check_columns to widen the main table column
+        :param table_args: Dict
+        :return: [True, int]
+        """
+        schema_name = table_args.get("schema")
+        staging_table_name = table_args.get("staging_table")
+
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in getting data from S3 using key: {self.__s3_schema_key}")
+            return -1
+
+        schema = json.loads(schema)
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"""
+            select * from pg_get_cols('{self.__database_name}.{schema_name}.{staging_table_name}')
+            cols(view_schema name, view_name name, col_name name, col_type varchar, col_num int);
+            """,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return -2
+
+        for column in redshift.get_query_results(query_id=query_id) or []:
+            column_name = list(column[2].values())[0]
+            width = re.match(r"character varying\((\d+)\)", list(column[3].values())[0])
+            if schema.get("columns").get(column_name) != "varchar" or not width \
+                    or int(width.group(1)) >= VARCHAR_MAX_LENGTH:
+                continue
+
+            self.__logger.info(f"Widening staging column {column_name} to varchar({VARCHAR_MAX_LENGTH})")
+
+            # ALTER COLUMN cannot run in a transaction so every column is altered on its own
+            query_id = redshift.run_query(
+                database=self.__database_name,
+                cluster_credentials_secret=self.cluster_credentials_secret,
+                query=f'ALTER TABLE {schema_name}.{staging_table_name} ALTER COLUMN "{column_name}" '
+                      f'TYPE varchar({VARCHAR_MAX_LENGTH});',
+                cluster_identifier=self.cluster_identifier
+            )
+
+            if not query_id:
+                self.__logger.error(f"Failed to widen staging column {column_name}")
+                return -2
+
+        return True
+
+
+    def analyze_table_compression(self, **table_args):
+        """
+        Run ANALYZE COMPRESSION on an existing table and record the suggested re-encodings in S3
+        :param table_args: Dict
+        :return: [Dict, int]
+        """
+        schema_name = table_args.get("schema")
+        table_name = table_args.get("table")
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        self.__logger.info(f"Getting current column encodings of {schema_name}.{table_name}")
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"""
+            select a.attname, format_encoding(a.attencodingtype::integer)
+            from pg_attribute a
+            join pg_class c on c.oid = a.attrelid
+            join pg_namespace n on n.oid = c.relnamespace
+            where n.nspname = '{schema_name}' and c.relname = '{table_name}' and a.attnum > 0
+            and not a.attisdropped;
+            """,
+            cluster_identifier=self.cluster_identifier
+        )
+        if not query_id:
+            self.__logger.error(f"Error in getting column encodings of {schema_name}.{table_name}")
+            return -1
+
+        current_encodings = {
+            list(record[0].values())[0]: list(record[1].values())[0].lower()
+            for record in redshift.get_query_results(query_id=query_id) or []
+        }
+
+        self.__logger.info(f"Analyzing compression of {schema_name}.{table_name}")
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"ANALYZE COMPRESSION {schema_name}.{table_name};",
+            cluster_identifier=self.cluster_identifier
+        )
+        if not query_id:
+            self.__logger.error(f"Error in analyzing compression of {schema_name}.{table_name}")
+            return -1
+
+        records = redshift.get_query_results(query_id=query_id)
+        if records is None:
+            self.__logger.error(f"Error in getting compression analysis of {schema_name}.{table_name}")
+            return -1
+
+        # Each record holds the table, column, suggested encoding and estimated reduction percentage
+        suggestions = []
+        for record in records:
+            column_name = list(record[1].values())[0]
+            suggested_encoding = list(record[2].values())[0].lower()
+            if current_encodings.get(column_name) == suggested_encoding:
+                continue
+            suggestions.append({
+                "column": column_name,
+                "currentEncoding": current_encodings.get(column_name),
+                "suggestedEncoding": suggested_encoding,
+                "estimatedReductionPct": float(list(record[3].values())[0])
+            })
+
+        self.__logger.info(f"{len(suggestions)} column(s) of {schema_name}.{table_name} can be re-encoded")
+
+        report = {
+            "schemaName": schema_name,
+            "tableName": table_name,
+            "analyzedAt": datetime.utcnow().isoformat(),
+            "suggestions": suggestions,
+            "columnEncodings": {
+                suggestion.get("column"): suggestion.get("suggestedEncoding") for suggestion in suggestions
+            }
+        }
+
+        response = S3Helper(logger=self.__logger).put_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_compression_report_key,
+            body=json.dumps(report)
+        )
+        if not response:
+            self.__logger.error(f"Error in recording compression report using key: {self.__s3_compression_report_key}")
+            return -2
+
+        return report
+
+
+    def profile_varchar_columns(self, **table_args):
+        """
+        Measure the longest value in octets of every varchar column in the staging table and record the
+        profile in S3 so that the generated DDL can right-size the columns
+        :param table_args: Dict
+        :return: [Dict, int]
+        """
+        schema_name = table_args.get("schema")
+        staging_table_name = table_args.get("staging_table")
+
+        self.__logger.info(f"Getting schema from S3 for Redshift table using key: {self.__s3_schema_key}")
+
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in getting data from S3 using key: {self.__s3_schema_key}")
+            return -1
+
+        schema = json.loads(schema)
+
+        varchar_columns = [
+            column_name for column_name, data_type in schema.get("columns").items() if data_type == "varchar"
+        ]
+
+        if not varchar_columns:
+            self.__logger.info("No varchar columns to profile")
+            return {}
+
+        # Measure all the varchar columns in a single scan of the staging table
+        select_list = ",".join([f'max(octet_length("{column_name}"))' for column_name in varchar_columns])
+
+        self.__logger.info(f"Profiling {len(varchar_columns)} varchar column(s) of {schema_name}.{staging_table_name}")
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"select {select_list} from {schema_name}.{staging_table_name};",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in profiling {schema_name}.{staging_table_name}")
+            return -2
+
+        records = redshift.get_query_results(query_id=query_id)
+
+        if not records:
+            self.__logger.error(f"Error in getting profile of {schema_name}.{staging_table_name}")
+            return -2
+
+        # Columns holding only nulls are left out so that they keep the default length
+        columns = {}
+        for column_name, field in zip(varchar_columns, records[0]):
+            if not field.get("isNull"):
+                columns[column_name] = int(list(field.values())[0])
+
+        profile = {
+            "schemaName": schema_name,
+            "tableName": staging_table_name,
+            "profiledAt": datetime.utcnow().isoformat(),
+            "columns": columns
+        }
+
+        response = S3Helper(logger=self.__logger).put_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_varchar_profile_key,
+            body=json.dumps(profile)
+        )
+        if not response:
+            self.__logger.error(f"Error in recording varchar profile using key: {self.__s3_varchar_profile_key}")
+            return -3
+
+        return profile
@@ -0,0 +1,57 @@
+"""
+Service: data_quality_profile
+Module: dynamodb_helper
+Author: Sourav Hazra
+"""
+from boto3.dynamodb.conditions import Key
+
+
+class DynamoDBHelper:
+    """
+    DynamoDB Helper for DynamoDB operations
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for DynamoDB Helper
+        """
+        self.__dynamodb = kwargs.get("dynamodb")
+        self.__logger = kwargs.get("logger")
+
+    def put_item(self, **kwargs):
+        """
+        Write an item to DynamoDB
+        :param kwargs: Dict
+        :return: [None, True]
+        """
+        table = self.__dynamodb.Table(kwargs.get("table_name"))
+        try:
+            response = table.put_item(
+                Item=kwargs.get("item")
+            )
+            if not response:
+                return None
+        except Exception as exception:
+            self.__logger.exception(f"Error encountered in writing item to DynamoDB: {exception}")
+            return None
+        return True
+
+    def get_latest_item(self, **kwargs):
+        """
+        Fetch the item with the largest sort key under a partition key from DynamoDB
+        :param kwargs: Dict
+        :return: [Dict, None]
+        """
+        table = self.__dynamodb.Table(kwargs.get("table_name"))
+        try:
+            response = table.query(
+                KeyConditionExpression=Key(kwargs.get("partition_key").get("key_name")).eq(
+                    kwargs.get("partition_key").get("key_value")
+                ),
+                ScanIndexForward=False,
+                Limit=1
+            )
+        except Exception as exception:
+            self.__logger.exception(f"Error encountered in reading item from DynamoDB: {exception}")
+            return None
+        return (response.get("Items") or [None])[0]
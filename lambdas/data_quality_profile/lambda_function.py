@@ -0,0 +1,105 @@
+"""
+Service: data_quality_profile
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.data_quality_service import DataQualityService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+s3 = session.resource('s3')
+dynamodb = session.resource('dynamodb')
+logger = Logger(service="DataQualityProfile")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to profile the data quality of the tables loaded in this run
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the collated Lambda event
+        database_name = event.get("input").get("databaseName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName") or os.getenv("REDSHIFT_DATABASE_NAME")
+        loaded_tables = event.get("loadedTables") or []
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name="")
+
+        if not loaded_tables:
+            logger.info("No tables loaded in this run")
+            return {
+                'statusCode': 200,
+                'message': "SUCCESS"
+            }
+
+        # Initialize DataQualityService
+        data_quality = DataQualityService(
+            redshift=client_redshift,
+            s3={
+                "resource": s3,
+                "bucket_name": os.getenv("S3_BUCKET_NAME"),
+                "schema_path": os.getenv("TABLE_SCHEMA_PATH")
+            },
+            dynamodb=dynamodb,
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            thresholds={
+                "row_drop_pct": float(os.getenv("DQ_ROW_DROP_PCT", "10")),
+                "null_increase_pct": float(os.getenv("DQ_NULL_INCREASE_PCT", "5"))
+            },
+            logger=logger
+        )
+
+        logger.info("Profiling loaded tables")
+        response = data_quality.profile_tables(
+            schema_name=database_name,
+            table_names=loaded_tables,
+            profile_table_name=os.getenv("DQ_PROFILE_TABLE_NAME")
+        )
+
+        if response == -1:
+            logger.error("Error in fetching schema")
+            return {
+                'statusCode': 404,
+                'message': json.dumps('Error in fetching schema')
+            }
+        if response == -2:
+            logger.error("Error in profiling table")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in profiling table')
+            }
+        if response == -3:
+            logger.error("Error in recording profile")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in recording profile')
+            }
+
+        logger.info("Tables profiled successfully")
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'profiles': response
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
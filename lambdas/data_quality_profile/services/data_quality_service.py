@@ -0,0 +1,258 @@
+"""
+Service: data_quality_profile
+Module: data_quality_service
+Author: Sourav Hazra
+"""
+import json
+from datetime import datetime
+
+from helpers.dynamodb_helper import DynamoDBHelper
+from helpers.redshift_helper import RedshiftHelper
+from helpers.s3_helper import S3Helper
+
+# Data types without an order or a distinct count, only their nulls are profiled
+UNORDERED_DATA_TYPES = ("bool", "boolean", "super", "varbyte", "varbinary", "binary varying", "geometry",
+                        "geography", "hllsketch")
+NOT_COUNTED_DATA_TYPES = ("super", "varbyte", "varbinary", "binary varying", "geometry", "geography", "hllsketch")
+
+
+class DataQualityService:
+    """
+    Service class to profile the data quality of the loaded tables in a single scan per table and compare
+    every profile with the previous one
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for DataQualityService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__s3 = dependencies.get("s3").get("resource")
+        self.__s3_bucket_name = dependencies.get("s3").get("bucket_name")
+        self.__s3_schema_path = dependencies.get("s3").get("schema_path")
+        self.__redshift = redshift
+        self.__dynamodb = dependencies.get("dynamodb")
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.row_drop_pct = dependencies.get("thresholds", {}).get("row_drop_pct")
+        if self.row_drop_pct is None:
+            self.row_drop_pct = 10
+        self.null_increase_pct = dependencies.get("thresholds", {}).get("null_increase_pct")
+        if self.null_increase_pct is None:
+            self.null_increase_pct = 5
+
+    def get_table_schema(self, schema_name, table_name):
+        """
+        Fetch the table schema stored in S3
+        :param schema_name: String, table_name: String
+        :return: [Dict, int]
+        """
+        s3_schema_key = f"{self.__s3_schema_path}/{schema_name}/{table_name}.json"
+
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in getting schema from S3 using key: {s3_schema_key}")
+            return -1
+
+        return json.loads(schema)
+
+    @staticmethod
+    def get_base_data_type(data_type):
+        """
+        Get the data type without its length or precision
+        :param data_type: String
+        :return: String
+        """
+        return data_type.lower().split("(")[0].strip()
+
+    def frame_profile_query(self, schema, schema_name, table_name):
+        """
+        Frame the query profiling the table in one scan: the row count, the nulls, estimated distinct values,
+        smallest and largest value of every column of the schema and the rows sharing their primary key with
+        another row. The rows per primary key are counted with a window over the same scan
+        :param schema: Dict, schema_name: String, table_name: String
+        :return: String
+        """
+        select_list = ["COUNT(*)"]
+        for column, data_type in schema.get("columns").items():
+            base_data_type = self.get_base_data_type(data_type)
+            select_list.append(f'COUNT(*) - COUNT("{column}")')
+            select_list.append(
+                "NULL" if base_data_type in NOT_COUNTED_DATA_TYPES else f'APPROXIMATE COUNT(DISTINCT "{column}")'
+            )
+            if base_data_type in UNORDERED_DATA_TYPES:
+                select_list += ["NULL", "NULL"]
+            else:
+                select_list += [f'CAST(MIN("{column}") AS VARCHAR)', f'CAST(MAX("{column}") AS VARCHAR)']
+
+        primary_key = (schema.get("tableConfigurations") or {}).get("primaryKey")
+        primary_key_columns = [column.strip().strip('"') for column in (primary_key or "").split(",") if column.strip()]
+
+        if not primary_key_columns:
+            return f"SELECT {', '.join(select_list + ['NULL'])} FROM {schema_name}.{table_name};"
+
+        partition_list = ", ".join([f'"{column}"' for column in primary_key_columns])
+        select_list.append("SUM(CASE WHEN dq_key_rows > 1 THEN 1 ELSE 0 END)")
+
+        return f"SELECT {', '.join(select_list)} FROM (SELECT *, COUNT(*) OVER (PARTITION BY {partition_list}) " \
+               f"AS dq_key_rows FROM {schema_name}.{table_name}) AS p;"
+
+    @staticmethod
+    def get_field_value(field):
+        """
+        Get the value of a field of a Redshift Data API result
+        :param field: Dict
+        :return: [int, String, None]
+        """
+        if field.get("isNull"):
+            return None
+        return list(field.values())[0]
+
+    def profile_table(self, schema, schema_name, table_name):
+        """
+        Profile the table with a single query
+        :param schema: Dict, schema_name: String, table_name: String
+        :return: [Dict, None]
+        """
+        sql_query = self.frame_profile_query(schema, schema_name, table_name)
+
+        self.__logger.info(f"Profiling {table_name} using: {sql_query}")
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        records = redshift.get_query_results(query_id=query_id) if query_id else None
+
+        if not records:
+            self.__logger.error(f"Error in profiling {table_name}")
+            return None
+
+        values = [self.get_field_value(field) for field in records[0]]
+
+        columns = {}
+        for index, column in enumerate(schema.get("columns").keys()):
+            nulls, distinct, min_value, max_value = values[1 + 4 * index: 5 + 4 * index]
+            columns[column] = {
+                "nulls": nulls,
+                "distinct": distinct,
+                "min": min_value,
+                "max": max_value
+            }
+
+        return {
+            "rowCount": values[0],
+            "duplicateKeyRows": values[-1],
+            "columns": columns
+        }
+
+    def compare_profiles(self, profile, previous_profile):
+        """
+        Compare the profile with the previous profile of the table, flagging primary key duplicates, a drop in
+        the row count larger than row_drop_pct and columns whose null percentage grew by more than
+        null_increase_pct points
+        :param profile: Dict, previous_profile: Dict
+        :return: List
+        """
+        issues = []
+
+        if profile.get("duplicateKeyRows"):
+            issues.append({"check": "duplicateKeyRows", "value": profile.get("duplicateKeyRows")})
+
+        if not previous_profile:
+            return issues
+
+        row_count = profile.get("rowCount")
+        previous_row_count = int(previous_profile.get("rowCount") or 0)
+
+        if previous_row_count and 100 * (previous_row_count - row_count) / previous_row_count > self.row_drop_pct:
+            issues.append({"check": "rowCount", "value": row_count, "previousValue": previous_row_count})
+
+        for column, column_profile in profile.get("columns").items():
+            previous_nulls = (previous_profile.get("columns") or {}).get(column, {}).get("nulls")
+            if not row_count or previous_nulls is None or not previous_row_count:
+                continue
+            null_pct = 100 * column_profile.get("nulls") / row_count
+            previous_null_pct = 100 * int(previous_nulls) / previous_row_count
+            if null_pct - previous_null_pct > self.null_increase_pct:
+                issues.append({
+                    "check": "nullPct",
+                    "column": column,
+                    "value": round(null_pct, 2),
+                    "previousValue": round(previous_null_pct, 2)
+                })
+
+        return issues
+
+    def profile_tables(self, **kwargs):
+        """
+        Profile the loaded tables, store every profile as a time series per table in DynamoDB and flag the
+        tables whose profile breaks the checks
+        :param kwargs: Dict
+        :return: [List, -1, -2, -3]
+        """
+        schema_name = kwargs.get("schema_name")
+        profile_table_name = kwargs.get("profile_table_name")
+
+        dynamodb_helper = DynamoDBHelper(dynamodb=self.__dynamodb, logger=self.__logger)
+        captured_at = datetime.utcnow().isoformat()
+
+        results = []
+        for table_name in kwargs.get("table_names"):
+            schema = self.get_table_schema(schema_name, table_name)
+
+            if schema == -1:
+                return -1
+
+            profile = self.profile_table(schema, schema_name, table_name)
+
+            if not profile:
+                return -2
+
+            previous_profile = dynamodb_helper.get_latest_item(
+                table_name=profile_table_name,
+                partition_key={
+                    "key_name": "tableKey",
+                    "key_value": f"{schema_name}.{table_name}"
+                }
+            )
+
+            issues = self.compare_profiles(profile, previous_profile)
+
+            response = dynamodb_helper.put_item(
+                table_name=profile_table_name,
+                item={
+                    "tableKey": f"{schema_name}.{table_name}",
+                    "capturedAt": captured_at,
+                    **profile
+                }
+            )
+
+            if not response:
+                self.__logger.error(f"Error in recording profile of {table_name}")
+                return -3
+
+            if issues:
+                self.__logger.warning(f"{table_name} failed data quality checks: {issues}")
+
+            results.append({
+                "tableName": table_name,
+                "rowCount": profile.get("rowCount"),
+                "duplicateKeyRows": profile.get("duplicateKeyRows"),
+                "issues": issues
+            })
+
+        return results
@@ -0,0 +1,114 @@
+"""
+Service: etl_invoker
+Module: redshift_helper
+Author: Sourav Hazra
+"""
+from helpers.retry_policy import RetryPolicy, StatementError
+from helpers.statement_semaphore import StatementSemaphore
+
+
+class RedshiftHelper:
+    """
+    Redshift Helper for Redshift operations
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for RedshiftHelper
+        :param kwargs: Dict
+        """
+        self.__redshift = kwargs.get("redshift")
+        self.__logger = kwargs.get("logger")
+        self.__retry_policy = kwargs.get("retry_policy") or RetryPolicy(logger=self.__logger)
+        self.__semaphore = kwargs.get("semaphore") or StatementSemaphore(logger=self.__logger)
+
+    def __run_statement(self, execute, **kwargs):
+        """
+        Submit a statement through the Data API holding a slot of the statement semaphore, and wait for it
+        to finish
+        :param execute: Data API method, kwargs: Dict
+        :return: Dict
+        """
+        slot = self.__semaphore.acquire()
+
+        try:
+            try:
+                result = execute(**kwargs)
+            except Exception as exception:
+                if self.__retry_policy.is_rejected(exception):
+                    raise
+                # The statement may have been accepted before the failure, so it is not submitted again
+                raise StatementError(f"Error in submitting statement: {exception}", transient=False)
+
+            status = "START"
+
+            while status not in ("FINISHED", "FAILED", "ABORTED"):
+                self.__semaphore.renew(slot)
+                try:
+                    response = self.__retry_policy.call(
+                        self.__redshift.describe_statement,
+                        Id=result.get("Id")
+                    )
+                except Exception as exception:
+                    # The statement may still be running, so it is not submitted again
+                    raise StatementError(f"Error in describing statement: {exception}", transient=False)
+                status = response.get("Status")
+
+                if status in ("FAILED", "ABORTED"):
+                    raise StatementError(response.get("Error") or status)
+
+            return result
+        finally:
+            self.__semaphore.release(slot)
+
+    def run_query(self, **kwargs):
+        """
+        Run a SQL query in Redshift
+        :param kwargs: Dict
+        :return: [None, String]
+        """
+        try:
+            result = self.__retry_policy.call(
+                self.__run_statement,
+                self.__redshift.execute_statement,
+                Database=kwargs.get("database"),
+                SecretArn=kwargs.get("cluster_credentials_secret"),
+                Sql=kwargs.get("query"),
+                ClusterIdentifier=kwargs.get("cluster_identifier")
+            )
+        except StatementError as exception:
+            self.__logger.error(f"SQL query failed: {exception}")
+            return None
+        except Exception as exception:
+            self.__logger.exception(f"Exception in running query: {exception}")
+            return None
+        return result.get("Id")
+
+    def get_query_results(self, query_id):
+        """
+        Get query results after running a query in Redshift
+        :param query_id: String
+        :return: [None, List]
+        """
+        next_token = 1
+        result = []
+
+        while next_token:
+            try:
+                if next_token == 1:
+                    response = self.__retry_policy.call(
+                        self.__redshift.get_statement_result,
+                        Id=query_id
+                    )
+                else:
+                    response = self.__retry_policy.call(
+                        self.__redshift.get_statement_result,
+                        Id=query_id,
+                        NextToken=next_token
+                    )
+                result += response.get("Records")
+                next_token = response.get("NextToken")
+            except Exception as exception:
+                self.__logger.exception(f"Error in getting query results: {exception}")
+                return None
+        return result
@@ -15,6 +15,7 @@ from aws_lambda_powertools import Logger
 session = boto3.session.Session()
 config = Config(connect_timeout=5, read_timeout=5)
 s3 = session.resource('s3')
+client_redshift = session.client("redshift-data", config=config)
 logger = Logger(service="ETLInvoker")
 
 
@@ -39,6 +40,17 @@ def lambda_handler(event, context):
                 "database_prefix": os.getenv("DATABASE_SCHEMA_PATH")
             },
             environment=os.getenv("ENVIRONMENT"),
+            redshift=client_redshift,
+            redshift_params={
+                "database_name": os.getenv("REDSHIFT_DATABASE_NAME"),
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            fan_out={
+                "min_concurrency": int(os.getenv("FANOUT_MIN_CONCURRENCY", "1")),
+                "max_concurrency": int(os.getenv("FANOUT_MAX_CONCURRENCY", "10")),
+                "max_queue_seconds": int(os.getenv("WLM_GATE_MAX_QUEUE_SECONDS", "60"))
+            },
             logger=logger
         )
 
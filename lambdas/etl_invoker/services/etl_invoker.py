@@ -6,6 +6,7 @@ Author: Sourav Hazra
 from datetime import datetime
 
 from helpers.s3_helper import S3Helper
+from helpers.wlm_helper import WLMHelper
 
 
 class ETLInvokerService:
@@ -23,6 +24,9 @@ class ETLInvokerService:
         self.__s3_database_prefix = dependencies.get("s3").get("database_prefix")
         self.__logger = dependencies.get("logger")
         self.__environment = dependencies.get("environment")
+        self.__redshift = dependencies.get("redshift")
+        self.__redshift_params = dependencies.get("redshift_params") or {}
+        self.__fan_out = dependencies.get("fan_out")
 
     def get_databases_to_migrate(self):
         """
@@ -54,6 +58,30 @@ class ETLInvokerService:
 
         return database_configs
 
+    def get_max_concurrency(self):
+        """
+        Size the Map fan-out of the tables from the WLM queues of the cluster, so loads widen on a quiet
+        cluster and narrow on a busy one
+        :return: int
+        """
+        wlm = WLMHelper(redshift=self.__redshift, logger=self.__logger)
+
+        queue_state = wlm.get_queue_state(
+            database=self.__redshift_params.get("database_name"),
+            cluster_credentials_secret=self.__redshift_params.get("cluster_credentials_secret"),
+            cluster_identifier=self.__redshift_params.get("cluster_identifier")
+        ) if self.__redshift_params.get("cluster_identifier") else None
+
+        max_concurrency = wlm.get_fan_out_width(
+            queue_state,
+            self.__fan_out.get("min_concurrency"),
+            self.__fan_out.get("max_concurrency"),
+            self.__fan_out.get("max_queue_seconds")
+        )
+
+        self.__logger.info(f"WLM queue state: {queue_state}, loading {max_concurrency} tables at once")
+        return max_concurrency
+
     def generate_input_for_step_functions(self):
         """
         Frame the input for Step Functions
@@ -71,6 +99,8 @@ class ETLInvokerService:
                 self.__logger.error("Error encountered in getting list of databases")
                 return -1
 
+            fan_out = {"maxConcurrency": self.get_max_concurrency()} if self.__fan_out else {}
+
             step_functions_input = []
             for database_config in database_configs:
                 if database_config.split(".")[-1] != "json":
@@ -83,7 +113,8 @@ class ETLInvokerService:
                         "environment": self.__environment,
                         "configBucket": self.__s3_bucket_name,
                         "configFileKey": database_config,
-                        "monthlyBackUp": monthly_backup_flag
+                        "monthlyBackUp": monthly_backup_flag,
+                        **fan_out
                     }
                 })
         except Exception as exception:
@@ -0,0 +1,144 @@
+"""
+Service: incremental_load
+Module: swap_helper
+Author: Sourav Hazra
+"""
+from helpers.redshift_helper import RedshiftHelper
+
+# Privileges of the ACL items of pg_class.relacl by their letter, a "*" after a letter marks the grant option
+ACL_PRIVILEGES = {
+    "r": "SELECT",
+    "a": "INSERT",
+    "w": "UPDATE",
+    "d": "DELETE",
+    "x": "REFERENCES",
+    "R": "RULE",
+    "t": "TRIGGER",
+    "D": "DROP",
+    "A": "ALTER",
+    "P": "TRUNCATE"
+}
+
+
+class SwapHelper:
+    """
+    Swap Helper checking whether a table can be replaced by a rebuilt copy with ALTER TABLE RENAME, and framing
+    the statements giving the copy the owner and the grants of the table
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for SwapHelper
+        :param kwargs: Dict
+        """
+        self.__redshift = kwargs.get("redshift")
+        self.__logger = kwargs.get("logger")
+
+    def __get_records(self, sql_query, **kwargs):
+        """
+        Run a SQL query in Redshift and fetch its records
+        :param sql_query: String, kwargs: Dict
+        :return: [List, None]
+        """
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        query_id = redshift.run_query(
+            database=kwargs.get("database"),
+            cluster_credentials_secret=kwargs.get("cluster_credentials_secret"),
+            query=sql_query,
+            cluster_identifier=kwargs.get("cluster_identifier")
+        )
+
+        return redshift.get_query_results(query_id=query_id) if query_id else None
+
+    def get_dependent_objects(self, schema_name, table_name, **kwargs):
+        """
+        Count the views bound to the table in pg_depend and the materialized views built on it in stv_mv_deps.
+        Bound views follow the table when it is renamed, so the renamed table cannot be dropped while they exist
+        :param schema_name: String, table_name: String, kwargs: Dict
+        :return: [int, None]
+        """
+        sql_query = f"SELECT " \
+                    f"(SELECT COUNT(DISTINCT r.ev_class) FROM pg_depend AS d " \
+                    f"JOIN pg_rewrite AS r ON d.objid = r.oid " \
+                    f"JOIN pg_class AS c ON d.refobjid = c.oid " \
+                    f"JOIN pg_namespace AS n ON c.relnamespace = n.oid " \
+                    f"WHERE n.nspname = '{schema_name}' AND c.relname = '{table_name}' AND r.ev_class <> c.oid), " \
+                    f"(SELECT COUNT(*) FROM stv_mv_deps " \
+                    f"WHERE TRIM(ref_schema) = '{schema_name}' AND TRIM(ref_name) = '{table_name}');"
+
+        records = self.__get_records(sql_query, **kwargs)
+
+        if not records:
+            self.__logger.error(f"Error in getting objects depending on {schema_name}.{table_name}")
+            return None
+
+        return sum([field.get("longValue") or 0 for field in records[0]])
+
+    @staticmethod
+    def frame_grant_queries(table, acl, owner):
+        """
+        Frame the GRANT statements giving a table the privileges of an ACL read from pg_class.relacl. The
+        privileges of the owner come with the ownership and are skipped
+        :param table: String, acl: String, owner: String
+        :return: List
+        """
+        grant_queries = []
+        for acl_item in (acl or "").split("~"):
+            grantee, _, privileges = acl_item.partition("=")
+            privileges = privileges.split("/")[0]
+
+            if not privileges or grantee == owner:
+                continue
+
+            if not grantee:
+                grantee = "PUBLIC"
+            elif grantee.startswith("group "):
+                grantee = f'GROUP "{grantee[6:]}"'
+            elif grantee.startswith("role "):
+                grantee = f'ROLE "{grantee[5:]}"'
+            else:
+                grantee = f'"{grantee}"'
+
+            granted, granted_with_option = [], []
+            for index, letter in enumerate(privileges):
+                if letter not in ACL_PRIVILEGES:
+                    continue
+                if privileges[index + 1:index + 2] == "*":
+                    granted_with_option.append(ACL_PRIVILEGES.get(letter))
+                else:
+                    granted.append(ACL_PRIVILEGES.get(letter))
+
+            if granted:
+                grant_queries.append(f"GRANT {', '.join(granted)} ON {table} TO {grantee};")
+            if granted_with_option:
+                grant_queries.append(
+                    f"GRANT {', '.join(granted_with_option)} ON {table} TO {grantee} WITH GRANT OPTION;"
+                )
+        return grant_queries
+
+    def get_grant_queries(self, schema_name, table_name, **kwargs):
+        """
+        Frame the statements giving the table rebuilt in place of a table the owner and grants of the table.
+        They run after the rebuilt table is renamed to the name of the table
+        :param schema_name: String, table_name: String, kwargs: Dict
+        :return: [List, None]
+        """
+        sql_query = f"SELECT pg_get_userbyid(c.relowner), current_user, array_to_string(c.relacl, '~') " \
+                    f"FROM pg_class AS c JOIN pg_namespace AS n ON c.relnamespace = n.oid " \
+                    f"WHERE n.nspname = '{schema_name}' AND c.relname = '{table_name}';"
+
+        records = self.__get_records(sql_query, **kwargs)
+
+        if not records:
+            self.__logger.error(f"Error in getting grants of {schema_name}.{table_name}")
+            return None
+
+        owner, current_user, acl = [field.get("stringValue") for field in records[0]]
+        table = f"{schema_name}.{table_name}"
+
+        grant_queries = []
+        if owner and owner != current_user:
+            grant_queries.append(f'ALTER TABLE {table} OWNER TO "{owner}";')
+
+        return grant_queries + self.frame_grant_queries(table, acl, owner)
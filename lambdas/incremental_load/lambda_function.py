@@ -5,20 +5,92 @@ Author: Sourav Hazra
 """
 import json
 import os
+import uuid
 
 from aws_lambda_powertools import Logger
 from botocore.client import Config
 import boto3
 
+from helpers.lease_helper import LeaseHelper
 from services.redshift_service import RedshiftService
 
 session = boto3.session.Session()
 config = Config(connect_timeout=5, read_timeout=5)
 client_redshift = session.client("redshift-data", config=config)
 s3 = session.resource('s3')
+dynamodb = session.resource('dynamodb')
 logger = Logger(service="IncrementalLoad")
 
 
+def get_redshift_service(database_name, table_name, redshift_database_name):
+    """
+    Initialize the RedshiftService loading a table
+    :param database_name: str, table_name: str, redshift_database_name: str
+    :return: RedshiftService
+    """
+    return RedshiftService(
+        redshift=client_redshift,
+        s3={
+            "resource": s3,
+            "bucket_name": os.getenv("S3_BUCKET_NAME"),
+            "s3_key_name": os.getenv('SQL_PATH'),
+            "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json",
+            "data_bucket_name": os.getenv("DATA_BUCKET_NAME"),
+            "s3_manifest_key": f"{os.getenv('MANIFEST_PATH')}/{database_name}/{table_name}.manifest",
+            "s3_data_prefix": f"{os.getenv('STAGING_DATA_PATH')}/{database_name}/{table_name}/"
+        },
+        redshift_params={
+            "database_name": redshift_database_name,
+            "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+            "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS"),
+            "swap_row_ratio": os.getenv("SWAP_ROW_RATIO")
+        },
+        copy_params={
+            "iam_role": os.getenv("COPY_IAM_ROLE"),
+            "copy_format": os.getenv("COPY_FORMAT"),
+            "max_errors": os.getenv("COPY_MAX_ERRORS")
+        },
+        spectrum_params={
+            "external_schema": os.getenv("SPECTRUM_SCHEMA"),
+            "table_format": os.getenv("SPECTRUM_TABLE_FORMAT"),
+            "partition_column": os.getenv("SPECTRUM_PARTITION_COLUMN")
+        },
+        dynamodb={
+            "resource": dynamodb,
+            "checkpoint_table_name": os.getenv("CHECKPOINT_TABLE_NAME")
+        },
+        logger=logger
+    )
+
+
+def get_table_lease(context):
+    """
+    Initialize the LeaseHelper serializing the loads of a table, when LEASE_TABLE_NAME is set. The lease is
+    owned by the invocation, so a retry of a step never shares it with the attempt it replaces. Waiters give
+    up after LEASE_WAIT_SECONDS or a minute before the invocation times out
+    :param context: Lambda context
+    :return: [LeaseHelper, None]
+    """
+    if not os.getenv("LEASE_TABLE_NAME"):
+        return None
+
+    wait_seconds = int(os.getenv("LEASE_WAIT_SECONDS", "600"))
+    if context:
+        wait_seconds = min(wait_seconds, context.get_remaining_time_in_millis() // 1000 - 60)
+
+    owner = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+
+    return LeaseHelper(
+        dynamodb=dynamodb,
+        table_name=os.getenv("LEASE_TABLE_NAME"),
+        owner=owner,
+        ttl_seconds=int(os.getenv("LEASE_TTL_SECONDS", "300")),
+        poll_seconds=int(os.getenv("LEASE_POLL_SECONDS", "5")),
+        wait_seconds=wait_seconds,
+        logger=logger
+    )
+
+
 def lambda_handler(event, context):
     """
     Lambda event handler to load data from staging table to the main table in Redshift
@@ -29,82 +101,306 @@ def lambda_handler(event, context):
     try:
         database_name = event.get("input").get("databaseName")
         table_name = event.get("input").get("tableName")
-        staging_table_name = event.get("input").get("stagingTableName")
-        redshift_database_name = event.get("input").get("redshiftDatabaseName")
 
         logger.append_keys(database_name=database_name)
         logger.append_keys(table_name=table_name)
 
-        redshift = RedshiftService(
-            redshift=client_redshift,
-            s3={
-                "resource": s3,
-                "bucket_name": os.getenv("S3_BUCKET_NAME"),
-                "s3_key_name": os.getenv('SQL_PATH'),
-                "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json"
-            },
-            redshift_params={
-                "database_name": redshift_database_name,
-                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
-                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
-            },
-            logger=logger
+        lease = get_table_lease(context)
 
-        )
+        if event.get("input").get("tables"):
+            return load_table_group(event, lease)
 
-        logger.info("Creating CreateTable stored procedure")
-        response = redshift.create_incremental_load_procedure()
+        response = lease.acquire(database_name, table_name, event.get("input").get("leaseToken")) if lease else True
 
-        if response == -1:
-            logger.error("Error in reading stored procedure for incremental load")
+        if response is None:
+            logger.error("Error in acquiring table lease")
             return {
-                'statusCode': 404,
-                'message': json.dumps('Error in reading stored procedure for incremental load')
+                'statusCode': 500,
+                'message': json.dumps('Error in acquiring table lease')
             }
-        if response == -2:
-            logger.error("Error in creating stored procedure for incremental load")
+        if not response:
+            logger.error("Table is being loaded by another execution")
             return {
-                'statusCode': 500,
-                'message': json.dumps('Error in creating stored procedure for incremental load')
+                'statusCode': 409,
+                'message': json.dumps('Table is being loaded by another execution')
             }
 
-        logger.info("Executing stored procedure for incremental load")
-        response = redshift.execute_incremental_load_stored_procedure(
-            proc_name=response,
+        try:
+            return load_table(event)
+        finally:
+            if lease:
+                lease.release(database_name, table_name)
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+
+
+def load_table(event):
+    """
+    Load data from the staging table to the main table in Redshift
+    :param event: Dict
+    :return: Dict
+    """
+    database_name = event.get("input").get("databaseName")
+    table_name = event.get("input").get("tableName")
+    staging_table_name = event.get("input").get("stagingTableName")
+    redshift_database_name = event.get("input").get("redshiftDatabaseName")
+
+    redshift = get_redshift_service(database_name, table_name, redshift_database_name)
+
+    load_mode = redshift.get_load_mode()
+
+    if load_mode == -1:
+        logger.error("Error in fetching schema")
+        return {
+            'statusCode': 404,
+            'message': json.dumps('Error in fetching schema')
+        }
+
+    duplicates_removed = redshift.deduplicate_staging_table(
+        schema=database_name,
+        staging_table=staging_table_name
+    )
+
+    if duplicates_removed == -1:
+        logger.error("Error in fetching schema")
+        return {
+            'statusCode': 404,
+            'message': json.dumps('Error in fetching schema')
+        }
+    if duplicates_removed == -2:
+        logger.error("No primary key found")
+        return {
+            'statusCode': 404,
+            'message': json.dumps('No primary key found')
+        }
+    if duplicates_removed == -3:
+        logger.error("Error in deduplicating staging table")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in deduplicating staging table')
+        }
+
+    watermark = redshift.get_watermark_predicate(
+        schema=database_name,
+        table=table_name
+    )
+
+    if redshift.get_staging_mode() in ("temp", "spectrum"):
+        logger.info("Loading main table through a temporary staging table")
+        response = redshift.execute_incremental_load_temp_staging(
+            schema=database_name,
+            table=table_name,
+            staging_table=staging_table_name,
+            load_mode=load_mode,
+            watermark=watermark,
+            delta_date=event.get("input").get("deltaDate")
+        )
+
+        if isinstance(response, dict):
+            duplicates_removed = response.get("duplicatesRemoved")
+    elif load_mode == "merge":
+        logger.info("Merging staging table into main table")
+        response = redshift.execute_incremental_load_merge(
+            schema=database_name,
+            table=table_name,
+            staging_table=staging_table_name,
+            watermark=watermark
+        )
+    elif load_mode == "append":
+        logger.info("Appending staging table to main table")
+        response = redshift.execute_incremental_load_append(
+            schema=database_name,
+            table=table_name,
+            staging_table=staging_table_name
+        )
+    else:
+        load_plan = redshift.plan_load_strategy(
             schema=database_name,
             table=table_name,
             staging_table=staging_table_name
         )
 
-        if response == -1:
-            logger.error("Error in fetching schema")
-            return {
-                'statusCode': 404,
-                'message': json.dumps('Error in fetching schema')
-            }
-        if response == -2:
-            logger.error("No primary key found")
-            return {
-                'statusCode': 404,
-                'message': json.dumps('No primary key found')
-            }
-        if response == -3:
-            logger.error("Error in executing SQL query")
-            return {
-                'statusCode': 500,
-                'message': json.dumps('Error in executing SQL query')
-            }
+        if load_plan.get("strategy") == "swap":
+            logger.info("Rebuilding main table and swapping it in")
+            response = redshift.execute_incremental_load_swap(
+                schema=database_name,
+                table=table_name,
+                staging_table=staging_table_name,
+                watermark=watermark
+            )
+        elif redshift.get_load_chunks() > 1 or watermark or \
+                redshift.get_row_hash_column(redshift.get_table_schema()):
+            logger.info("Loading staging table into main table in chunks")
+            response = redshift.execute_incremental_load_chunks(
+                schema=database_name,
+                table=table_name,
+                staging_table=staging_table_name,
+                watermark=watermark
+            )
+        else:
+            logger.info("Creating CreateTable stored procedure")
+            response = redshift.create_incremental_load_procedure()
+
+            if response == -1:
+                logger.error("Error in reading stored procedure for incremental load")
+                return {
+                    'statusCode': 404,
+                    'message': json.dumps('Error in reading stored procedure for incremental load')
+                }
+            if response == -2:
+                logger.error("Error in creating stored procedure for incremental load")
+                return {
+                    'statusCode': 500,
+                    'message': json.dumps('Error in creating stored procedure for incremental load')
+                }
 
-        logger.info("Stored procedure for incremental load executed successfully")
+            logger.info("Executing stored procedure for incremental load")
+            response = redshift.execute_incremental_load_stored_procedure(
+                proc_name=response,
+                schema=database_name,
+                table=table_name,
+                staging_table=staging_table_name
+            )
+
+    if response == -1:
+        logger.error("Error in fetching schema")
         return {
-            'statusCode': 200,
-            'message': "SUCCESS"
+            'statusCode': 404,
+            'message': json.dumps('Error in fetching schema')
         }
-    except Exception as exception:
-        logger.exception(f"Exception encountered in lambda function: {exception}")
+    if response == -2:
+        logger.error("No primary key found")
         return {
-            "statusCode": 500,
-            "message": "Exception encountered in lambda function"
+            'statusCode': 404,
+            'message': json.dumps('No primary key found')
+        }
+    if response == -3:
+        logger.error("Error in executing SQL query")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in executing SQL query')
+        }
+    if response == -4:
+        logger.error("Error in recording load progress")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in recording load progress')
+        }
+    if response == -5:
+        logger.error("Error in reading staging manifest")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in reading staging manifest')
         }
-    
-    
\ No newline at end of file
+    if response == -7:
+        logger.error("Error in preparing external table")
+        return {
+            'statusCode': 500,
+            'message': json.dumps('Error in preparing external table')
+        }
+
+    logger.info("Incremental load executed successfully")
+    return {
+        'statusCode': 200,
+        'message': "SUCCESS",
+        'tableName': table_name,
+        'duplicatesRemoved': duplicates_removed or 0
+    }
+
+
+def load_table_group(event, lease=None):
+    """
+    Load a group of small tables in batches of GROUP_LOAD_BATCH_SIZE tables, every batch merged inside one
+    transaction so the tables share a commit, and record the outcome of every table. Tables whose lease is
+    held by another load past the wait deadline are left out of the group
+    :param event: Dict, lease: LeaseHelper
+    :return: Dict
+    """
+    database_name = event.get("input").get("databaseName")
+    redshift_database_name = event.get("input").get("redshiftDatabaseName")
+    batch_size = int(event.get("input").get("groupBatchSize") or os.getenv("GROUP_LOAD_BATCH_SIZE") or 20)
+    retry_attempts = int(os.getenv("GROUP_LOAD_RETRY_ATTEMPTS") or 1)
+
+    outcomes = []
+    loads = []
+    leased_tables = []
+    try:
+        for table in event.get("input").get("tables"):
+            table_name = table.get("tableName")
+
+            response = lease.acquire(database_name, table_name, table.get("leaseToken")) if lease else True
+
+            if response is None:
+                logger.error(f"Error in acquiring lease of {table_name}")
+                outcomes.append({
+                    "tableName": table_name,
+                    "statusCode": 500,
+                    "message": "Error in acquiring table lease"
+                })
+                continue
+            if not response:
+                logger.error(f"{table_name} is being loaded by another execution")
+                outcomes.append({
+                    "tableName": table_name,
+                    "statusCode": 409,
+                    "message": "Table is being loaded by another execution"
+                })
+                continue
+            if lease:
+                leased_tables.append(table_name)
+
+            redshift = get_redshift_service(database_name, table_name, redshift_database_name)
+
+            response = redshift.frame_group_load_queries(
+                schema=database_name,
+                table=table_name,
+                staging_table=table.get("stagingTableName")
+            )
+
+            if response == -1:
+                logger.error(f"Error in fetching schema of {table_name}")
+                outcomes.append({"tableName": table_name, "statusCode": 404, "message": "Error in fetching schema"})
+            elif response == -2:
+                logger.error(f"No primary key found for {table_name}")
+                outcomes.append({"tableName": table_name, "statusCode": 404, "message": "No primary key found"})
+            elif response == -3:
+                logger.error(f"Error in getting columns of {table_name}")
+                outcomes.append({"tableName": table_name, "statusCode": 500, "message": "Error in getting columns"})
+            elif response == -6:
+                logger.error(f"{table_name} uses temporary staging and cannot be loaded in a group")
+                outcomes.append({
+                    "tableName": table_name,
+                    "statusCode": 500,
+                    "message": "Temporary staging table cannot be loaded in a group"
+                })
+            else:
+                loads.append({"tableName": table_name, "queries": response, "service": redshift})
+
+        for index in range(0, len(loads), batch_size):
+            batch = loads[index:index + batch_size]
+            logger.info(f"Loading group of tables: {[load.get('tableName') for load in batch]}")
+            outcomes += batch[0].get("service").execute_incremental_load_group(
+                loads=[{"tableName": load.get("tableName"), "queries": load.get("queries")} for load in batch],
+                retry_attempts=retry_attempts
+            )
+    finally:
+        for table_name in leased_tables:
+            lease.release(database_name, table_name)
+
+    failed_tables = [outcome.get("tableName") for outcome in outcomes if outcome.get("statusCode") != 200]
+
+    if failed_tables:
+        logger.error(f"Error in loading tables of the group: {failed_tables}")
+    else:
+        logger.info("Grouped incremental load executed successfully")
+
+    return {
+        'statusCode': 500 if failed_tables else 200,
+        'message': json.dumps('Error in loading tables of the group') if failed_tables else "SUCCESS",
+        'loadedTables': [outcome.get("tableName") for outcome in outcomes if outcome.get("statusCode") == 200],
+        'tableOutcomes': outcomes
+    }
@@ -4,9 +4,43 @@ Module: redshift_service
 Author: Sourav Hazra
 """
 import json
+import os
+from datetime import datetime
 
+from helpers.dynamodb_helper import DynamoDBHelper
 from helpers.redshift_helper import RedshiftHelper
 from helpers.s3_helper import S3Helper
+from helpers.swap_helper import SwapHelper
+
+
+# Data types hashed as they are, all others are cast to varchar for the row hash
+STRING_DATA_TYPES = ("char", "character", "nchar", "bpchar", "varchar", "character varying", "nvarchar", "text")
+# Data types which cannot be cast to varchar and are hashed as 't' or 'f'
+BOOLEAN_DATA_TYPES = ("boolean", "bool")
+ROW_HASH_NULL = "#NULL#"
+# COPY compression options by data file extension
+COMPRESSION_EXTENSIONS = {
+    ".gz": "GZIP",
+    ".bz2": "BZIP2",
+    ".lzo": "LZOP",
+    ".zst": "ZSTD"
+}
+# Spectrum data types of the Redshift data types not supported in external tables
+SPECTRUM_DATA_TYPES = {
+    "bpchar": "char",
+    "numeric": "decimal",
+    "int2": "smallint",
+    "int4": "int",
+    "int8": "bigint",
+    "float4": "real",
+    "float8": "double precision",
+    "bool": "boolean",
+    "timestamptz": "timestamp"
+}
+# Varchar data types which create_table builds as varchar(65535) when the schema gives no length, while a
+# Spectrum varchar without a length is varchar(256)
+VARCHAR_DATA_TYPES = ("varchar", "character varying", "nvarchar", "text")
+VARCHAR_MAX_LENGTH = 65535
 
 
 class RedshiftService:
@@ -19,11 +53,1289 @@ class RedshiftService:
         self.__s3_bucket_name = dependencies.get("s3").get("bucket_name")
         self.__s3_key_name = dependencies.get("s3").get("s3_key_name")
         self.__s3_schema_key = dependencies.get("s3").get("s3_schema_key")
+        self.__s3_data_bucket_name = dependencies.get("s3").get("data_bucket_name")
+        self.__s3_manifest_key = dependencies.get("s3").get("s3_manifest_key")
+        self.__s3_data_prefix = dependencies.get("s3").get("s3_data_prefix")
         self.__redshift = redshift
+        self.__dynamodb = (dependencies.get("dynamodb") or {}).get("resource")
+        self.__checkpoint_table_name = (dependencies.get("dynamodb") or {}).get("checkpoint_table_name")
         self.__logger = dependencies.get("logger")
         self.__database_name = dependencies.get("redshift_params").get("database_name")
         self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
         self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.__swap_row_ratio = float(dependencies.get("redshift_params").get("swap_row_ratio") or 0.5)
+        self.__iam_role = (dependencies.get("copy_params") or {}).get("iam_role")
+        self.__copy_format = (dependencies.get("copy_params") or {}).get("copy_format") or "CSV"
+        self.__max_errors = int((dependencies.get("copy_params") or {}).get("max_errors") or 0)
+        self.__external_schema = (dependencies.get("spectrum_params") or {}).get("external_schema")
+        self.__external_table_format = (dependencies.get("spectrum_params") or {}).get("table_format") or \
+            "STORED AS PARQUET"
+        self.__partition_column = (dependencies.get("spectrum_params") or {}).get("partition_column") or "delta_date"
+        self.__schema = None
+        self.__checkpoint = None
+
+    def get_table_schema(self):
+        """
+        Fetch the table schema stored in S3. The schema is fetched once per invocation
+        :return: [Dict, -1]
+        """
+        if self.__schema:
+            return self.__schema
+
+        self.__logger.info(
+            f"Fetching schema from {self.__s3_schema_key}"
+        )
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in fetching schema from {self.__s3_schema_key}")
+            return -1
+
+        self.__schema = json.loads(schema)
+        return self.__schema
+
+    def get_load_mode(self):
+        """
+        Get the load mode of the table from the tableConfigurations of the schema. Tables without a load mode
+        are upserted by the incremental load stored procedure
+        :return: [str, -1]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        load_mode = (schema.get("tableConfigurations") or {}).get("loadMode") or "upsert"
+
+        self.__logger.info(f"Load mode of the table is {load_mode}")
+
+        return load_mode.lower()
+
+    def get_staging_mode(self):
+        """
+        Get the staging mode of the table from the tableConfigurations of the schema. In temp mode the staging
+        data is copied into a temporary table in the same session as the load instead of the permanent staging
+        table, in spectrum mode it is read into the temporary table from a Spectrum external table
+        :return: str
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return "permanent"
+
+        return ((schema.get("tableConfigurations") or {}).get("stagingMode") or "permanent").lower()
+
+    @staticmethod
+    def get_primary_key_columns(primary_key):
+        """
+        Split a primary key from the schema config into its columns
+        :param primary_key: str
+        :return: List
+        """
+        return [column.strip().strip('"') for column in primary_key.split(",") if column.strip()]
+
+    def get_checkpoint(self, schema_name, table_name):
+        """
+        Fetch the checkpoint of the table from the checkpoint table. The checkpoint is fetched once per
+        invocation
+        :param schema_name: str, table_name: str
+        :return: [Dict, None]
+        """
+        if self.__checkpoint:
+            return self.__checkpoint
+
+        self.__checkpoint = DynamoDBHelper(dynamodb=self.__dynamodb, logger=self.__logger).get_item(
+            table_name=self.__checkpoint_table_name,
+            partition_key={
+                "key_name": "databaseName",
+                "key_value": schema_name
+            },
+            sort_key={
+                "key_name": "tableName",
+                "key_value": table_name
+            }
+        )
+
+        return self.__checkpoint
+
+    @staticmethod
+    def frame_watermark_condition(column, value, is_timestamp):
+        """
+        Frame the condition selecting the staging rows newer than a checkpoint value
+        :param column: str, value: [str, Decimal], is_timestamp: bool
+        :return: str
+        """
+        if is_timestamp:
+            return f"s.\"{column}\" > '{value}'::timestamp"
+        return f's."{column}" > {value}'
+
+    def get_watermark_predicate(self, **load_args):
+        """
+        Frame the predicate on the staging table selecting the rows newer than the checkpoint the migration
+        started from, using the timestampCheckpointColumn and recordCheckpointColumn of the schema. When the
+        migration moved the checkpoint (changeFlag set) the rows after the previous checkpoint are selected,
+        otherwise the rows after the current one. An empty predicate selects the whole staging table and is
+        returned when the columns are not configured or the checkpoint is not available
+        :param load_args: Dict
+        :return: str
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return ""
+
+        table_configurations = schema.get("tableConfigurations") or {}
+        timestamp_column = table_configurations.get("timestampCheckpointColumn")
+        record_column = table_configurations.get("recordCheckpointColumn")
+
+        if not timestamp_column and not record_column:
+            return ""
+
+        checkpoint = self.get_checkpoint(load_args.get("schema"), load_args.get("table"))
+
+        if not checkpoint:
+            self.__logger.warning("Checkpoint not available, loading the whole staging table")
+            return ""
+
+        prefix = "prevR" if checkpoint.get("changeFlag") else "r"
+        timestamp_checkpoint = checkpoint.get(f"{prefix}edshiftTimestampCheckpoint")
+        record_checkpoint = checkpoint.get(f"{prefix}edshiftRecordCheckpoint")
+
+        conditions = []
+        if timestamp_column and timestamp_checkpoint is not None:
+            conditions.append(self.frame_watermark_condition(timestamp_column, timestamp_checkpoint, True))
+        if record_column and record_checkpoint is not None:
+            conditions.append(self.frame_watermark_condition(record_column, record_checkpoint, False))
+
+        watermark = " AND ".join(conditions)
+
+        self.__logger.info(f"Watermark predicate on staging table: {watermark or 'none'}")
+
+        return watermark
+
+    def frame_deduplication_queries(self, schema, schema_name, staging_table_name, temp_staging=False):
+        """
+        Frame the queries which keep only the latest version of every primary key in the staging table, ordered
+        by the dedupOrderColumn of the schema. Only the keys with several versions are rewritten: their latest
+        version is kept in a temp table, all their versions deleted from the staging table and the latest
+        version inserted back. Whole staging rows are carried through the temp table, so the staging columns
+        outside the schema like migration_type are kept
+        :param schema: Dict, schema_name: str, staging_table_name: str, temp_staging: bool
+        :return: List
+        """
+        primary_key_columns = self.get_primary_key_columns(schema.get("tableConfigurations").get("primaryKey"))
+        order_column = schema.get("tableConfigurations").get("dedupOrderColumn")
+
+        staging_table = staging_table_name if temp_staging else f"{schema_name}.{staging_table_name}"
+        dedup_table = f"{staging_table_name}__dedup"
+        partition_list = ", ".join([f'"{column}"' for column in primary_key_columns])
+        match_condition = " AND ".join(
+            [f'{staging_table}."{column}" = d."{column}"' for column in primary_key_columns]
+        )
+
+        return [
+            f"CREATE TEMP TABLE {dedup_table} AS SELECT * FROM {staging_table} "
+            f"QUALIFY COUNT(*) OVER (PARTITION BY {partition_list}) > 1 "
+            f'AND ROW_NUMBER() OVER (PARTITION BY {partition_list} ORDER BY "{order_column}" DESC NULLS LAST) = 1;',
+            f"DELETE FROM {staging_table} USING {dedup_table} AS d WHERE {match_condition};",
+            f"INSERT INTO {staging_table} SELECT * FROM {dedup_table};"
+        ]
+
+    def deduplicate_staging_table(self, **load_args):
+        """
+        Collapse the staging table to the latest version of every primary key when the schema sets a
+        dedupOrderColumn, and count the rows removed from the rows deleted and inserted back. Temporary staging
+        tables are deduplicated in the session loading them
+        :param load_args: Dict
+        :return: [int, None, -1, -2, -3]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        table_configurations = schema.get("tableConfigurations") or {}
+
+        if not table_configurations.get("dedupOrderColumn") or self.get_staging_mode() in ("temp", "spectrum"):
+            return None
+
+        if not table_configurations.get("primaryKey"):
+            self.__logger.error(f"No primary key found in {self.__s3_schema_key} config file")
+            return -2
+
+        schema_name = load_args.get("schema")
+        staging_table_name = load_args.get("staging_table")
+
+        sql_queries = self.frame_deduplication_queries(schema, schema_name, staging_table_name)
+
+        self.__logger.info(f"Deduplicating {staging_table_name} using: {sql_queries}")
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+        query_id = redshift.run_batch_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            queries=sql_queries,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in deduplicating {staging_table_name}")
+            return -3
+
+        response = redshift.describe_query(query_id)
+
+        if not response:
+            self.__logger.error(f"Error in counting rows removed from {staging_table_name}")
+            return -3
+
+        sub_statements = response.get("SubStatements")
+        rows_removed = sub_statements[1].get("ResultRows") - sub_statements[2].get("ResultRows")
+
+        self.__logger.info(f"Removed {rows_removed} duplicate rows from {staging_table_name}")
+
+        return rows_removed
+
+    @staticmethod
+    def get_row_hash_column(schema):
+        """
+        Get the column of the main table holding the hash of every row, set by rowHashColumn in the
+        tableConfigurations of the schema
+        :param schema: Dict
+        :return: [str, None]
+        """
+        return (schema.get("tableConfigurations") or {}).get("rowHashColumn")
+
+    @staticmethod
+    def frame_row_hash(schema, alias):
+        """
+        Frame the MD5 expression hashing all the schema columns of a row. NULLs are hashed as a marker so
+        they differ from empty strings. Booleans cannot be cast to varchar and are hashed as 't' or 'f'
+        :param schema: Dict, alias: str
+        :return: str
+        """
+        values = []
+        for column, data_type in schema.get("columns").items():
+            value = f'{alias}."{column}"'
+            base_data_type = data_type.lower().split("(")[0].strip()
+            if base_data_type in BOOLEAN_DATA_TYPES:
+                value = f"CASE WHEN {value} THEN 't' WHEN NOT {value} THEN 'f' END"
+            elif base_data_type not in STRING_DATA_TYPES:
+                value = f"CAST({value} AS VARCHAR)"
+            values.append(f"NVL({value}, '{ROW_HASH_NULL}')")
+
+        separator = " || '|' || "
+        return f"MD5({separator.join(values)})"
+
+    def frame_delta_query(self, schema, schema_name, table_name, staging_table_name, watermark="",
+                          temp_staging=False, extra_columns=None):
+        """
+        Frame the query selecting the staging rows to load: the rows matching the watermark predicate and, for
+        tables with a row hash column, whose hash differs from the one of the main table row. The row hash and
+        the extra columns are selected along with the schema columns
+        :param schema: Dict, schema_name: str, table_name: str, staging_table_name: str, watermark: str,
+        temp_staging: bool, extra_columns: List
+        :return: str
+        """
+        row_hash_column = self.get_row_hash_column(schema)
+        select_list = [f's."{column}"' for column in list(schema.get("columns").keys()) + (extra_columns or [])]
+        join = ""
+        conditions = [watermark] if watermark else []
+
+        if row_hash_column:
+            row_hash = self.frame_row_hash(schema, "s")
+            primary_key_columns = self.get_primary_key_columns(schema.get("tableConfigurations").get("primaryKey"))
+            match_condition = " AND ".join([f't."{column}" = s."{column}"' for column in primary_key_columns])
+            select_list.append(f'{row_hash} AS "{row_hash_column}"')
+            join = f" LEFT JOIN {schema_name}.{table_name} AS t ON {match_condition}"
+            conditions.append(f't."{row_hash_column}" IS NULL OR t."{row_hash_column}" <> {row_hash}')
+
+        where = f" WHERE {' AND '.join([f'({condition})' for condition in conditions])}" if conditions else ""
+
+        staging_table = staging_table_name if temp_staging else f"{schema_name}.{staging_table_name}"
+
+        return f"SELECT {', '.join(select_list)} FROM {staging_table} AS s{join}{where}"
+
+    @staticmethod
+    def get_sort_key_columns(schema):
+        """
+        Get the compound sort key columns of the table from the redshiftConfigurations of the schema
+        :param schema: Dict
+        :return: List
+        """
+        for attr, value in (schema.get("redshiftConfigurations") or {}).items():
+            if attr.lower() in ("compoundsortkey", "sortkey"):
+                return RedshiftService.get_primary_key_columns(value)
+        return []
+
+    @staticmethod
+    def frame_literal(field):
+        """
+        Frame a SQL literal from a field of a Redshift Data API result
+        :param field: Dict
+        :return: [str, None]
+        """
+        if field.get("isNull"):
+            return None
+        if "stringValue" in field:
+            value = field.get("stringValue").replace("'", "''")
+            return f"'{value}'"
+        return str(list(field.values())[0])
+
+    def get_primary_key_bounds(self, schema, schema_name, staging_table_name, watermark=""):
+        """
+        Get the smallest and largest value of every primary key column among the staging rows to load. Every
+        main table row matching a staging row lies within these bounds, so they can be added to the predicates
+        on the main table and let Redshift skip the blocks outside them using zone maps. No bounds are returned
+        when they cannot be computed
+        :param schema: Dict, schema_name: str, staging_table_name: str, watermark: str
+        :return: Dict
+        """
+        primary_key_columns = self.get_primary_key_columns(schema.get("tableConfigurations").get("primaryKey"))
+        select_list = ", ".join([f'MIN(s."{column}"), MAX(s."{column}")' for column in primary_key_columns])
+        where = f" WHERE {watermark}" if watermark else ""
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"SELECT {select_list} FROM {schema_name}.{staging_table_name} AS s{where};",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        records = redshift.get_query_results(query_id=query_id) if query_id else None
+
+        if not records:
+            self.__logger.warning(f"Primary key bounds of {staging_table_name} not available")
+            return {}
+
+        bounds = {}
+        for index, column in enumerate(primary_key_columns):
+            lower_bound = self.frame_literal(records[0][2 * index])
+            upper_bound = self.frame_literal(records[0][2 * index + 1])
+            if lower_bound is not None and upper_bound is not None:
+                bounds[column] = (lower_bound, upper_bound)
+
+        self.__logger.info(f"Primary key bounds of {staging_table_name}: {bounds}")
+
+        return bounds
+
+    @staticmethod
+    def frame_bounds_conditions(bounds, alias):
+        """
+        Frame the range conditions of the primary key bounds on a table
+        :param bounds: Dict, alias: str
+        :return: List
+        """
+        return [
+            f'{alias}."{column}" BETWEEN {lower_bound} AND {upper_bound}'
+            for column, (lower_bound, upper_bound) in (bounds or {}).items()
+        ]
+
+    def get_shared_columns(self, schema, schema_name, table_name, staging_table_name):
+        """
+        Get the columns outside the schema which both the main table and the staging table have, like the
+        migration_type column check_columns keeps, so the MERGE writes them as the stored procedure does
+        :param schema: Dict, schema_name: str, table_name: str, staging_table_name: str
+        :return: [List, None]
+        """
+        sql_query = f"SELECT column_name FROM svv_columns WHERE table_schema = '{schema_name}' " \
+                    f"AND table_name IN ('{table_name}', '{staging_table_name}') " \
+                    f"GROUP BY column_name HAVING COUNT(*) = 2 ORDER BY column_name;"
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        records = redshift.get_query_results(query_id=query_id) if query_id else None
+
+        if records is None:
+            self.__logger.error(f"Error in getting columns shared by {table_name} and {staging_table_name}")
+            return None
+
+        schema_columns = set(schema.get("columns").keys()) | {self.get_row_hash_column(schema)}
+        shared_columns = [record[0].get("stringValue") for record in records]
+
+        return [column for column in shared_columns if column not in schema_columns]
+
+    def frame_merge_query(self, schema, target_table, source_table, bounds=None, extra_columns=None):
+        """
+        Frame a MERGE statement from the columns and primary key in the schema which updates the matched rows
+        of the target table and inserts the rest. The row hash column and the extra columns are merged along
+        with the schema columns and the primary key bounds are added to the match condition
+        :param schema: Dict, target_table: str, source_table: str, bounds: Dict, extra_columns: List
+        :return: str
+        """
+        columns = list(schema.get("columns").keys())
+        if self.get_row_hash_column(schema):
+            columns.append(self.get_row_hash_column(schema))
+        columns += extra_columns or []
+        primary_key_columns = self.get_primary_key_columns(schema.get("tableConfigurations").get("primaryKey"))
+
+        match_condition = " AND ".join(
+            [f't."{column}" = s."{column}"' for column in primary_key_columns] +
+            self.frame_bounds_conditions(bounds, "t")
+        )
+        update_columns = [column for column in columns if column not in primary_key_columns] or primary_key_columns
+        update_list = ", ".join([f'"{column}" = s."{column}"' for column in update_columns])
+        insert_list = ", ".join([f'"{column}"' for column in columns])
+        values_list = ", ".join([f's."{column}"' for column in columns])
+
+        return f"MERGE INTO {target_table} AS t USING {source_table} AS s ON {match_condition} " \
+               f"WHEN MATCHED THEN UPDATE SET {update_list} " \
+               f"WHEN NOT MATCHED THEN INSERT ({insert_list}) VALUES ({values_list});"
+
+    def execute_incremental_load_merge(self, **load_args):
+        """
+        Merge the staging table into the main table with a MERGE statement generated from the schema
+        :param load_args: Dict
+        :return: [True, -1, -2, -3]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        if not (schema.get("tableConfigurations") or {}).get("primaryKey"):
+            self.__logger.error(f"No primary key found in {self.__s3_schema_key} config file")
+            return -2
+
+        schema_name = load_args.get("schema")
+        table_name = load_args.get("table")
+        staging_table_name = load_args.get("staging_table")
+
+        extra_columns = self.get_shared_columns(schema, schema_name, table_name, staging_table_name)
+
+        if extra_columns is None:
+            return -3
+
+        watermark = load_args.get("watermark")
+        bounds = self.get_primary_key_bounds(schema, schema_name, staging_table_name, watermark)
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        if watermark or self.get_row_hash_column(schema):
+            delta_table_name = f"{staging_table_name}__delta"
+            delta_query = self.frame_delta_query(
+                schema, schema_name, table_name, staging_table_name, watermark, extra_columns=extra_columns
+            )
+            sql_queries = [
+                f"CREATE TEMP TABLE {delta_table_name} AS {delta_query};",
+                self.frame_merge_query(
+                    schema,
+                    target_table=f"{schema_name}.{table_name}",
+                    source_table=delta_table_name,
+                    bounds=bounds,
+                    extra_columns=extra_columns
+                )
+            ]
+
+            self.__logger.info(f"Merging {staging_table_name} into {table_name} using: {sql_queries}")
+
+            query_results = redshift.run_batch_query(
+                database=self.__database_name,
+                cluster_credentials_secret=self.cluster_credentials_secret,
+                queries=sql_queries,
+                cluster_identifier=self.cluster_identifier
+            )
+        else:
+            sql_query = self.frame_merge_query(
+                schema,
+                target_table=f"{schema_name}.{table_name}",
+                source_table=f"{schema_name}.{staging_table_name}",
+                bounds=bounds,
+                extra_columns=extra_columns
+            )
+
+            self.__logger.info(f"Merging {staging_table_name} into {table_name} using: {sql_query}")
+
+            query_results = redshift.run_query(
+                database=self.__database_name,
+                cluster_credentials_secret=self.cluster_credentials_secret,
+                query=sql_query,
+                cluster_identifier=self.cluster_identifier
+            )
+
+        if not query_results:
+            self.__logger.error(f"Error in merging {staging_table_name} into {table_name}")
+            return -3
+
+        return query_results
+
+    def execute_incremental_load_append(self, **load_args):
+        """
+        Move the rows of the staging table into the main table with ALTER TABLE APPEND. The storage blocks of
+        the staging table are moved to the main table without copying, so it is used for append only tables
+        which need no primary key matching. The staging table is left empty
+        :param load_args: Dict
+        :return: [True, -3]
+        """
+        schema_name = load_args.get("schema")
+        table_name = load_args.get("table")
+        staging_table_name = load_args.get("staging_table")
+
+        sql_query = f"ALTER TABLE {schema_name}.{table_name} APPEND FROM {schema_name}.{staging_table_name};"
+
+        self.__logger.info(f"Appending {staging_table_name} to {table_name} using: {sql_query}")
+
+        query_results = RedshiftHelper(redshift=self.__redshift, logger=self.__logger).run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_results:
+            self.__logger.error(f"Error in appending {staging_table_name} to {table_name}")
+            return -3
+
+        return query_results
+
+    def get_table_row_counts(self, schema_name, table_names):
+        """
+        Get the estimated visible row counts of tables from svv_table_info. Tables without any rows are not
+        listed in svv_table_info and are counted as empty
+        :param schema_name: str, table_names: List
+        :return: [Dict, None]
+        """
+        table_list = ", ".join([f"'{table_name}'" for table_name in table_names])
+        sql_query = f'SELECT "table", estimated_visible_rows FROM svv_table_info ' \
+                    f'WHERE "schema" = \'{schema_name}\' AND "table" IN ({table_list});'
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in fetching row counts of {table_list}")
+            return None
+
+        records = redshift.get_query_results(query_id=query_id)
+
+        if records is None:
+            return None
+
+        row_counts = {table_name: 0 for table_name in table_names}
+        for record in records:
+            row_counts[record[0].get("stringValue")] = record[1].get("longValue") or 0
+
+        return row_counts
+
+    def plan_load_strategy(self, **load_args):
+        """
+        Choose between upserting the staging table into the main table and rebuilding the main table and
+        swapping it in. Rebuilding is chosen when the staging table holds at least swap_row_ratio of the rows
+        of the main table, since deleting and re-inserting most of a table costs more than writing it once.
+        The upsert is used whenever the row counts are not available, and for main tables with views or
+        materialized views depending on them since those stay bound to the table swapped out
+        :param load_args: Dict
+        :return: Dict
+        """
+        schema_name = load_args.get("schema")
+        table_name = load_args.get("table")
+        staging_table_name = load_args.get("staging_table")
+
+        load_plan = {
+            "strategy": "upsert",
+            "targetRows": None,
+            "stagingRows": None,
+            "swapRowRatio": self.__swap_row_ratio
+        }
+
+        row_counts = self.get_table_row_counts(schema_name, [table_name, staging_table_name])
+
+        if row_counts is not None:
+            load_plan["targetRows"] = row_counts.get(table_name)
+            load_plan["stagingRows"] = row_counts.get(staging_table_name)
+
+            if load_plan["stagingRows"] and \
+                    load_plan["stagingRows"] >= load_plan["targetRows"] * self.__swap_row_ratio:
+                load_plan["strategy"] = "swap"
+
+        if load_plan["strategy"] == "swap":
+            swap_helper = SwapHelper(redshift=self.__redshift, logger=self.__logger)
+            load_plan["dependentObjects"] = swap_helper.get_dependent_objects(
+                schema_name,
+                table_name,
+                database=self.__database_name,
+                cluster_credentials_secret=self.cluster_credentials_secret,
+                cluster_identifier=self.cluster_identifier
+            )
+
+            if load_plan["dependentObjects"] != 0:
+                self.__logger.info(f"Upserting {table_name} since objects depend on it or could not be checked")
+                load_plan["strategy"] = "upsert"
+
+        self.__logger.info(f"Load strategy for {table_name}: {json.dumps(load_plan)}")
+
+        return load_plan
+
+    def frame_swap_queries(self, schema, schema_name, table_name, staging_table_name, watermark="",
+                           grant_queries=None, extra_columns=None):
+        """
+        Frame the queries which build a copy of the main table holding its rows not present in the staging
+        table and all the staging rows, and swap the copy in place of the main table. The copy is created with
+        LIKE so the distribution, sort keys and encodings are kept, and gets the owner and grants of the main
+        table from grant_queries once swapped in. The watermark predicate limits the staging rows read, the
+        row hash of the staging rows is computed on insert and the extra columns are copied along with the
+        schema columns
+        :param schema: Dict, schema_name: str, table_name: str, staging_table_name: str, watermark: str,
+        grant_queries: List, extra_columns: List
+        :return: List
+        """
+        columns = ", ".join([f'"{column}"' for column in list(schema.get("columns").keys()) + (extra_columns or [])])
+        target_columns = columns
+        staging_columns = columns
+        if self.get_row_hash_column(schema):
+            target_columns = f'{columns}, "{self.get_row_hash_column(schema)}"'
+            staging_columns = f'{columns}, {self.frame_row_hash(schema, "s")}'
+        primary_key_columns = self.get_primary_key_columns(schema.get("tableConfigurations").get("primaryKey"))
+        match_condition = " AND ".join([f't."{column}" = s."{column}"' for column in primary_key_columns])
+        staging_condition = f" AND {watermark}" if watermark else ""
+        staging_filter = f" WHERE {watermark}" if watermark else ""
+        sort_key_columns = [f's."{column}"' for column in self.get_sort_key_columns(schema)]
+        order_by = f" ORDER BY {', '.join(sort_key_columns)}" if sort_key_columns else ""
+
+        table = f"{schema_name}.{table_name}"
+        swap_table = f"{table_name}__swap"
+        old_table = f"{table_name}__old"
+
+        return [
+            f"DROP TABLE IF EXISTS {schema_name}.{swap_table};",
+            f"CREATE TABLE {schema_name}.{swap_table} (LIKE {table});",
+            f"INSERT INTO {schema_name}.{swap_table} ({target_columns}) SELECT {target_columns} FROM {table} AS t "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {schema_name}.{staging_table_name} AS s "
+            f"WHERE {match_condition}{staging_condition});",
+            f"INSERT INTO {schema_name}.{swap_table} ({target_columns}) SELECT {staging_columns} "
+            f"FROM {schema_name}.{staging_table_name} AS s{staging_filter}{order_by};",
+            f"ALTER TABLE {table} RENAME TO {old_table};",
+            f"ALTER TABLE {schema_name}.{swap_table} RENAME TO {table_name};"
+        ] + (grant_queries or []) + [
+            f"DROP TABLE {schema_name}.{old_table};"
+        ]
+
+    def execute_incremental_load_swap(self, **load_args):
+        """
+        Rebuild the main table from its unchanged rows and the staging table and swap it in with
+        ALTER TABLE RENAME, all in one transaction. The rebuilt table is given the owner and grants of the
+        main table, and keeps the columns outside the schema which the main and staging tables share
+        :param load_args: Dict
+        :return: [str, -1, -2, -3]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        if not (schema.get("tableConfigurations") or {}).get("primaryKey"):
+            self.__logger.error(f"No primary key found in {self.__s3_schema_key} config file")
+            return -2
+
+        schema_name = load_args.get("schema")
+        table_name = load_args.get("table")
+        staging_table_name = load_args.get("staging_table")
+
+        extra_columns = self.get_shared_columns(schema, schema_name, table_name, staging_table_name)
+
+        if extra_columns is None:
+            return -3
+
+        grant_queries = SwapHelper(redshift=self.__redshift, logger=self.__logger).get_grant_queries(
+            schema_name,
+            table_name,
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if grant_queries is None:
+            return -3
+
+        sql_queries = self.frame_swap_queries(
+            schema, schema_name, table_name, staging_table_name, load_args.get("watermark"), grant_queries,
+            extra_columns
+        )
+
+        self.__logger.info(f"Rebuilding and swapping {table_name} using: {sql_queries}")
+
+        query_results = RedshiftHelper(redshift=self.__redshift, logger=self.__logger).run_batch_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            queries=sql_queries,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_results:
+            self.__logger.error(f"Error in rebuilding and swapping {table_name}")
+            return -3
+
+        return query_results
+
+    def get_load_chunks(self):
+        """
+        Get the number of chunks the upsert of the table is split into from the tableConfigurations of the
+        schema. Tables without loadChunks are upserted in one go
+        :return: [int, -1]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        return int((schema.get("tableConfigurations") or {}).get("loadChunks") or 1)
+
+    def frame_chunk_queries(self, schema, schema_name, table_name, staging_table_name, chunk, chunk_count,
+                            watermark="", bounds=None, extra_columns=None):
+        """
+        Frame the delete and insert queries which upsert one chunk of the staging table. Staging rows are
+        assigned to chunks by the hash of their primary key, so every key lands in exactly one chunk. A single
+        chunk covers the whole staging table. The watermark predicate limits the staging rows read. For tables
+        with a row hash column only the main table rows whose hash differs are deleted, and only the staging
+        rows without a main table row left are inserted. The primary key bounds limit the main table blocks
+        scanned and the rows are inserted in sort key order to keep the unsorted region small. The extra
+        columns are inserted along with the schema columns
+        :param schema: Dict, schema_name: str, table_name: str, staging_table_name: str, chunk: int,
+        chunk_count: int, watermark: str, bounds: Dict, extra_columns: List
+        :return: List
+        """
+        column_names = list(schema.get("columns").keys()) + (extra_columns or [])
+        columns = ", ".join([f'"{column}"' for column in column_names])
+        primary_key_columns = self.get_primary_key_columns(schema.get("tableConfigurations").get("primaryKey"))
+
+        table = f"{schema_name}.{table_name}"
+        staging_conditions = []
+        if chunk_count > 1:
+            key_hash = f'FNV_HASH(s."{primary_key_columns[0]}")'
+            for column in primary_key_columns[1:]:
+                key_hash = f'FNV_HASH(s."{column}", {key_hash})'
+            staging_conditions.append(f"ABS(MOD({key_hash}, {chunk_count})) = {chunk}")
+        if watermark:
+            staging_conditions.append(watermark)
+        match_conditions = [f'{table}."{column}" = s."{column}"' for column in primary_key_columns] + \
+            self.frame_bounds_conditions(bounds, table)
+        staging_filter = f" WHERE {' AND '.join(staging_conditions)}" if staging_conditions else ""
+        sort_key_columns = [f's."{column}"' for column in self.get_sort_key_columns(schema)]
+        order_by = f" ORDER BY {', '.join(sort_key_columns)}" if sort_key_columns else ""
+
+        row_hash_column = self.get_row_hash_column(schema)
+        if row_hash_column:
+            row_hash = self.frame_row_hash(schema, "s")
+            staging_columns = ", ".join([f's."{column}"' for column in column_names])
+            join_condition = " AND ".join(
+                [f't."{column}" = s."{column}"' for column in primary_key_columns] +
+                self.frame_bounds_conditions(bounds, "t")
+            )
+            changed_condition = f'({table}."{row_hash_column}" IS NULL OR {table}."{row_hash_column}" <> {row_hash})'
+            insert_conditions = [f't."{primary_key_columns[0]}" IS NULL'] + staging_conditions
+            return [
+                f"DELETE FROM {table} USING {schema_name}.{staging_table_name} AS s "
+                f"WHERE {' AND '.join(match_conditions + staging_conditions + [changed_condition])};",
+                f'INSERT INTO {table} ({columns}, "{row_hash_column}") SELECT {staging_columns}, {row_hash} '
+                f"FROM {schema_name}.{staging_table_name} AS s LEFT JOIN {table} AS t ON {join_condition} "
+                f"WHERE {' AND '.join(insert_conditions)}{order_by};"
+            ]
+
+        return [
+            f"DELETE FROM {table} USING {schema_name}.{staging_table_name} AS s "
+            f"WHERE {' AND '.join(match_conditions + staging_conditions)};",
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {schema_name}.{staging_table_name} AS s"
+            f"{staging_filter}{order_by};"
+        ]
+
+    def execute_incremental_load_chunks(self, **load_args):
+        """
+        Upsert the staging table into the main table chunk by chunk, each chunk in its own transaction. The
+        next chunk to load is recorded in the checkpoint table after every chunk, so a retry of the same
+        migration resumes from the first unfinished chunk, and cleared once all chunks are loaded. Tables
+        without a checkpoint are loaded without recording progress, upserting a chunk again being harmless
+        :param load_args: Dict
+        :return: [True, -1, -2, -3, -4]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        if not (schema.get("tableConfigurations") or {}).get("primaryKey"):
+            self.__logger.error(f"No primary key found in {self.__s3_schema_key} config file")
+            return -2
+
+        schema_name = load_args.get("schema")
+        table_name = load_args.get("table")
+        staging_table_name = load_args.get("staging_table")
+        chunk_count = self.get_load_chunks()
+
+        dynamodb_helper = DynamoDBHelper(dynamodb=self.__dynamodb, logger=self.__logger)
+        checkpoint_key = {
+            "table_name": self.__checkpoint_table_name,
+            "partition_key": {
+                "key_name": "databaseName",
+                "key_value": schema_name
+            },
+            "sort_key": {
+                "key_name": "tableName",
+                "key_value": table_name
+            }
+        }
+
+        extra_columns = self.get_shared_columns(schema, schema_name, table_name, staging_table_name)
+
+        if extra_columns is None:
+            return -3
+
+        checkpoint = self.get_checkpoint(schema_name, table_name)
+
+        if not checkpoint:
+            self.__logger.warning(f"Checkpoint of {table_name} not available, loading without recording progress")
+            checkpoint_key = None
+            checkpoint = {}
+
+        load_progress = {
+            "migrationCheckpoint": checkpoint.get("redshiftMigrationCheckpoint"),
+            "stagingTableName": staging_table_name,
+            "chunkCount": chunk_count,
+            "nextChunk": 0
+        }
+        previous_progress = checkpoint.get("loadChunkProgress") or {}
+
+        if previous_progress.get("migrationCheckpoint") == load_progress.get("migrationCheckpoint") and \
+                previous_progress.get("stagingTableName") == staging_table_name and \
+                int(previous_progress.get("chunkCount") or 0) == chunk_count:
+            load_progress["nextChunk"] = int(previous_progress.get("nextChunk") or 0)
+            self.__logger.info(f"Resuming load of {table_name} from chunk {load_progress['nextChunk']}")
+
+        bounds = self.get_primary_key_bounds(schema, schema_name, staging_table_name, load_args.get("watermark"))
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        for chunk in range(load_progress["nextChunk"], chunk_count):
+            sql_queries = self.frame_chunk_queries(
+                schema, schema_name, table_name, staging_table_name, chunk, chunk_count, load_args.get("watermark"),
+                bounds, extra_columns
+            )
+
+            self.__logger.info(f"Loading chunk {chunk + 1} of {chunk_count} into {table_name} using: {sql_queries}")
+
+            query_results = redshift.run_batch_query(
+                database=self.__database_name,
+                cluster_credentials_secret=self.cluster_credentials_secret,
+                queries=sql_queries,
+                cluster_identifier=self.cluster_identifier
+            )
+
+            if not query_results:
+                self.__logger.error(f"Error in loading chunk {chunk + 1} of {chunk_count} into {table_name}")
+                return -3
+
+            load_progress["nextChunk"] = chunk + 1
+
+            if not checkpoint_key:
+                continue
+
+            response = dynamodb_helper.update_item(
+                **checkpoint_key,
+                update_expression="set loadChunkProgress=:loadChunkProgress",
+                expression_attribute_values={
+                    ":loadChunkProgress": load_progress
+                }
+            )
+
+            if not response:
+                self.__logger.error(f"Error in recording load progress of {table_name}")
+                return -4
+
+        if not checkpoint_key:
+            return True
+
+        # Clear the progress so a later load of the same migration and staging table starts from the first chunk
+        response = dynamodb_helper.update_item(
+            **checkpoint_key,
+            update_expression="set loadChunkProgress=:loadChunkProgress",
+            expression_attribute_values={
+                ":loadChunkProgress": None
+            }
+        )
+
+        if not response:
+            self.__logger.error(f"Error in clearing load progress of {table_name}")
+            return -4
+
+        return True
+
+    @staticmethod
+    def get_compression(urls):
+        """
+        Get the COPY compression option of the data files from their extension
+        :param urls: List
+        :return: [str, None]
+        """
+        compressions = {COMPRESSION_EXTENSIONS.get(os.path.splitext(url)[1].lower(), "") for url in urls}
+
+        if len(compressions) > 1:
+            return None
+
+        return compressions.pop()
+
+    @staticmethod
+    def frame_external_data_type(data_type):
+        """
+        Map a Redshift data type of the schema to the data type of the Spectrum external table column. Varchar
+        columns without a length get the largest length, as in the main table
+        :param data_type: str
+        :return: str
+        """
+        base_type, _, type_args = data_type.partition("(")
+
+        if base_type.strip().lower() in VARCHAR_DATA_TYPES and not type_args:
+            return f"varchar({VARCHAR_MAX_LENGTH})"
+
+        external_type = SPECTRUM_DATA_TYPES.get(base_type.strip().lower())
+
+        if not external_type:
+            return data_type
+
+        return f"{external_type}({type_args}" if type_args else external_type
+
+    def frame_external_table_query(self, schema, table_name):
+        """
+        Frame the query creating the Spectrum external table over the delta files of the table in S3, with a
+        column for every column of the schema and partitioned by the delta date
+        :param schema: Dict, table_name: str
+        :return: str
+        """
+        columns = ", ".join(
+            [f'"{column}" {self.frame_external_data_type(data_type)}' for column, data_type in
+             schema.get("columns").items()]
+        )
+
+        return f"CREATE EXTERNAL TABLE {self.__external_schema}.{table_name} ({columns}) " \
+               f"PARTITIONED BY ({self.__partition_column} varchar(10)) {self.__external_table_format} " \
+               f"LOCATION 's3://{self.__s3_data_bucket_name}/{self.__s3_data_prefix}';"
+
+    def prepare_external_table(self, schema, table_name, delta_date):
+        """
+        Create the Spectrum external table of the table unless it already exists and register the partition of
+        the delta date. External table DDL cannot run inside a transaction block so it runs ahead of the load
+        :param schema: Dict, table_name: str, delta_date: str
+        :return: [str, None]
+        """
+        external_table = f"{self.__external_schema}.{table_name}"
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"SELECT COUNT(*) FROM svv_external_tables WHERE schemaname = '{self.__external_schema}' "
+                  f"AND tablename = '{table_name.lower()}';",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        records = redshift.get_query_results(query_id=query_id) if query_id else None
+
+        if not records:
+            self.__logger.error(f"Error in looking up external table {external_table}")
+            return None
+
+        if not records[0][0].get("longValue"):
+            sql_query = self.frame_external_table_query(schema, table_name)
+
+            self.__logger.info(f"Creating external table {external_table} using: {sql_query}")
+
+            if not redshift.run_query(
+                database=self.__database_name,
+                cluster_credentials_secret=self.cluster_credentials_secret,
+                query=sql_query,
+                cluster_identifier=self.cluster_identifier
+            ):
+                self.__logger.error(f"Error in creating external table {external_table}")
+                return None
+
+        partition = f"{self.__partition_column}={delta_date}"
+
+        if not redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"ALTER TABLE {external_table} ADD IF NOT EXISTS PARTITION ({self.__partition_column} = "
+                  f"'{delta_date}') LOCATION 's3://{self.__s3_data_bucket_name}/{self.__s3_data_prefix}{partition}/';",
+            cluster_identifier=self.cluster_identifier
+        ):
+            self.__logger.error(f"Error in adding partition {partition} to external table {external_table}")
+            return None
+
+        return external_table
+
+    def execute_incremental_load_temp_staging(self, **load_args):
+        """
+        Copy the staging data listed in the manifest written by copy_staging into a temporary table and load it
+        into the main table in the same session, so the staging rows are never written to a permanent table.
+        The temporary table is created like the staging table and copied into as copy_staging copies the
+        staging table, so both modes read the same data files. In spectrum mode the temporary table is filled
+        from the partition of the delta date of the Spectrum external table instead, skipping COPY altogether.
+        The temporary table is deduplicated and filtered as a permanent staging table would be, then merged
+        into the main table, or inserted for append only tables, along with the columns outside the schema
+        shared by the main and staging tables
+        :param load_args: Dict
+        :return: [Dict, -1, -2, -3, -5, -7]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        load_mode = load_args.get("load_mode")
+        table_configurations = schema.get("tableConfigurations") or {}
+
+        if load_mode != "append" and not table_configurations.get("primaryKey"):
+            self.__logger.error(f"No primary key found in {self.__s3_schema_key} config file")
+            return -2
+
+        schema_name = load_args.get("schema")
+        table_name = load_args.get("table")
+        staging_table_name = load_args.get("staging_table")
+        watermark = load_args.get("watermark")
+        temp_table_name = f"{staging_table_name}__temp"
+        columns = ", ".join([f'"{column}"' for column in schema.get("columns").keys()])
+
+        if self.get_staging_mode() == "spectrum":
+            # The external table holds the schema columns only
+            extra_columns = []
+            delta_date = load_args.get("delta_date") or datetime.utcnow().strftime("%Y-%m-%d")
+            external_table = self.prepare_external_table(schema, table_name, delta_date)
+
+            if not external_table:
+                return -7
+
+            load_query = f"INSERT INTO {temp_table_name} ({columns}) SELECT {columns} FROM {external_table} " \
+                         f"WHERE {self.__partition_column} = '{delta_date}';"
+        else:
+            manifest = S3Helper(logger=self.__logger).fetch_object(
+                s3=self.__s3,
+                bucket_name=self.__s3_data_bucket_name,
+                key=self.__s3_manifest_key
+            )
+
+            if not manifest:
+                self.__logger.error(f"Error in fetching manifest from {self.__s3_manifest_key}")
+                return -5
+
+            compression = self.get_compression([entry.get("url") for entry in json.loads(manifest).get("entries")])
+
+            if compression is None:
+                self.__logger.error(f"Data files in {self.__s3_manifest_key} use different compressions")
+                return -5
+
+            copy_options = " ".join(
+                [option for option in (self.__copy_format, compression) if option] +
+                [f"MAXERROR {self.__max_errors}", "COMPUPDATE OFF", "STATUPDATE OFF"]
+            )
+            load_query = f"COPY {temp_table_name} " \
+                         f"FROM 's3://{self.__s3_data_bucket_name}/{self.__s3_manifest_key}' " \
+                         f"IAM_ROLE '{self.__iam_role}' MANIFEST {copy_options};"
+
+            extra_columns = self.get_shared_columns(schema, schema_name, table_name, staging_table_name)
+
+            if extra_columns is None:
+                return -3
+
+        sql_queries = [
+            f"CREATE TEMP TABLE {temp_table_name} (LIKE {schema_name}.{staging_table_name});",
+            load_query
+        ]
+
+        dedup_index = None
+        if load_mode != "append" and table_configurations.get("dedupOrderColumn"):
+            dedup_index = len(sql_queries)
+            sql_queries += self.frame_deduplication_queries(schema, schema_name, temp_table_name, temp_staging=True)
+
+        if load_mode == "append":
+            insert_columns = ", ".join(
+                [f'"{column}"' for column in list(schema.get("columns").keys()) + extra_columns]
+            )
+            sort_key_columns = [f's."{column}"' for column in self.get_sort_key_columns(schema)]
+            staging_filter = f" WHERE {watermark}" if watermark else ""
+            order_by = f" ORDER BY {', '.join(sort_key_columns)}" if sort_key_columns else ""
+            sql_queries.append(
+                f"INSERT INTO {schema_name}.{table_name} ({insert_columns}) SELECT {insert_columns} "
+                f"FROM {temp_table_name} AS s{staging_filter}{order_by};"
+            )
+        else:
+            source_table = temp_table_name
+            if watermark or self.get_row_hash_column(schema):
+                source_table = f"{temp_table_name}__delta"
+                delta_query = self.frame_delta_query(
+                    schema, schema_name, table_name, temp_table_name, watermark, temp_staging=True,
+                    extra_columns=extra_columns
+                )
+                sql_queries.append(f"CREATE TEMP TABLE {source_table} AS {delta_query};")
+            sql_queries.append(
+                self.frame_merge_query(
+                    schema,
+                    target_table=f"{schema_name}.{table_name}",
+                    source_table=source_table,
+                    extra_columns=extra_columns
+                )
+            )
+
+        self.__logger.info(f"Loading {table_name} through {temp_table_name} using: {sql_queries}")
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+        query_id = redshift.run_batch_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            queries=sql_queries,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in loading {table_name} through {temp_table_name}")
+            return -3
+
+        duplicates_removed = 0
+        if dedup_index is not None:
+            sub_statements = (redshift.describe_query(query_id) or {}).get("SubStatements") or []
+            if len(sub_statements) > dedup_index + 2:
+                duplicates_removed = sub_statements[dedup_index + 1].get("ResultRows") - \
+                    sub_statements[dedup_index + 2].get("ResultRows")
+                self.__logger.info(f"Removed {duplicates_removed} duplicate rows from {temp_table_name}")
+
+        return {
+            "duplicatesRemoved": duplicates_removed
+        }
+
+    def frame_group_load_queries(self, **load_args):
+        """
+        Frame the queries loading the staging table into the main table inside the transaction of a grouped
+        load. The staging table is deduplicated and merged into the main table, or inserted into it for append
+        only tables since ALTER TABLE APPEND cannot run inside a transaction block. Temporary staging tables
+        are loaded on their own
+        :param load_args: Dict
+        :return: [List, -1, -2, -3, -6]
+        """
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        if self.get_staging_mode() in ("temp", "spectrum"):
+            self.__logger.error(f"Temporary staging table of {self.__s3_schema_key} cannot be loaded in a group")
+            return -6
+
+        load_mode = self.get_load_mode()
+        table_configurations = schema.get("tableConfigurations") or {}
+
+        if load_mode != "append" and not table_configurations.get("primaryKey"):
+            self.__logger.error(f"No primary key found in {self.__s3_schema_key} config file")
+            return -2
+
+        schema_name = load_args.get("schema")
+        table_name = load_args.get("table")
+        staging_table_name = load_args.get("staging_table")
+        watermark = self.get_watermark_predicate(schema=schema_name, table=table_name)
+
+        sql_queries = []
+
+        if load_mode == "append":
+            columns = ", ".join([f'"{column}"' for column in schema.get("columns").keys()])
+            sort_key_columns = [f's."{column}"' for column in self.get_sort_key_columns(schema)]
+            staging_filter = f" WHERE {watermark}" if watermark else ""
+            order_by = f" ORDER BY {', '.join(sort_key_columns)}" if sort_key_columns else ""
+            sql_queries.append(
+                f"INSERT INTO {schema_name}.{table_name} ({columns}) SELECT {columns} "
+                f"FROM {schema_name}.{staging_table_name} AS s{staging_filter}{order_by};"
+            )
+            return sql_queries
+
+        extra_columns = self.get_shared_columns(schema, schema_name, table_name, staging_table_name)
+
+        if extra_columns is None:
+            return -3
+
+        if table_configurations.get("dedupOrderColumn"):
+            sql_queries += self.frame_deduplication_queries(schema, schema_name, staging_table_name)
+
+        source_table = f"{schema_name}.{staging_table_name}"
+        if watermark or self.get_row_hash_column(schema):
+            source_table = f"{staging_table_name}__delta"
+            delta_query = self.frame_delta_query(
+                schema, schema_name, table_name, staging_table_name, watermark, extra_columns=extra_columns
+            )
+            sql_queries.append(f"CREATE TEMP TABLE {source_table} AS {delta_query};")
+        sql_queries.append(
+            self.frame_merge_query(
+                schema,
+                target_table=f"{schema_name}.{table_name}",
+                source_table=source_table,
+                extra_columns=extra_columns
+            )
+        )
+
+        return sql_queries
+
+    def execute_incremental_load_group(self, **load_args):
+        """
+        Load a group of tables inside one transaction with a single batch, so the group waits for one commit
+        instead of one per table. When the batch fails the whole group is rolled back and every table is
+        retried in a transaction of its own, up to retry_attempts times, so one failing table does not keep
+        the rest of the group from loading
+        :param load_args: Dict
+        :return: List
+        """
+        loads = load_args.get("loads")
+        retry_attempts = load_args.get("retry_attempts")
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        sql_queries = [sql_query for load in loads for sql_query in load.get("queries")]
+
+        self.__logger.info(f"Loading {len(loads)} tables in one transaction using: {sql_queries}")
+
+        query_id = redshift.run_batch_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            queries=sql_queries,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if query_id:
+            return [
+                {"tableName": load.get("tableName"), "statusCode": 200, "message": "SUCCESS", "attempts": 1}
+                for load in loads
+            ]
+
+        self.__logger.warning(f"Grouped load of {len(loads)} tables rolled back, retrying the tables one by one")
+
+        outcomes = []
+        for load in loads:
+            attempts = 1
+            query_id = None
+            while not query_id and attempts <= retry_attempts:
+                attempts += 1
+                query_id = redshift.run_batch_query(
+                    database=self.__database_name,
+                    cluster_credentials_secret=self.cluster_credentials_secret,
+                    queries=load.get("queries"),
+                    cluster_identifier=self.cluster_identifier
+                )
+
+            if not query_id:
+                self.__logger.error(f"Error in loading {load.get('tableName')} after {attempts} attempts")
+
+            outcomes.append({
+                "tableName": load.get("tableName"),
+                "statusCode": 200 if query_id else 500,
+                "message": "SUCCESS" if query_id else "Error in executing SQL query",
+                "attempts": attempts
+            })
+
+        return outcomes
 
     def create_incremental_load_procedure(self):
         """
@@ -80,21 +1392,11 @@ class RedshiftService:
         :param proc_args: Dict
         :return: [True, -1 ,-2 ,-3, -4]
         """
-        self.__logger.info(
-            f"Fetching schema from {self.__s3_schema_key}"
-        )
-        schema = S3Helper(logger=self.__logger).fetch_object(
-            s3=self.__s3,
-            bucket_name=self.__s3_bucket_name,
-            key=self.__s3_schema_key
-        )
+        schema = self.get_table_schema()
 
-        if not schema:
-            self.__logger.error(f"Error in fetching schema from {self.__s3_schema_key}")
+        if schema == -1:
             return -1
 
-        schema = json.loads(schema)
-
         self.__logger.info(
             f"Getting primary key from {self.__s3_schema_key} config file"
         )
@@ -0,0 +1,105 @@
+"""
+Service: key_advisor
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.key_advisor_service import KeyAdvisorService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+s3 = session.resource('s3')
+logger = Logger(service="KeyAdvisor")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to recommend the sort key and distribution of a table from its query history and
+    emit the updated schema config for create_table
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the Lambda event
+        database_name = event.get("input").get("databaseName")
+        table_name = event.get("input").get("tableName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName")
+        offline = event.get("input").get("offline")
+        apply_recommendation = event.get("input").get("applyRecommendation")
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name=table_name)
+
+        # Initialize KeyAdvisorService
+        key_advisor = KeyAdvisorService(
+            redshift=client_redshift,
+            s3={
+                "resource": s3,
+                "bucket_name": os.getenv("S3_BUCKET_NAME"),
+                "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json",
+                "s3_history_export_key": f"{os.getenv('QUERY_HISTORY_EXPORT_PATH')}/{database_name}/{table_name}.json",
+                "s3_recommendation_key": f"{os.getenv('KEY_ADVISOR_OUTPUT_PATH')}/{database_name}/{table_name}.json"
+            },
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            advisor_params={
+                "history_days": int(os.getenv("QUERY_HISTORY_DAYS", "7")),
+                "small_table_rows": int(os.getenv("SMALL_TABLE_ROWS", "1000000"))
+            },
+            logger=logger
+        )
+
+        logger.info("Advising sort key and distribution")
+
+        response = key_advisor.advise_table_keys(
+            schema=database_name,
+            table=table_name,
+            offline=offline,
+            apply=apply_recommendation
+        )
+
+        if response == -1:
+            logger.error("Error in fetching schema")
+            return {
+                'statusCode': 404,
+                'message': json.dumps('Error in fetching schema')
+            }
+        if response == -2:
+            logger.error("Error in getting query history")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in getting query history')
+            }
+        if response == -3:
+            logger.error("Error in recording recommendation")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in recording recommendation')
+            }
+
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'recommendation': {
+                "sortKey": response.get("sortKey"),
+                "distribution": response.get("distribution")
+            }
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
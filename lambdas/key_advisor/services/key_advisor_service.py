@@ -0,0 +1,426 @@
+"""
+Service: key_advisor
+Module: key_advisor_service
+Author: Sourav Hazra
+"""
+import json
+import re
+from copy import deepcopy
+from datetime import datetime
+
+from helpers.redshift_helper import RedshiftHelper
+from helpers.s3_helper import S3Helper
+
+# Comparison operators after a column in a predicate which a zone map can use to skip blocks
+PREDICATE_OPERATORS = r'(=|<>|!=|<=|>=|<|>|\bbetween\b|\bin\b|\blike\b|\bis\b)'
+
+
+class KeyAdvisorService:
+    """
+    Service class to recommend sort keys and distribution keys from the query history of a table
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for KeyAdvisorService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__s3 = dependencies.get("s3").get("resource")
+        self.__s3_bucket_name = dependencies.get("s3").get("bucket_name")
+        self.__s3_schema_key = dependencies.get("s3").get("s3_schema_key")
+        self.__s3_history_export_key = dependencies.get("s3").get("s3_history_export_key")
+        self.__s3_recommendation_key = dependencies.get("s3").get("s3_recommendation_key")
+        self.__redshift = redshift
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.history_days = dependencies.get("advisor_params", {}).get("history_days") or 7
+        self.small_table_rows = dependencies.get("advisor_params", {}).get("small_table_rows") or 1000000
+
+    def get_table_schema(self):
+        """
+        Fetch the table schema stored in S3
+        :return: [Dict, int]
+        """
+        self.__logger.info(f"Getting schema from S3 using key: {self.__s3_schema_key}")
+
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in getting schema from S3 using key: {self.__s3_schema_key}")
+            return -1
+
+        return json.loads(schema)
+
+    def __run_query(self, redshift, sql_query):
+        """
+        Run a SQL query in Redshift and fetch its records
+        :param redshift: RedshiftHelper, sql_query: String
+        :return: [List, None]
+        """
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return None
+
+        return redshift.get_query_results(query_id=query_id)
+
+    def get_query_history(self, schema_name, table_name):
+        """
+        Read the scans of the table from the query history in Redshift along with the query text and the
+        bytes redistributed or broadcast by the same queries
+        :param schema_name: String, table_name: String
+        :return: [Dict, None]
+        """
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        self.__logger.info(f"Getting table statistics of {schema_name}.{table_name}")
+
+        records = self.__run_query(redshift, f"""
+        select table_id, diststyle, sortkey1, tbl_rows from svv_table_info
+        where "schema" = '{schema_name}' and "table" = '{table_name}';
+        """)
+
+        if not records:
+            self.__logger.error(f"Error in getting table statistics of {schema_name}.{table_name}")
+            return None
+
+        table_id, diststyle, sortkey1, tbl_rows = [
+            None if field.get("isNull") else list(field.values())[0] for field in records[0]
+        ]
+
+        self.__logger.info(f"Getting query history of {schema_name}.{table_name} for the last {self.history_days} days")
+
+        records = self.__run_query(redshift, f"""
+        with scans as (
+            select query, sum(rows) as rows, sum(rows_pre_filter) as rows_pre_filter, sum(bytes) as bytes
+            from stl_scan
+            where tbl = {table_id} and starttime >= dateadd(day, -{self.history_days}, getdate())
+            group by query
+        ),
+        redistribution as (
+            select query, sum(bytes) as bytes
+            from svl_query_summary
+            where query in (select query from scans) and (label like 'dist%' or label like 'bcast%')
+            group by query
+        )
+        select s.query, trim(q.querytxt), s.rows, s.rows_pre_filter, s.bytes, nvl(r.bytes, 0)
+        from scans s
+        join stl_query q on q.query = s.query
+        left join redistribution r on r.query = s.query;
+        """)
+
+        if records is None:
+            self.__logger.error(f"Error in getting query history of {schema_name}.{table_name}")
+            return None
+
+        queries = []
+        for record in records:
+            query, query_text, rows, rows_pre_filter, scanned_bytes, redistributed_bytes = [
+                None if field.get("isNull") else list(field.values())[0] for field in record
+            ]
+            queries.append({
+                "query": query,
+                "queryText": query_text or "",
+                "rows": int(rows or 0),
+                "rowsPreFilter": int(rows_pre_filter or 0),
+                "bytes": int(scanned_bytes or 0),
+                "redistributedBytes": int(redistributed_bytes or 0)
+            })
+
+        return {
+            "table": {
+                "diststyle": diststyle,
+                "sortkey1": sortkey1,
+                "tblRows": int(tbl_rows or 0)
+            },
+            "queries": queries
+        }
+
+    def get_exported_query_history(self):
+        """
+        Read an exported copy of the query history of the table from S3 for offline use. The export has the
+        same shape as the output of get_query_history
+        :return: [Dict, None]
+        """
+        self.__logger.info(f"Getting exported query history from S3 using key: {self.__s3_history_export_key}")
+
+        history = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_history_export_key
+        )
+
+        if not history:
+            self.__logger.error(f"Error in getting exported query history using key: {self.__s3_history_export_key}")
+            return None
+
+        return json.loads(history)
+
+    @staticmethod
+    def __find_columns(fragment, columns, follow=""):
+        """
+        Find the table columns referenced in a fragment of SQL text
+        :param fragment: String, columns: List, follow: String
+        :return: Set
+        """
+        found = set()
+        for column_name in columns:
+            pattern = rf'(?<![\w$])"?{re.escape(column_name.lower())}"?(?![\w$])\s*{follow}'
+            if re.search(pattern, fragment):
+                found.add(column_name)
+        return found
+
+    def get_predicate_columns(self, query_text, columns):
+        """
+        Get the columns used in filter predicates and in join conditions of a query
+        :param query_text: String, columns: List
+        :return: (Set, Set)
+        """
+        query_text = " ".join(query_text.lower().split())
+
+        filter_columns = set()
+        for fragment in re.findall(
+                r'\bwhere\b(.*?)(?=\bgroup by\b|\border by\b|\blimit\b|\bunion\b|\bhaving\b|$)', query_text
+        ):
+            filter_columns |= self.__find_columns(fragment, columns, PREDICATE_OPERATORS)
+
+        join_columns = set()
+        for fragment in re.findall(
+                r'\bjoin\b.*?\bon\b(.*?)(?=\bjoin\b|\bwhere\b|\bgroup by\b|\border by\b|\blimit\b|$)', query_text
+        ):
+            join_columns |= self.__find_columns(fragment, columns)
+
+        return filter_columns, join_columns
+
+    def recommend_keys(self, schema, history):
+        """
+        Recommend the sort key and the distribution of a table from its query history. A column filtered on
+        by a query is credited with the bytes the query would not have had to scan had the zone maps pruned
+        the filtered rows, and a column joined on is credited with the bytes redistributed by the query. The
+        current distribution is kept unless the history shows the recommended one saving redistribution
+        :param schema: Dict, history: Dict
+        :return: Dict
+        """
+        columns = list(schema.get("columns").keys())
+        redshift_configurations = schema.get("redshiftConfigurations") or {}
+
+        current_sort_key = next(iter(self.get_sort_key(redshift_configurations)[1]), None)
+        current_dist_key = redshift_configurations.get("distkey")
+        current_dist_style = "key" if current_dist_key else (redshift_configurations.get("diststyle") or "auto").lower()
+
+        scan_savings = {}
+        redistribution_savings = {}
+        join_counts = {}
+        total_bytes = 0
+        for query in history.get("queries"):
+            total_bytes += query.get("bytes")
+            filter_columns, join_columns = self.get_predicate_columns(query.get("queryText"), columns)
+
+            # Fraction of the scanned rows which the filters of the query discarded
+            filtered_fraction = 0
+            if query.get("rowsPreFilter"):
+                filtered_fraction = max(0.0, 1 - query.get("rows") / query.get("rowsPreFilter"))
+
+            for column_name in filter_columns:
+                scan_savings[column_name] = scan_savings.get(column_name, 0) + query.get("bytes") * filtered_fraction
+            for column_name in join_columns:
+                redistribution_savings[column_name] = \
+                    redistribution_savings.get(column_name, 0) + query.get("redistributedBytes")
+                join_counts[column_name] = join_counts.get(column_name, 0) + 1
+
+        recommended_sort_key = current_sort_key
+        if scan_savings:
+            best_sort_key = max(scan_savings, key=scan_savings.get)
+            if scan_savings.get(best_sort_key) > scan_savings.get(current_sort_key, 0):
+                recommended_sort_key = best_sort_key
+
+        estimated_scan_savings = scan_savings.get(recommended_sort_key, 0) - scan_savings.get(current_sort_key, 0)
+
+        # Small tables are copied to every node, otherwise the most expensive join column is collocated
+        recommended_dist_style, recommended_dist_key = current_dist_style, current_dist_key
+        estimated_redistribution_savings = 0
+        if history.get("queries") and history.get("table").get("tblRows") < self.small_table_rows:
+            recommended_dist_style, recommended_dist_key = "all", None
+        elif join_counts:
+            best_dist_key = max(join_counts, key=lambda x: (redistribution_savings.get(x), join_counts.get(x)))
+            if best_dist_key != current_dist_key and redistribution_savings.get(best_dist_key) > 0:
+                recommended_dist_style, recommended_dist_key = "key", best_dist_key
+                estimated_redistribution_savings = redistribution_savings.get(best_dist_key)
+
+        return {
+            "queriesAnalyzed": len(history.get("queries")),
+            "sortKey": {
+                "current": current_sort_key,
+                "recommended": recommended_sort_key,
+                "estimatedScanSavingsBytes": int(estimated_scan_savings),
+                "estimatedScanSavingsPct": round(100 * estimated_scan_savings / total_bytes, 2) if total_bytes else 0
+            },
+            "distribution": {
+                "currentStyle": current_dist_style,
+                "currentKey": current_dist_key,
+                "recommendedStyle": recommended_dist_style,
+                "recommendedKey": recommended_dist_key,
+                "estimatedRedistributionSavingsBytes": int(estimated_redistribution_savings)
+            }
+        }
+
+    @staticmethod
+    def get_sort_key(redshift_configurations):
+        """
+        Get the sort key attribute of the schema config along with its columns, leading column first
+        :param redshift_configurations: Dict
+        :return: (String, List)
+        """
+        for attr, value in redshift_configurations.items():
+            if attr.lower().endswith("sortkey") and value:
+                return attr, [column.strip().strip('"') for column in value.split(",")]
+        return None, []
+
+    @classmethod
+    def get_recommended_sort_key(cls, redshift_configurations, recommendation):
+        """
+        Frame the compound sort key columns with the recommended column replacing the leading column, the
+        other columns of the current key kept after it. Nothing is recommended when the leading column stays
+        the same or when the key is interleaved, the advisor only weighing the leading column of a compound key
+        :param redshift_configurations: Dict, recommendation: Dict
+        :return: [List, None]
+        """
+        sort_key_attr, sort_key_columns = cls.get_sort_key(redshift_configurations)
+        recommended = recommendation.get("sortKey").get("recommended")
+
+        if not recommended or recommended == recommendation.get("sortKey").get("current"):
+            return None
+        if sort_key_attr and sort_key_attr.lower().startswith("interleaved"):
+            return None
+
+        return [recommended] + [column for column in sort_key_columns[1:] if column != recommended]
+
+    @classmethod
+    def apply_recommendation(cls, schema, recommendation):
+        """
+        Frame the schema config with the recommended sort key and distribution for create_table to apply.
+        Only the keys the recommendation changes are rewritten
+        :param schema: Dict, recommendation: Dict
+        :return: Dict
+        """
+        schema = deepcopy(schema)
+        redshift_configurations = schema.get("redshiftConfigurations") or {}
+
+        sort_key_columns = cls.get_recommended_sort_key(redshift_configurations, recommendation)
+        if sort_key_columns:
+            sort_key_attr = cls.get_sort_key(redshift_configurations)[0] or "compoundSortkey"
+            redshift_configurations[sort_key_attr] = ", ".join(sort_key_columns)
+
+        distribution = recommendation.get("distribution")
+        if distribution.get("recommendedStyle") != distribution.get("currentStyle") or \
+                distribution.get("recommendedKey") != distribution.get("currentKey"):
+            for attr in list(redshift_configurations.keys()):
+                if attr.lower() in ("distkey", "diststyle"):
+                    redshift_configurations.pop(attr)
+
+            if distribution.get("recommendedStyle") == "key":
+                redshift_configurations["distkey"] = distribution.get("recommendedKey")
+            else:
+                redshift_configurations["diststyle"] = distribution.get("recommendedStyle")
+
+        schema["redshiftConfigurations"] = redshift_configurations
+        return schema
+
+    @classmethod
+    def get_alter_statements(cls, schema_name, table_name, schema, recommendation):
+        """
+        Frame the statements which apply the recommendation to an existing table
+        :param schema_name: String, table_name: String, schema: Dict, recommendation: Dict
+        :return: List
+        """
+        statements = []
+        sort_key_columns = cls.get_recommended_sort_key(schema.get("redshiftConfigurations") or {}, recommendation)
+        if sort_key_columns:
+            sort_key = ", ".join(f'"{column}"' for column in sort_key_columns)
+            statements.append(f'ALTER TABLE {schema_name}.{table_name} ALTER COMPOUND SORTKEY ({sort_key});')
+
+        distribution = recommendation.get("distribution")
+        if distribution.get("recommendedStyle") == "key":
+            if distribution.get("recommendedKey") != distribution.get("currentKey"):
+                statements.append(
+                    f'ALTER TABLE {schema_name}.{table_name} ALTER DISTKEY "{distribution.get("recommendedKey")}";'
+                )
+        elif distribution.get("recommendedStyle") != distribution.get("currentStyle"):
+            statements.append(
+                f'ALTER TABLE {schema_name}.{table_name} ALTER DISTSTYLE {distribution.get("recommendedStyle").upper()};'
+            )
+        return statements
+
+    def advise_table_keys(self, **table_args):
+        """
+        Recommend the sort key and distribution of a table from its query history and record the
+        recommendation along with the updated schema config in S3
+        :param table_args: Dict
+        :return: [Dict, int]
+        """
+        schema_name = table_args.get("schema")
+        table_name = table_args.get("table")
+
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        if table_args.get("offline"):
+            history = self.get_exported_query_history()
+        else:
+            history = self.get_query_history(schema_name, table_name)
+
+        if not history:
+            return -2
+
+        recommendation = self.recommend_keys(schema, history)
+
+        self.__logger.info(f"Recommendation for {schema_name}.{table_name}: {recommendation}")
+
+        recommendation.update({
+            "schemaName": schema_name,
+            "tableName": table_name,
+            "advisedAt": datetime.utcnow().isoformat(),
+            "alterStatements": self.get_alter_statements(schema_name, table_name, schema, recommendation),
+            "schema": self.apply_recommendation(schema, recommendation)
+        })
+
+        s3_helper = S3Helper(logger=self.__logger)
+
+        response = s3_helper.put_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_recommendation_key,
+            body=json.dumps(recommendation)
+        )
+        if not response:
+            self.__logger.error(f"Error in recording recommendation using key: {self.__s3_recommendation_key}")
+            return -3
+
+        # Replace the schema config so that create_table picks up the recommended keys
+        if table_args.get("apply"):
+            self.__logger.info(f"Applying recommendation to schema using key: {self.__s3_schema_key}")
+            response = s3_helper.put_object(
+                s3=self.__s3,
+                bucket_name=self.__s3_bucket_name,
+                key=self.__s3_schema_key,
+                body=json.dumps(recommendation.get("schema"), indent=4)
+            )
+            if not response:
+                self.__logger.error(f"Error in applying recommendation using key: {self.__s3_schema_key}")
+                return -3
+
+        return recommendation
@@ -1,6 +1,32 @@
+from helpers.retry_policy import RetryPolicy, StatementError
+
+
 class RedshiftHelper:
     def __init__(self, redshift):
         self.__redshift = redshift
+        self.__retry_policy = RetryPolicy()
+
+    def __run_statement(self, **kwargs):
+        try:
+            result = self.__redshift.execute_statement(**kwargs)
+        except Exception as exception:
+            if self.__retry_policy.is_rejected(exception):
+                raise
+            raise StatementError(f"Error in submitting statement: {exception}", transient=False)
+
+        status = "START"
+
+        while status not in ("FINISHED", "FAILED", "ABORTED"):
+            try:
+                response = self.__retry_policy.call(self.__redshift.describe_statement, Id=result.get("Id"))
+            except Exception as exception:
+                raise StatementError(f"Error in describing statement: {exception}", transient=False)
+            status = response.get("Status")
+
+            if status in ("FAILED", "ABORTED"):
+                raise StatementError(response.get("Error") or status)
+
+        return result
 
     def run_query(self, **kwargs):
         """
@@ -9,25 +35,16 @@ class RedshiftHelper:
         :return:
         """
         try:
-            result = self.__redshift.execute_statement(
+            result = self.__retry_policy.call(
+                self.__run_statement,
                 Database=kwargs.get("database"),
                 SecretArn=kwargs.get("cluster_credentials_secret"),
                 Sql=kwargs.get("query"),
                 ClusterIdentifier=kwargs.get("cluster_identifier")
             )
-
-            status = "START"
-
-            while status not in ("FINISHED", "FAILED"):
-                response = self.__redshift.describe_statement(
-                    Id=result.get("Id")
-                )
-                status = response.get("Status")
-
-            if status == "FAILED":
-                print("SQL query failed")
-                return
-
+        except StatementError as exception:
+            print(f"SQL query failed: {exception}")
+            return
         except Exception as exception:
             print(exception)
         else:
@@ -40,11 +57,13 @@ class RedshiftHelper:
         while next_token:
             try:
                 if next_token == 1:
-                    response = self.__redshift.get_statement_result(
+                    response = self.__retry_policy.call(
+                        self.__redshift.get_statement_result,
                         Id=query_id
                     )
                 else:
-                    response = self.__redshift.get_statement_result(
+                    response = self.__retry_policy.call(
+                        self.__redshift.get_statement_result,
                         Id=query_id,
                         NextToken=next_token
                     )
@@ -0,0 +1,80 @@
+"""
+Service: refresh_views
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.view_refresh_service import ViewRefreshService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+logger = Logger(service="RefreshViews")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to refresh the materialized views depending on the tables loaded in this run
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the collated Lambda event
+        database_name = event.get("input").get("databaseName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName") or os.getenv("REDSHIFT_DATABASE_NAME")
+        loaded_tables = event.get("loadedTables") or []
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name="")
+
+        if not loaded_tables:
+            logger.info("No tables loaded in this run")
+            return {
+                'statusCode': 200,
+                'message': "SUCCESS"
+            }
+
+        # Initialize ViewRefreshService
+        view_refresh = ViewRefreshService(
+            redshift=client_redshift,
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            refresh_params={
+                "max_concurrency": int(os.getenv("MV_REFRESH_CONCURRENCY", "4"))
+            },
+            logger=logger
+        )
+
+        response = view_refresh.refresh_views(
+            schema_name=database_name,
+            table_names=loaded_tables
+        )
+
+        if response == -1:
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in getting materialized view dependencies')
+            }
+
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'refresh': response
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
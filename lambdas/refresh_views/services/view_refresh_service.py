@@ -0,0 +1,192 @@
+"""
+Service: refresh_views
+Module: view_refresh_service
+Author: Sourav Hazra
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers.redshift_helper import RedshiftHelper
+
+
+class ViewRefreshService:
+    """
+    Service class to refresh the materialized views depending on the tables loaded in a run
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for ViewRefreshService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__redshift = redshift
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.max_concurrency = dependencies.get("refresh_params", {}).get("max_concurrency") or 4
+
+    def __run_query(self, redshift, sql_query):
+        """
+        Run a SQL query in Redshift and fetch its records
+        :param redshift: RedshiftHelper, sql_query: String
+        :return: [List, None]
+        """
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            return None
+
+        return redshift.get_query_results(query_id=query_id)
+
+    def get_view_dependencies(self):
+        """
+        Get the tables and materialized views every materialized view of the database reads from stv_mv_deps,
+        and whether the view is stale from svv_mv_info
+        :return: [Dict, None]
+        """
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        views = self.__run_query(
+            redshift,
+            f"SELECT TRIM(schema), TRIM(name), is_stale FROM svv_mv_info "
+            f"WHERE TRIM(database_name) = '{self.__database_name}';"
+        )
+
+        if views is None:
+            self.__logger.error("Error in getting materialized views from svv_mv_info")
+            return None
+
+        dependencies = self.__run_query(
+            redshift,
+            f"SELECT TRIM(schema), TRIM(name), TRIM(ref_schema), TRIM(ref_name) FROM stv_mv_deps "
+            f"WHERE TRIM(db_name) = '{self.__database_name}';"
+        )
+
+        if dependencies is None:
+            self.__logger.error("Error in getting materialized view dependencies from stv_mv_deps")
+            return None
+
+        view_dependencies = {}
+        for schema_name, view_name, is_stale in [[field.get("stringValue") for field in view] for view in views]:
+            view_dependencies[f"{schema_name}.{view_name}"] = {
+                "dependsOn": set(),
+                "stale": is_stale == "t"
+            }
+
+        for schema_name, view_name, ref_schema_name, ref_name in [
+            [field.get("stringValue") for field in dependency] for dependency in dependencies
+        ]:
+            view_dependencies.setdefault(f"{schema_name}.{view_name}", {"dependsOn": set(), "stale": True})
+            view_dependencies[f"{schema_name}.{view_name}"]["dependsOn"].add(f"{ref_schema_name}.{ref_name}")
+
+        return view_dependencies
+
+    def plan_refresh(self, view_dependencies, changed_tables):
+        """
+        Find the materialized views reading the changed tables directly or through other materialized views,
+        and group them in topological order: every view comes in a later group than the views it reads, so
+        the views of a group can be refreshed concurrently. Views in a circular dependency, along with the views
+        reading them, cannot be ordered and are returned apart
+        :param view_dependencies: Dict, changed_tables: List
+        :return: (List, List)
+        """
+        affected_views = set()
+        changed = set(changed_tables)
+
+        while True:
+            new_views = {
+                view for view, dependency in view_dependencies.items()
+                if view not in affected_views and dependency.get("dependsOn") & (changed | affected_views)
+            }
+            if not new_views:
+                break
+            affected_views |= new_views
+
+        levels = []
+        remaining_views = set(affected_views)
+        while remaining_views:
+            level = sorted([
+                view for view in remaining_views
+                if not view_dependencies.get(view).get("dependsOn") & remaining_views
+            ])
+            if not level:
+                self.__logger.warning(f"Circular dependencies between materialized views: {remaining_views}")
+                break
+            levels.append(level)
+            remaining_views -= set(level)
+
+        return levels, sorted(remaining_views)
+
+    def refresh_view(self, view):
+        """
+        Refresh a materialized view
+        :param view: String
+        :return: bool
+        """
+        self.__logger.info(f"Refreshing materialized view {view}")
+
+        query_id = RedshiftHelper(redshift=self.__redshift, logger=self.__logger).run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=f"REFRESH MATERIALIZED VIEW {view};",
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in refreshing materialized view {view}")
+            return False
+
+        return True
+
+    def refresh_views(self, **kwargs):
+        """
+        Refresh the materialized views depending on the tables loaded in this run in topological order, with
+        at most max_concurrency refreshes running at a time. Views which are not stale and read no view
+        refreshed in this run are left as they are, and the views reading a view which failed to refresh are
+        skipped, as are the views in a circular dependency
+        :param kwargs: Dict
+        :return: [Dict, -1]
+        """
+        schema_name = kwargs.get("schema_name")
+
+        view_dependencies = self.get_view_dependencies()
+
+        if view_dependencies is None:
+            return -1
+
+        levels, circular_views = self.plan_refresh(
+            view_dependencies,
+            [f"{schema_name}.{table_name}" for table_name in kwargs.get("table_names")]
+        )
+
+        self.__logger.info(f"Materialized views to refresh in order: {levels}")
+
+        refreshed, failed, skipped, up_to_date = [], [], list(circular_views), []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for level in levels:
+                views = []
+                for view in level:
+                    depends_on = view_dependencies.get(view).get("dependsOn")
+                    if depends_on & set(failed + skipped):
+                        self.__logger.warning(f"Skipping {view} as a view it reads failed to refresh")
+                        skipped.append(view)
+                    elif not view_dependencies.get(view).get("stale") and not depends_on & set(refreshed):
+                        up_to_date.append(view)
+                    else:
+                        views.append(view)
+
+                for view, response in zip(views, executor.map(self.refresh_view, views)):
+                    (refreshed if response else failed).append(view)
+
+        return {
+            "refreshed": refreshed,
+            "failed": failed,
+            "skipped": skipped,
+            "upToDate": up_to_date
+        }
@@ -0,0 +1,113 @@
+"""
+Service: restore_table
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.restore_service import RestoreService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+s3 = session.resource('s3')
+dynamodb = session.resource('dynamodb')
+logger = Logger(service="RestoreTable")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to restore a table from its Parquet backups and rewind its checkpoint
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the Lambda event
+        database_name = event.get("input").get("databaseName")
+        table_name = event.get("input").get("tableName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName")
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name=table_name)
+
+        # Initialize RestoreService
+        restore = RestoreService(
+            redshift=client_redshift,
+            s3={
+                "resource": s3,
+                "bucket_name": os.getenv("S3_BUCKET_NAME"),
+                "s3_schema_key": f"{os.getenv('TABLE_SCHEMA_PATH')}/{database_name}/{table_name}.json",
+                "backup_bucket_name": os.getenv("BACKUP_BUCKET_NAME"),
+                "s3_backup_manifest_key": f"{os.getenv('BACKUP_MANIFEST_PATH')}/{database_name}/{table_name}.json"
+            },
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            dynamodb={
+                "resource": dynamodb,
+                "checkpoint_table_name": os.getenv("CHECKPOINT_TABLE_NAME")
+            },
+            restore_params={
+                "iam_role": os.getenv("BACKUP_IAM_ROLE")
+            },
+            logger=logger
+        )
+
+        logger.info("Restoring table from backup")
+        response = restore.restore_table(
+            schema=database_name,
+            table=table_name
+        )
+
+        if response == -1:
+            logger.error("Error in fetching schema")
+            return {
+                'statusCode': 404,
+                'message': json.dumps('Error in fetching schema')
+            }
+        if response == -2:
+            logger.error("No backup found")
+            return {
+                'statusCode': 404,
+                'message': json.dumps('No backup found')
+            }
+        if response == -3:
+            logger.error("Error in restoring table")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in restoring table')
+            }
+        if response == -4:
+            logger.error("Error in rewinding checkpoint")
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in rewinding checkpoint')
+            }
+        if response == -5:
+            logger.error("Backup has no watermark")
+            return {
+                'statusCode': 404,
+                'message': json.dumps('Backup has no watermark')
+            }
+
+        logger.info("Table restored successfully")
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'restoredBackups': response
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
@@ -0,0 +1,297 @@
+"""
+Service: restore_table
+Module: restore_service
+Author: Sourav Hazra
+"""
+import json
+from datetime import datetime
+
+from helpers.dynamodb_helper import DynamoDBHelper
+from helpers.redshift_helper import RedshiftHelper
+from helpers.s3_helper import S3Helper
+from helpers.swap_helper import SwapHelper
+
+
+class RestoreService:
+    """
+    Service class to restore a table from its Parquet backups taken by backup_table
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for RestoreService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__s3 = dependencies.get("s3").get("resource")
+        self.__s3_bucket_name = dependencies.get("s3").get("bucket_name")
+        self.__s3_schema_key = dependencies.get("s3").get("s3_schema_key")
+        self.__s3_backup_bucket_name = dependencies.get("s3").get("backup_bucket_name")
+        self.__s3_backup_manifest_key = dependencies.get("s3").get("s3_backup_manifest_key")
+        self.__redshift = redshift
+        self.__dynamodb = dependencies.get("dynamodb").get("resource")
+        self.__checkpoint_table_name = dependencies.get("dynamodb").get("checkpoint_table_name")
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.__iam_role = dependencies.get("restore_params", {}).get("iam_role")
+
+    def get_table_schema(self):
+        """
+        Fetch the table schema stored in S3
+        :return: [Dict, int]
+        """
+        self.__logger.info(f"Getting schema from S3 using key: {self.__s3_schema_key}")
+
+        schema = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_bucket_name,
+            key=self.__s3_schema_key
+        )
+
+        if not schema:
+            self.__logger.error(f"Error in getting schema from S3 using key: {self.__s3_schema_key}")
+            return -1
+
+        return json.loads(schema)
+
+    def get_backup_manifest(self):
+        """
+        Fetch the backup manifest of the table listing its last full image and the increments taken since
+        :return: [Dict, None]
+        """
+        manifest = S3Helper(logger=self.__logger).fetch_object(
+            s3=self.__s3,
+            bucket_name=self.__s3_backup_bucket_name,
+            key=self.__s3_backup_manifest_key
+        )
+
+        if not manifest:
+            self.__logger.error(f"No backup manifest found at {self.__s3_backup_manifest_key}")
+            return None
+
+        return json.loads(manifest)
+
+    def frame_copy_query(self, table, backup):
+        """
+        Frame the COPY query loading the Parquet files of a backup listed in the manifest written by UNLOAD.
+        All the slices of the cluster load the files in parallel
+        :param table: str, backup: Dict
+        :return: str
+        """
+        return f"COPY {table} FROM '{backup.get('path')}manifest' IAM_ROLE '{self.__iam_role}' " \
+               f"FORMAT AS PARQUET MANIFEST;"
+
+    def frame_restore_queries(self, schema, schema_name, table_name, manifest, grant_queries=None,
+                              in_place=False):
+        """
+        Frame the queries which rebuild the table into a shadow table from its full image, apply the increments
+        taken since in order and swap the shadow table in place of the table. The shadow table is created with
+        LIKE so the distribution, sort keys and encodings are kept, and gets the owner and grants of the table
+        from grant_queries once swapped in. Increments replace the rows with the same primary key, tables
+        without a primary key get the increment rows appended. With in_place the rows of the table are replaced
+        by the rows of the shadow table instead, for tables with views bound to them
+        :param schema: Dict, schema_name: str, table_name: str, manifest: Dict, grant_queries: List,
+        in_place: bool
+        :return: List
+        """
+        table = f"{schema_name}.{table_name}"
+        restore_table = f"{table_name}__restore"
+        increment_table = f"{table_name}__increment"
+        old_table = f"{table_name}__old"
+
+        sql_queries = [
+            f"DROP TABLE IF EXISTS {schema_name}.{restore_table};",
+            f"CREATE TABLE {schema_name}.{restore_table} (LIKE {table});",
+            self.frame_copy_query(f"{schema_name}.{restore_table}", manifest.get("fullImage"))
+        ]
+
+        primary_key = (schema.get("tableConfigurations") or {}).get("primaryKey")
+        primary_key_columns = [
+            column.strip().strip('"') for column in (primary_key or "").split(",") if column.strip()
+        ]
+        match_condition = " AND ".join(
+            [f'{schema_name}.{restore_table}."{column}" = i."{column}"' for column in primary_key_columns]
+        )
+
+        increments = manifest.get("increments") or []
+        if increments and primary_key_columns:
+            sql_queries.append(f"CREATE TEMP TABLE {increment_table} (LIKE {table});")
+
+        for increment in increments:
+            if not primary_key_columns:
+                sql_queries.append(self.frame_copy_query(f"{schema_name}.{restore_table}", increment))
+                continue
+            sql_queries += [
+                f"DELETE FROM {increment_table};",
+                self.frame_copy_query(increment_table, increment),
+                f"DELETE FROM {schema_name}.{restore_table} USING {increment_table} AS i WHERE {match_condition};",
+                f"INSERT INTO {schema_name}.{restore_table} SELECT * FROM {increment_table};"
+            ]
+
+        if in_place:
+            return sql_queries + [
+                f"DELETE FROM {table};",
+                f"INSERT INTO {table} SELECT * FROM {schema_name}.{restore_table};",
+                f"DROP TABLE {schema_name}.{restore_table};"
+            ]
+
+        return sql_queries + [
+            f"ALTER TABLE {table} RENAME TO {old_table};",
+            f"ALTER TABLE {schema_name}.{restore_table} RENAME TO {table_name};"
+        ] + (grant_queries or []) + [
+            f"DROP TABLE {schema_name}.{old_table};"
+        ]
+
+    @staticmethod
+    def get_rewound_checkpoint(checkpoint, watermark):
+        """
+        Get the timestamp checkpoint to load the table from once restored: the backup watermark, or the
+        checkpoint the table was loaded up to when that is older. The rows after it are then reloaded
+        :param checkpoint: str, watermark: str
+        :return: str
+        """
+        try:
+            if checkpoint and datetime.fromisoformat(str(checkpoint)) < datetime.fromisoformat(watermark):
+                return checkpoint
+        except ValueError:
+            pass
+        return watermark
+
+    def rewind_checkpoint(self, database_name, table_name, watermark):
+        """
+        Rewind the timestamp checkpoint of the table to at most the watermark of the restored backup, so the
+        rows loaded after the backup was taken are loaded again. The record checkpoint cannot be derived from
+        the watermark and is cleared, so the rows are selected by the timestamp checkpoint alone
+        :param database_name: str, table_name: str, watermark: str
+        :return: [str, -1]
+        """
+        dynamodb_helper = DynamoDBHelper(dynamodb=self.__dynamodb, logger=self.__logger)
+
+        self.__logger.info("Getting table checkpoint")
+
+        response = dynamodb_helper.get_item(
+            table_name=self.__checkpoint_table_name,
+            partition_key={
+                "key_name": "databaseName",
+                "key_value": database_name
+            },
+            sort_key={
+                "key_name": "tableName",
+                "key_value": table_name
+            }
+        )
+
+        if not response:
+            self.__logger.error("Error in getting table checkpoint")
+            return -1
+
+        # With changeFlag set the last migration moved the checkpoint without loading the rows after the previous one
+        prefix = "prevR" if response.get("changeFlag") else "r"
+        checkpoint = self.get_rewound_checkpoint(response.get(f"{prefix}edshiftTimestampCheckpoint"), watermark)
+
+        self.__logger.info(f"Rewinding checkpoint to {checkpoint}")
+
+        response = dynamodb_helper.update_item(
+            table_name=self.__checkpoint_table_name,
+            partition_key={
+                "key_name": "databaseName",
+                "key_value": database_name
+            },
+            sort_key={
+                "key_name": "tableName",
+                "key_value": table_name
+            },
+            update_expression="set redshiftRecordCheckpoint=:redshiftRecordCheckpoint,"
+                              "prevRedshiftRecordCheckpoint=:redshiftRecordCheckpoint,"
+                              "redshiftTimestampCheckpoint=:redshiftTimestampCheckpoint,"
+                              "prevRedshiftTimestampCheckpoint=:redshiftTimestampCheckpoint,"
+                              "changeFlag=:changeFlag",
+            expression_attribute_values={
+                ":redshiftRecordCheckpoint": None,
+                ":redshiftTimestampCheckpoint": checkpoint,
+                ":changeFlag": 0
+            }
+        )
+
+        if not response:
+            self.__logger.error("Error in rewinding checkpoint")
+            return -1
+        return checkpoint
+
+    def restore_table(self, **restore_args):
+        """
+        Restore the table from its latest backup manifest into a shadow table, swap it in with ALTER TABLE
+        RENAME in one transaction, and rewind the checkpoint of the table to the backup watermark. Tables with
+        views bound to them have their rows replaced in place instead, as dropping the table would fail. Rows
+        hard deleted from the source since the full image come back, as no increment records them
+        :param restore_args: Dict
+        :return: [Dict, -1, -2, -3, -4, -5]
+        """
+        schema_name = restore_args.get("schema")
+        table_name = restore_args.get("table")
+
+        schema = self.get_table_schema()
+
+        if schema == -1:
+            return -1
+
+        manifest = self.get_backup_manifest()
+
+        if not manifest or not manifest.get("fullImage"):
+            return -2
+
+        if not manifest.get("watermark"):
+            self.__logger.error("Backup has no watermark to rewind the checkpoint to")
+            return -5
+
+        swap_helper = SwapHelper(redshift=self.__redshift, logger=self.__logger)
+        redshift_args = {
+            "database": self.__database_name,
+            "cluster_credentials_secret": self.cluster_credentials_secret,
+            "cluster_identifier": self.cluster_identifier
+        }
+
+        dependent_objects = swap_helper.get_dependent_objects(schema_name, table_name, **redshift_args)
+
+        if dependent_objects is None:
+            return -3
+
+        grant_queries = None
+        if not dependent_objects:
+            grant_queries = swap_helper.get_grant_queries(schema_name, table_name, **redshift_args)
+            if grant_queries is None:
+                return -3
+
+        sql_queries = self.frame_restore_queries(
+            schema, schema_name, table_name, manifest, grant_queries=grant_queries, in_place=bool(dependent_objects)
+        )
+
+        self.__logger.info(f"Restoring {table_name} using: {sql_queries}")
+
+        query_id = RedshiftHelper(redshift=self.__redshift, logger=self.__logger).run_batch_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            queries=sql_queries,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in restoring {table_name}")
+            return -3
+
+        checkpoint = self.rewind_checkpoint(schema_name, table_name, manifest.get("watermark"))
+
+        if checkpoint == -1:
+            return -4
+
+        self.__logger.warning(f"Rows hard deleted since {manifest.get('fullImage').get('backedUpAt')} are restored")
+
+        return {
+            "fullImage": manifest.get("fullImage").get("backupId"),
+            "increments": [increment.get("backupId") for increment in manifest.get("increments") or []],
+            "watermark": manifest.get("watermark"),
+            "checkpoint": checkpoint,
+            "hardDeletesRestoredSince": manifest.get("fullImage").get("backedUpAt")
+        }
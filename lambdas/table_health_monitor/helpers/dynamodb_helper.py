@@ -0,0 +1,36 @@
+"""
+Service: table_health_monitor
+Module: dynamodb_helper
+Author: Sourav Hazra
+"""
+
+
+class DynamoDBHelper:
+    """
+    DynamoDB Helper for DynamoDB operations
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for DynamoDB Helper
+        """
+        self.__dynamodb = kwargs.get("dynamodb")
+        self.__logger = kwargs.get("logger")
+
+    def put_item(self, **kwargs):
+        """
+        Write an item to DynamoDB
+        :param kwargs: Dict
+        :return: [None, True]
+        """
+        table = self.__dynamodb.Table(kwargs.get("table_name"))
+        try:
+            response = table.put_item(
+                Item=kwargs.get("item")
+            )
+            if not response:
+                return None
+        except Exception as exception:
+            self.__logger.exception(f"Error encountered in writing item to DynamoDB: {exception}")
+            return None
+        return True
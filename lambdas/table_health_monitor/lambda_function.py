@@ -0,0 +1,92 @@
+"""
+Service: table_health_monitor
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.table_health_service import TableHealthService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+dynamodb = session.resource('dynamodb')
+logger = Logger(service="TableHealthMonitor")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to check the skew, unsorted percentage and stale statistics of the tables loaded
+    in this run and flag the tables which need maintenance
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the collated Lambda event
+        database_name = event.get("input").get("databaseName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName") or os.getenv("REDSHIFT_DATABASE_NAME")
+        loaded_tables = event.get("loadedTables") or []
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name="")
+
+        if not loaded_tables:
+            logger.info("No tables loaded in this run")
+            return {
+                'statusCode': 200,
+                'message': "SUCCESS",
+                'flaggedTables': []
+            }
+
+        # Initialize TableHealthService
+        table_health = TableHealthService(
+            redshift=client_redshift,
+            dynamodb=dynamodb,
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            thresholds={
+                "skew_rows": float(os.getenv("SKEW_ROWS_THRESHOLD", "4")),
+                "unsorted_pct": float(os.getenv("UNSORTED_PCT_THRESHOLD", "20")),
+                "stats_off": float(os.getenv("STATS_OFF_THRESHOLD", "10"))
+            },
+            logger=logger
+        )
+
+        response = table_health.monitor_tables(
+            health_table_name=os.getenv("TABLE_HEALTH_TABLE_NAME"),
+            schema_name=database_name,
+            table_names=loaded_tables
+        )
+
+        if response == -1:
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in getting table health')
+            }
+        if response == -2:
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in recording table health')
+            }
+
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'flaggedTables': response
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
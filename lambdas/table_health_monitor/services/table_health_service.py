@@ -0,0 +1,164 @@
+"""
+Service: table_health_monitor
+Module: table_health_service
+Author: Sourav Hazra
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from helpers.dynamodb_helper import DynamoDBHelper
+from helpers.redshift_helper import RedshiftHelper
+
+
+class TableHealthService:
+    """
+    Service class to monitor the data skew, unsorted region and stale statistics of the loaded tables
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for TableHealthService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__redshift = redshift
+        self.__dynamodb = dependencies.get("dynamodb")
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.skew_rows_threshold = dependencies.get("thresholds", {}).get("skew_rows")
+        if self.skew_rows_threshold is None:
+            self.skew_rows_threshold = 4
+        self.unsorted_pct_threshold = dependencies.get("thresholds", {}).get("unsorted_pct")
+        if self.unsorted_pct_threshold is None:
+            self.unsorted_pct_threshold = 20
+        self.stats_off_threshold = dependencies.get("thresholds", {}).get("stats_off")
+        if self.stats_off_threshold is None:
+            self.stats_off_threshold = 10
+
+    def get_table_health(self, schema_name, table_names):
+        """
+        Get the health metrics of all the given tables from svv_table_info in a single catalog query
+        :param schema_name: String, table_names: List
+        :return: [List, None]
+        """
+        table_list = ",".join([f"'{table_name}'" for table_name in table_names])
+        sql_query = f"""
+        select "table", tbl_rows, skew_rows, unsorted, stats_off, size from svv_table_info
+        where "schema" = '{schema_name}' and "table" in ({table_list});
+        """
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in getting health of tables under {schema_name}")
+            return None
+
+        records = redshift.get_query_results(query_id=query_id)
+
+        if records is None:
+            self.__logger.error(f"Error in getting health of tables under {schema_name}")
+            return None
+
+        table_health = []
+        for record in records:
+            table_name, tbl_rows, skew_rows, unsorted, stats_off, size = [
+                None if field.get("isNull") else list(field.values())[0] for field in record
+            ]
+            table_health.append({
+                "tableName": table_name,
+                "tblRows": int(tbl_rows or 0),
+                "skewRows": float(skew_rows or 0),
+                "unsortedPct": float(unsorted or 0),
+                "statsOff": float(stats_off or 0),
+                "sizeMb": int(size or 0)
+            })
+        return table_health
+
+    def get_recommended_actions(self, health):
+        """
+        Flag the metrics of a table which cross their thresholds along with the action which fixes them
+        :param health: Dict
+        :return: List
+        """
+        actions = []
+        if health.get("skewRows") > self.skew_rows_threshold:
+            actions.append({
+                "metric": "skewRows",
+                "value": health.get("skewRows"),
+                "action": "Change the distribution key or use DISTSTYLE EVEN"
+            })
+        if health.get("unsortedPct") > self.unsorted_pct_threshold:
+            actions.append({
+                "metric": "unsortedPct",
+                "value": health.get("unsortedPct"),
+                "action": "VACUUM SORT ONLY"
+            })
+        if health.get("statsOff") > self.stats_off_threshold:
+            actions.append({
+                "metric": "statsOff",
+                "value": health.get("statsOff"),
+                "action": "ANALYZE"
+            })
+        return actions
+
+    def monitor_tables(self, **kwargs):
+        """
+        Capture the health of the loaded tables, store it as a time series per table in DynamoDB and flag
+        the tables which cross the thresholds
+        :param kwargs: Dict
+        :return: [List, -1, -2]
+        """
+        schema_name = kwargs.get("schema_name")
+        table_names = kwargs.get("table_names")
+
+        self.__logger.info(f"Getting health of {len(table_names)} table(s) under {schema_name}")
+
+        table_health = self.get_table_health(schema_name, table_names)
+
+        if table_health is None:
+            return -1
+
+        dynamodb_helper = DynamoDBHelper(dynamodb=self.__dynamodb, logger=self.__logger)
+        captured_at = datetime.utcnow().isoformat()
+
+        flagged_tables = []
+        for health in table_health:
+            actions = self.get_recommended_actions(health)
+
+            response = dynamodb_helper.put_item(
+                table_name=kwargs.get("health_table_name"),
+                item={
+                    "tableKey": f"{schema_name}.{health.get('tableName')}",
+                    "capturedAt": captured_at,
+                    "tblRows": health.get("tblRows"),
+                    "skewRows": Decimal(str(health.get("skewRows"))),
+                    "unsortedPct": Decimal(str(health.get("unsortedPct"))),
+                    "statsOff": Decimal(str(health.get("statsOff"))),
+                    "sizeMb": health.get("sizeMb"),
+                    "actions": [action.get("action") for action in actions]
+                }
+            )
+
+            if not response:
+                self.__logger.error(f"Error in recording health of {health.get('tableName')}")
+                return -2
+
+            if actions:
+                self.__logger.warning(f"{health.get('tableName')} needs attention: {actions}")
+                flagged_tables.append({
+                    "tableName": health.get("tableName"),
+                    "actions": actions
+                })
+
+        self.__logger.info(f"{len(flagged_tables)} table(s) crossed the thresholds")
+
+        return flagged_tables
@@ -0,0 +1,90 @@
+"""
+Service: table_maintenance
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import json
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.maintenance_service import MaintenanceService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+logger = Logger(service="TableMaintenance")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler to VACUUM and ANALYZE the tables loaded in this run which cross the unsorted,
+    deleted rows and stale statistics thresholds
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the collated Lambda event
+        database_name = event.get("input").get("databaseName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName") or os.getenv("REDSHIFT_DATABASE_NAME")
+        loaded_tables = event.get("loadedTables") or []
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name="")
+
+        if not loaded_tables:
+            logger.info("No tables loaded in this run")
+            return {
+                'statusCode': 200,
+                'message': "SUCCESS"
+            }
+
+        # Keep a margin of the Lambda timeout for the last statement to be polled to completion
+        time_budget = int(os.getenv("MAINTENANCE_TIME_BUDGET_SECONDS", "600"))
+        if context:
+            time_budget = min(time_budget, context.get_remaining_time_in_millis() / 1000 - 60)
+
+        # Initialize MaintenanceService
+        maintenance = MaintenanceService(
+            redshift=client_redshift,
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            thresholds={
+                "unsorted_pct": float(os.getenv("UNSORTED_PCT_THRESHOLD", "20")),
+                "deleted_pct": float(os.getenv("DELETED_PCT_THRESHOLD", "10")),
+                "stats_off": float(os.getenv("STATS_OFF_THRESHOLD", "10")),
+                "mb_per_second": float(os.getenv("VACUUM_MB_PER_SECOND", "50"))
+            },
+            logger=logger
+        )
+
+        response = maintenance.run_maintenance(
+            schema_name=database_name,
+            table_names=loaded_tables,
+            time_budget=time_budget
+        )
+
+        if response == -1:
+            return {
+                'statusCode': 500,
+                'message': json.dumps('Error in getting table statistics')
+            }
+
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'maintenance': response
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
@@ -0,0 +1,177 @@
+"""
+Service: table_maintenance
+Module: maintenance_service
+Author: Sourav Hazra
+"""
+import time
+
+from helpers.redshift_helper import RedshiftHelper
+
+
+class MaintenanceService:
+    """
+    Service class to VACUUM and ANALYZE the loaded tables which need it within a time budget
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for MaintenanceService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__redshift = redshift
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.unsorted_pct_threshold = dependencies.get("thresholds", {}).get("unsorted_pct")
+        if self.unsorted_pct_threshold is None:
+            self.unsorted_pct_threshold = 20
+        self.deleted_pct_threshold = dependencies.get("thresholds", {}).get("deleted_pct")
+        if self.deleted_pct_threshold is None:
+            self.deleted_pct_threshold = 10
+        self.stats_off_threshold = dependencies.get("thresholds", {}).get("stats_off")
+        if self.stats_off_threshold is None:
+            self.stats_off_threshold = 10
+        self.mb_per_second = dependencies.get("thresholds", {}).get("mb_per_second")
+        if self.mb_per_second is None:
+            self.mb_per_second = 50
+
+    def get_table_statistics(self, schema_name, table_names):
+        """
+        Get the unsorted percentage, deleted rows and stale statistics of the given tables from svv_table_info
+        :param schema_name: String, table_names: List
+        :return: [List, None]
+        """
+        table_list = ",".join([f"'{table_name}'" for table_name in table_names])
+        sql_query = f"""
+        select "table", tbl_rows, estimated_visible_rows, unsorted, stats_off, size from svv_table_info
+        where "schema" = '{schema_name}' and "table" in ({table_list});
+        """
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        query_id = redshift.run_query(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            query=sql_query,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        if not query_id:
+            self.__logger.error(f"Error in getting statistics of tables under {schema_name}")
+            return None
+
+        records = redshift.get_query_results(query_id=query_id)
+
+        if records is None:
+            self.__logger.error(f"Error in getting statistics of tables under {schema_name}")
+            return None
+
+        statistics = []
+        for record in records:
+            table_name, tbl_rows, visible_rows, unsorted, stats_off, size = [
+                None if field.get("isNull") else list(field.values())[0] for field in record
+            ]
+            tbl_rows = int(tbl_rows or 0)
+            visible_rows = int(visible_rows or 0)
+            statistics.append({
+                "tableName": table_name,
+                "deletedPct": round(100 * (tbl_rows - visible_rows) / tbl_rows, 2) if tbl_rows else 0,
+                "unsortedPct": float(unsorted or 0),
+                "statsOff": float(stats_off or 0),
+                "sizeMb": int(size or 0)
+            })
+        return statistics
+
+    def plan_maintenance(self, schema_name, statistics):
+        """
+        Pick the maintenance tasks of the tables which cross the thresholds, ordered by their benefit. The
+        benefit of a VACUUM is the data it reclaims or sorts and the benefit of an ANALYZE is the data whose
+        statistics are stale
+        :param schema_name: String, statistics: List
+        :return: List
+        """
+        tasks = []
+        for table in statistics:
+            qualified_name = f"{schema_name}.{table.get('tableName')}"
+            if table.get("deletedPct") > self.deleted_pct_threshold:
+                tasks.append({
+                    "tableName": table.get("tableName"),
+                    "operation": "VACUUM DELETE ONLY",
+                    "query": f"VACUUM DELETE ONLY {qualified_name};",
+                    "benefitMb": table.get("sizeMb") * table.get("deletedPct") / 100
+                })
+            if table.get("unsortedPct") > self.unsorted_pct_threshold:
+                tasks.append({
+                    "tableName": table.get("tableName"),
+                    "operation": "VACUUM SORT ONLY",
+                    "query": f"VACUUM SORT ONLY {qualified_name};",
+                    "benefitMb": table.get("sizeMb") * table.get("unsortedPct") / 100
+                })
+            if table.get("statsOff") > self.stats_off_threshold:
+                tasks.append({
+                    "tableName": table.get("tableName"),
+                    "operation": "ANALYZE PREDICATE COLUMNS",
+                    "query": f"ANALYZE {qualified_name} PREDICATE COLUMNS;",
+                    "benefitMb": table.get("sizeMb") * table.get("statsOff") / 100
+                })
+
+        for task in tasks:
+            task["estimatedSeconds"] = round(task.get("benefitMb") / self.mb_per_second, 2)
+
+        return sorted(tasks, key=lambda x: x.get("benefitMb"), reverse=True)
+
+    def run_maintenance(self, **kwargs):
+        """
+        Run the maintenance tasks of the loaded tables in order of benefit, skipping the tasks which are not
+        estimated to finish within the remaining time budget
+        :param kwargs: Dict
+        :return: [Dict, -1]
+        """
+        schema_name = kwargs.get("schema_name")
+        time_budget = kwargs.get("time_budget")
+        start_time = time.monotonic()
+
+        statistics = self.get_table_statistics(schema_name, kwargs.get("table_names"))
+
+        if statistics is None:
+            return -1
+
+        tasks = self.plan_maintenance(schema_name, statistics)
+
+        self.__logger.info(f"{len(tasks)} maintenance task(s) planned within a budget of {time_budget} seconds")
+
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        completed, failed, deferred = [], [], []
+        for task in tasks:
+            summary = {"tableName": task.get("tableName"), "operation": task.get("operation")}
+
+            remaining_time = time_budget - (time.monotonic() - start_time)
+            if task.get("estimatedSeconds") > remaining_time:
+                self.__logger.info(f"Deferring {task.get('operation')} of {task.get('tableName')} to the next run")
+                deferred.append(summary)
+                continue
+
+            self.__logger.info(f"Running {task.get('operation')} on {task.get('tableName')}")
+
+            query_id = redshift.run_query(
+                database=self.__database_name,
+                cluster_credentials_secret=self.cluster_credentials_secret,
+                query=task.get("query"),
+                cluster_identifier=self.cluster_identifier
+            )
+
+            if not query_id:
+                self.__logger.error(f"Error in running {task.get('operation')} on {task.get('tableName')}")
+                failed.append(summary)
+                continue
+
+            completed.append(summary)
+
+        return {
+            "completed": completed,
+            "failed": failed,
+            "deferred": deferred
+        }
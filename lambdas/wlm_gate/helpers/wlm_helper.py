@@ -0,0 +1,81 @@
+"""
+Service: wlm_gate
+Module: wlm_helper
+Author: Sourav Hazra
+"""
+from helpers.redshift_helper import RedshiftHelper
+
+# User queues of manual WLM (6-13), short query acceleration (14) and the queues of automatic WLM (100+)
+USER_SERVICE_CLASSES = "(service_class BETWEEN 6 AND 14 OR service_class >= 100)"
+
+# Queries queued by other users, the loads of this ETL waiting in the queues must not hold back the next ones
+OTHER_USERS_QUEUED = f"{USER_SERVICE_CLASSES} AND TRIM(state) LIKE 'Queued%' " \
+                     f"AND xid NOT IN (SELECT xid FROM svv_transactions WHERE txn_owner = current_user)"
+
+WLM_QUEUE_STATE_QUERY = f"SELECT " \
+                        f"(SELECT COUNT(*) FROM stv_wlm_query_state WHERE {OTHER_USERS_QUEUED}), " \
+                        f"(SELECT COALESCE(SUM(num_executing_queries), 0) FROM stv_wlm_service_class_state " \
+                        f"WHERE {USER_SERVICE_CLASSES}), " \
+                        f"(SELECT COALESCE(MAX(queue_time), 0) FROM stv_wlm_query_state WHERE {OTHER_USERS_QUEUED});"
+
+
+class WLMHelper:
+    """
+    WLM Helper reading the state of the WLM queues of the cluster to size how many tables may load at once
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Constructor method for WLMHelper
+        :param kwargs: Dict
+        """
+        self.__redshift = kwargs.get("redshift")
+        self.__logger = kwargs.get("logger")
+
+    def get_queue_state(self, **kwargs):
+        """
+        Read the queries queued in the user queues by other users and how long the oldest of them has waited
+        from stv_wlm_query_state, and the queries running in the user queues from stv_wlm_service_class_state
+        :param kwargs: Dict
+        :return: [Dict, None]
+        """
+        redshift = RedshiftHelper(redshift=self.__redshift, logger=self.__logger)
+
+        query_id = redshift.run_query(
+            database=kwargs.get("database"),
+            cluster_credentials_secret=kwargs.get("cluster_credentials_secret"),
+            query=WLM_QUEUE_STATE_QUERY,
+            cluster_identifier=kwargs.get("cluster_identifier")
+        )
+
+        records = redshift.get_query_results(query_id=query_id) if query_id else None
+
+        if not records:
+            self.__logger.error("Error in reading WLM queue state")
+            return None
+
+        queued_queries, running_queries, longest_queue_time = [field.get("longValue") or 0 for field in records[0]]
+
+        return {
+            "queuedQueries": queued_queries,
+            "runningQueries": running_queries,
+            # queue_time is in microseconds
+            "longestQueueSeconds": longest_queue_time // 1000000
+        }
+
+    @staticmethod
+    def get_fan_out_width(queue_state, min_concurrency, max_concurrency, max_queue_seconds):
+        """
+        Size how many tables may load at once: the widest fan-out while nothing waits in the WLM queues, one
+        table less for every queued query, and the narrowest fan-out once a query has waited longer than
+        max_queue_seconds. The widest fan-out is used when the queue state could not be read
+        :param queue_state: Dict, min_concurrency: int, max_concurrency: int, max_queue_seconds: int
+        :return: int
+        """
+        if not queue_state:
+            return max_concurrency
+
+        if queue_state.get("longestQueueSeconds") > max_queue_seconds:
+            return min_concurrency
+
+        return max(min_concurrency, max_concurrency - queue_state.get("queuedQueries"))
@@ -0,0 +1,72 @@
+"""
+Service: wlm_gate
+Module: lambda_function
+Author: Sourav Hazra
+"""
+import os
+
+from aws_lambda_powertools import Logger
+from botocore.client import Config
+import boto3
+
+from services.wlm_gate_service import WLMGateService
+
+# Initialize AWS service connections
+session = boto3.session.Session()
+config = Config(connect_timeout=5, read_timeout=5)
+client_redshift = session.client("redshift-data", config=config)
+logger = Logger(service="WLMGate")
+
+
+def lambda_handler(event, context):
+    """
+    Lambda event handler run before a Redshift step to check the WLM queues of the cluster, and tell Step
+    Functions whether to run the step now or wait waitSeconds and check again
+    :param event:
+    :param context:
+    :return: Dict
+    """
+    try:
+        # Get the input from the Lambda event
+        database_name = event.get("input").get("databaseName")
+        table_name = event.get("input").get("tableName")
+        redshift_database_name = event.get("input").get("redshiftDatabaseName") or os.getenv("REDSHIFT_DATABASE_NAME")
+
+        logger.append_keys(database_name=database_name)
+        logger.append_keys(table_name=table_name)
+
+        # Initialize WLMGateService
+        wlm_gate = WLMGateService(
+            redshift=client_redshift,
+            redshift_params={
+                "database_name": redshift_database_name,
+                "cluster_identifier": os.getenv("CLUSTER_IDENTIFIER"),
+                "cluster_credentials_secret": os.getenv("CLUSTER_CREDENTIALS")
+            },
+            gate_params={
+                "max_queued": int(os.getenv("WLM_GATE_MAX_QUEUED", "2")),
+                "max_queue_seconds": int(os.getenv("WLM_GATE_MAX_QUEUE_SECONDS", "60")),
+                "wait_seconds": int(os.getenv("WLM_GATE_WAIT_SECONDS", "30")),
+                "max_wait_seconds": int(os.getenv("WLM_GATE_MAX_WAIT_SECONDS", "300")),
+                "max_attempts": int(os.getenv("WLM_GATE_MAX_ATTEMPTS", "10")),
+                "min_concurrency": int(os.getenv("FANOUT_MIN_CONCURRENCY", "1")),
+                "max_concurrency": int(os.getenv("FANOUT_MAX_CONCURRENCY", "10"))
+            },
+            logger=logger
+        )
+
+        response = wlm_gate.check_queue_state(
+            attempt=int(event.get("gateAttempt") or 0)
+        )
+
+        return {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            **response
+        }
+    except Exception as exception:
+        logger.exception(f"Exception encountered in lambda function: {exception}")
+        return {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
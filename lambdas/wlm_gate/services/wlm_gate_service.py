@@ -0,0 +1,74 @@
+"""
+Service: wlm_gate
+Module: wlm_gate_service
+Author: Sourav Hazra
+"""
+from helpers.wlm_helper import WLMHelper
+
+
+class WLMGateService:
+    """
+    Service class to hold a Redshift step back while the WLM queues of the cluster are saturated
+    """
+
+    def __init__(self, redshift, **dependencies):
+        """
+        Constructor for WLMGateService
+        :param redshift: Redshift Data API client
+        :param dependencies: Dependent AWS Services
+        """
+        self.__redshift = redshift
+        self.__logger = dependencies.get("logger")
+        self.__database_name = dependencies.get("redshift_params").get("database_name")
+        self.cluster_identifier = dependencies.get("redshift_params").get("cluster_identifier")
+        self.cluster_credentials_secret = dependencies.get("redshift_params").get("cluster_credentials_secret")
+        self.max_queued = dependencies.get("gate_params", {}).get("max_queued")
+        if self.max_queued is None:
+            self.max_queued = 2
+        self.max_queue_seconds = dependencies.get("gate_params", {}).get("max_queue_seconds") or 60
+        self.wait_seconds = dependencies.get("gate_params", {}).get("wait_seconds") or 30
+        self.max_wait_seconds = dependencies.get("gate_params", {}).get("max_wait_seconds") or 300
+        self.max_attempts = dependencies.get("gate_params", {}).get("max_attempts") or 10
+        self.min_concurrency = dependencies.get("gate_params", {}).get("min_concurrency") or 1
+        self.max_concurrency = dependencies.get("gate_params", {}).get("max_concurrency") or 10
+
+    def check_queue_state(self, attempt=0):
+        """
+        Let the step through while at most max_queued queries of other users are queued and none has waited
+        longer than max_queue_seconds, otherwise hold it back for a wait doubling on every attempt. The step is
+        let through when the queue state cannot be read or after max_attempts attempts, so a busy cluster
+        delays the loads but never starves them
+        :param attempt: int
+        :return: Dict
+        """
+        wlm = WLMHelper(redshift=self.__redshift, logger=self.__logger)
+
+        queue_state = wlm.get_queue_state(
+            database=self.__database_name,
+            cluster_credentials_secret=self.cluster_credentials_secret,
+            cluster_identifier=self.cluster_identifier
+        )
+
+        max_concurrency = wlm.get_fan_out_width(
+            queue_state, self.min_concurrency, self.max_concurrency, self.max_queue_seconds
+        )
+
+        if not queue_state:
+            self.__logger.warning("Letting step through without WLM queue state")
+            proceed = True
+        elif attempt >= self.max_attempts:
+            self.__logger.warning(f"Letting step through after {attempt} attempts on a busy cluster")
+            proceed = True
+        else:
+            proceed = queue_state.get("queuedQueries") <= self.max_queued and \
+                queue_state.get("longestQueueSeconds") <= self.max_queue_seconds
+
+        self.__logger.info(f"WLM queue state: {queue_state}, proceed: {proceed}")
+
+        return {
+            "proceed": proceed,
+            "gateAttempt": 0 if proceed else attempt + 1,
+            "waitSeconds": 0 if proceed else min(self.max_wait_seconds, self.wait_seconds * 2 ** attempt),
+            "maxConcurrency": max_concurrency,
+            "queueState": queue_state
+        }
@@ -0,0 +1,182 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from aws_lambda_powertools import Logger
+
+from lambdas.backup_table.services.backup_service import BackupService
+from lambdas.backup_table.lambda_function import lambda_handler
+
+logger = Logger()
+
+
+def get_backup_service():
+    return BackupService(
+        redshift=None,
+        s3={
+            "backup_bucket_name": "backup_bucket",
+            "s3_backup_prefix": "backups/sales/orders/",
+            "s3_backup_manifest_key": "backup_manifests/sales/orders.json"
+        },
+        redshift_params={},
+        backup_params={"iam_role": "arn:aws:iam::123:role/unload"},
+        logger=logger
+    )
+
+
+schema = json.dumps({
+    "columns": {"id": "bigint", "updated_at": "timestamp"},
+    "tableConfigurations": {"primaryKey": "id", "timestampCheckpointColumn": "updated_at"}
+})
+
+
+class TestBackupTable(unittest.TestCase):
+    def test_is_full_backup_due(self):
+        manifest = {"watermarkColumn": "updated_at", "fullImage": {"backedUpAt": "2026-07-01T00:00:00"}}
+        assert BackupService.is_full_backup_due(manifest, "updated_at", datetime(2026, 9, 1)) is False
+        assert BackupService.is_full_backup_due(manifest, "updated_at", datetime(2026, 10, 1)) is True
+        assert BackupService.is_full_backup_due(manifest, None, datetime(2026, 9, 1)) is True
+        assert BackupService.is_full_backup_due({}, "updated_at", datetime(2026, 9, 1)) is True
+
+    def test_frame_unload_query(self):
+        predicate = BackupService.frame_changed_rows_predicate("updated_at", "2026-09-01", "2026-10-01")
+        assert get_backup_service().frame_unload_query(
+            "sales", "orders", predicate, "s3://backup_bucket/backups/sales/orders/incremental-1/", "region", 64
+        ) == "UNLOAD ('SELECT * FROM sales.orders WHERE \"updated_at\" > ''2026-09-01'' " \
+             "AND \"updated_at\" <= ''2026-10-01''') TO 's3://backup_bucket/backups/sales/orders/incremental-1/' " \
+             "IAM_ROLE 'arn:aws:iam::123:role/unload' FORMAT AS PARQUET PARTITION BY (\"region\") INCLUDE " \
+             "MAXFILESIZE 64 MB MANIFEST;"
+
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.run_query')
+    def test_get_max_file_size(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[{"longValue": 4}, {"longValue": 10000}, {"longValue": 1000000}]]
+        assert get_backup_service().get_max_file_size("sales", "orders", 100000) == 250
+        assert get_backup_service().get_max_file_size("sales", "orders", 100) == 5
+
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.run_query')
+    def test_is_watermark_nullable(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[{"stringValue": "NO"}]]
+        assert get_backup_service().is_watermark_nullable("sales", "orders", "updated_at") is False
+        assert "column_name = 'updated_at'" in run_query.call_args.kwargs.get("query")
+        get_query_results.return_value = [[{"stringValue": "YES"}]]
+        assert get_backup_service().is_watermark_nullable("sales", "orders", "updated_at") is True
+        get_query_results.return_value = None
+        assert get_backup_service().is_watermark_nullable("sales", "orders", "updated_at") is None
+
+    @patch('lambdas.backup_table.services.backup_service.BackupService.is_watermark_nullable')
+    @patch('lambdas.backup_table.services.backup_service.S3Helper.put_object')
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.run_query')
+    @patch('lambdas.backup_table.services.backup_service.BackupService.get_max_file_size')
+    @patch('lambdas.backup_table.services.backup_service.BackupService.get_changed_rows')
+    @patch('lambdas.backup_table.services.backup_service.S3Helper.fetch_object')
+    def test_backup_table_nullable_watermark(self, fetch_object, get_changed_rows, get_max_file_size, run_query,
+                                             put_object, is_watermark_nullable):
+        fetch_object.side_effect = [schema, json.dumps({
+            "watermarkColumn": "updated_at",
+            "watermark": "2026-09-01 00:00:00",
+            "fullImage": {"backupId": "full-1", "backedUpAt": datetime.utcnow().isoformat()},
+            "increments": []
+        })]
+        is_watermark_nullable.return_value = True
+        get_changed_rows.return_value = {"rows": 1000, "watermark": "2026-10-01 00:00:00"}
+        get_max_file_size.return_value = 5
+        run_query.return_value = "query_id"
+        put_object.return_value = True
+        response = get_backup_service().backup_table(schema="sales", table="orders")
+        assert response.get("backupType") == "full"
+        get_changed_rows.assert_called_with("sales", "orders", "updated_at", None)
+        assert "WHERE" not in run_query.call_args.kwargs.get("query")
+
+    @patch('lambdas.backup_table.services.backup_service.BackupService.is_watermark_nullable')
+    @patch('lambdas.backup_table.services.backup_service.S3Helper.put_object')
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.run_query')
+    @patch('lambdas.backup_table.services.backup_service.BackupService.get_max_file_size')
+    @patch('lambdas.backup_table.services.backup_service.BackupService.get_changed_rows')
+    @patch('lambdas.backup_table.services.backup_service.S3Helper.fetch_object')
+    def test_backup_table_incremental(self, fetch_object, get_changed_rows, get_max_file_size, run_query,
+                                      put_object, is_watermark_nullable):
+        fetch_object.side_effect = [schema, json.dumps({
+            "watermarkColumn": "updated_at",
+            "watermark": "2026-09-01 00:00:00",
+            "fullImage": {"backupId": "full-1", "backedUpAt": datetime.utcnow().isoformat()},
+            "increments": []
+        })]
+        is_watermark_nullable.return_value = False
+        get_changed_rows.return_value = {"rows": 10, "watermark": "2026-10-01 00:00:00"}
+        get_max_file_size.return_value = 5
+        run_query.return_value = "query_id"
+        put_object.return_value = True
+        response = get_backup_service().backup_table(schema="sales", table="orders")
+        assert response.get("backupType") == "incremental"
+        assert response.get("fromWatermark") == "2026-09-01 00:00:00"
+        get_changed_rows.assert_called_with("sales", "orders", "updated_at", "2026-09-01 00:00:00")
+        manifest = json.loads(put_object.call_args.kwargs.get("body"))
+        assert manifest.get("fullImage").get("backupId") == "full-1"
+        assert manifest.get("watermark") == "2026-10-01 00:00:00"
+        assert manifest.get("increments")[0].get("rows") == 10
+
+    @patch('lambdas.backup_table.services.backup_service.S3Helper.put_object')
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.run_query')
+    @patch('lambdas.backup_table.services.backup_service.BackupService.get_max_file_size')
+    @patch('lambdas.backup_table.services.backup_service.BackupService.get_changed_rows')
+    @patch('lambdas.backup_table.services.backup_service.S3Helper.fetch_object')
+    def test_backup_table_full_image_without_manifest(self, fetch_object, get_changed_rows, get_max_file_size,
+                                                      run_query, put_object):
+        fetch_object.side_effect = [schema, None]
+        get_changed_rows.return_value = {"rows": 1000, "watermark": "2026-10-01 00:00:00"}
+        get_max_file_size.return_value = 5
+        run_query.return_value = "query_id"
+        put_object.return_value = True
+        response = get_backup_service().backup_table(schema="sales", table="orders")
+        assert response.get("backupType") == "full"
+        assert run_query.call_args.kwargs.get("query").startswith("UNLOAD ('SELECT * FROM sales.orders') TO ")
+        manifest = json.loads(put_object.call_args.kwargs.get("body"))
+        assert manifest.get("fullImage").get("backupId") == response.get("backupId")
+        assert manifest.get("increments") == []
+
+    @patch('lambdas.backup_table.services.backup_service.BackupService.is_watermark_nullable')
+    @patch('lambdas.backup_table.services.backup_service.RedshiftHelper.run_query')
+    @patch('lambdas.backup_table.services.backup_service.BackupService.get_changed_rows')
+    @patch('lambdas.backup_table.services.backup_service.S3Helper.fetch_object')
+    def test_backup_table_no_changed_rows(self, fetch_object, get_changed_rows, run_query, is_watermark_nullable):
+        fetch_object.side_effect = [schema, json.dumps({
+            "watermarkColumn": "updated_at",
+            "watermark": "2026-09-01 00:00:00",
+            "fullImage": {"backupId": "full-1", "backedUpAt": datetime.utcnow().isoformat()},
+            "increments": []
+        })]
+        is_watermark_nullable.return_value = False
+        get_changed_rows.return_value = {"rows": 0, "watermark": None}
+        assert get_backup_service().backup_table(schema="sales", table="orders") == {
+            "backupType": "none",
+            "rows": 0,
+            "watermark": "2026-09-01 00:00:00"
+        }
+        run_query.assert_not_called()
+
+    def test_lambda_handler_backup_not_scheduled(self):
+        expected_output = {
+            'statusCode': 200,
+            'message': "SKIPPED"
+        }
+        assert lambda_handler(event={"input": {"monthlyBackUp": 0}}, context=None) == expected_output
+
+    def test_lambda_handler_no_input(self):
+        expected_output = {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+        assert lambda_handler(event={}, context=None) == expected_output
+
+    @patch('lambdas.backup_table.lambda_function.BackupService.backup_table')
+    def test_lambda_handler_unload_unsuccessful(self, backup_table):
+        backup_table.return_value = -4
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in unloading table')
+        }
+        assert lambda_handler(event={"input": {"monthlyBackUp": 1}}, context=None) == expected_output
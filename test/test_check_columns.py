@@ -1,13 +1,13 @@
 import json
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 import boto3
 from aws_lambda_powertools import Logger
 from moto import mock_s3
 
 from lambdas.check_columns.helpers.s3_helper import S3Helper
 from lambdas.check_columns.services.redshift_service import RedshiftService
-from lambdas.check_columns.lambda_function import lambda_handler
+from lambdas.check_columns.lambda_function import get_table_lease, lambda_handler
 
 logger = Logger()
 
@@ -337,6 +337,19 @@ class TestCheckColumns(unittest.TestCase):
         }
         assert lambda_handler(event={"input": {}}, context=None) == expected_output
 
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.make_table_consistent_with_definition')
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.get_table_schema_from_definition')
+    def test_lambda_handler_temp_staging_mode_skips_staging_table(self, get_table_schema_from_definition,
+                                                                  make_table_consistent_with_definition):
+        get_table_schema_from_definition.return_value = {"tableConfigurations": {"stagingMode": "temp"}}
+        make_table_consistent_with_definition.return_value = True
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS"
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+        make_table_consistent_with_definition.assert_called_once()
+
     def test_lambda_handler_no_input(self):
         expected_output = {
             "statusCode": 500,
@@ -344,13 +357,232 @@ class TestCheckColumns(unittest.TestCase):
         }
         assert lambda_handler(event={}, context=None) == expected_output
 
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.widen_varchar_columns')
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.widen_staging_varchar_columns')
     @patch('lambdas.check_columns.lambda_function.RedshiftService.make_table_consistent_with_definition')
     @patch('lambdas.check_columns.lambda_function.RedshiftService.get_table_schema_from_definition')
-    def test_lambda_handler_success(self, get_table_schema_from_definition, make_table_consistent_with_definition):
+    def test_lambda_handler_success(self, get_table_schema_from_definition, make_table_consistent_with_definition,
+                                    widen_staging_varchar_columns, widen_varchar_columns):
         get_table_schema_from_definition.return_value = ""
         make_table_consistent_with_definition.side_effect = [True, True]
+        widen_staging_varchar_columns.return_value = True
+        widen_varchar_columns.return_value = True
         expected_output = {
             'statusCode': 200,
             'message': "SUCCESS"
         }
         assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    def test_get_varchar_length(self):
+        assert RedshiftService.get_varchar_length(100, 25) == 128
+        assert RedshiftService.get_varchar_length(1, 25) == 16
+        assert RedshiftService.get_varchar_length(65000, 25) == 65535
+
+    def test_varchar_headroom_pct_zero(self):
+        redshift = RedshiftService(redshift=None, s3={}, redshift_params={"varchar_headroom_pct": 0}, logger=logger)
+        assert redshift.varchar_headroom_pct == 0
+        assert RedshiftService(redshift=None, s3={}, redshift_params={}, logger=logger).varchar_headroom_pct == 25
+
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.run_query')
+    def test_widen_staging_varchar_columns(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "name"},
+             {"stringValue": "character varying(64)"}],
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "city"},
+             {"stringValue": "character varying(65535)"}],
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "code"},
+             {"stringValue": "character varying(8)"}]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        response = redshift.widen_staging_varchar_columns("database", "schema", "staging_table", {
+            "columns": {"name": "varchar", "city": "varchar", "code": "varchar(8)"}
+        })
+        assert response is True
+        assert run_query.call_count == 2
+        assert 'schema.staging_table ALTER COLUMN "name" TYPE varchar(65535)' in run_query.call_args.kwargs.get("query")
+
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.run_query')
+    def test_widen_staging_varchar_columns_query_error(self, run_query):
+        run_query.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.widen_staging_varchar_columns("database", "schema", "staging_table", {"columns": {}}) == -1
+
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.run_query')
+    def test_widen_varchar_columns_no_right_sized_columns(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "id"}, {"stringValue": "bigint"}],
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "name"},
+             {"stringValue": "character varying(65535)"}]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        response = redshift.widen_varchar_columns("database", "schema", "table", "staging_table", {
+            "columns": {"id": "bigint", "name": "varchar"}
+        })
+        assert response is True
+        assert run_query.call_count == 1
+
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.run_query')
+    def test_widen_varchar_columns_widen_successful(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [
+                [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "name"},
+                 {"stringValue": "character varying(64)"}],
+                [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "city"},
+                 {"stringValue": "character varying(32)"}]
+            ],
+            [
+                [{"longValue": 100}, {"longValue": 20}]
+            ]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        response = redshift.widen_varchar_columns("database", "schema", "table", "staging_table", {
+            "columns": {"name": "varchar", "city": "varchar"}
+        })
+        assert response is True
+        assert run_query.call_count == 3
+        assert 'ALTER COLUMN "name" TYPE varchar(128)' in run_query.call_args.kwargs.get("query")
+
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.run_query')
+    def test_widen_varchar_columns_widen_failure(self, run_query, get_query_results):
+        run_query.side_effect = ["query_id", "query_id", None]
+        get_query_results.side_effect = [
+            [
+                [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "name"},
+                 {"stringValue": "character varying(64)"}]
+            ],
+            [
+                [{"longValue": 100}]
+            ]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        response = redshift.widen_varchar_columns("database", "schema", "table", "staging_table", {
+            "columns": {"name": "varchar"}
+        })
+        assert response == -2
+
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.widen_varchar_columns')
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.widen_staging_varchar_columns')
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.make_table_consistent_with_definition')
+    @patch('lambdas.check_columns.lambda_function.RedshiftService.get_table_schema_from_definition')
+    def test_lambda_handler_error_in_widening_columns(self, get_table_schema_from_definition,
+                                                      make_table_consistent_with_definition,
+                                                      widen_staging_varchar_columns, widen_varchar_columns):
+        get_table_schema_from_definition.return_value = ""
+        make_table_consistent_with_definition.side_effect = [True, True]
+        widen_staging_varchar_columns.return_value = True
+        widen_varchar_columns.return_value = -2
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in widening varchar columns')
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch.object(RedshiftService, '_RedshiftService__add_column')
+    @patch.object(RedshiftService, '_RedshiftService__drop_column')
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.check_columns.services.redshift_service.RedshiftHelper.run_query')
+    def test_make_table_consistent_with_definition_row_hash(self, run_query, get_query_results, drop_column,
+                                                            add_column):
+        run_query.return_value = "some-id"
+        get_query_results.return_value = [
+            [
+                {}, {}, {"col_name": "a"}
+            ]
+        ]
+        add_column.return_value = True
+        drop_column.return_value = True
+        redshift_service = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {"columns": {"a": "bigint"}, "tableConfigurations": {"rowHashColumn": "row_hash"}}
+        assert redshift_service.make_table_consistent_with_definition(
+            None, None, None, schema, row_hash=True
+        ) is True
+        add_column.assert_called_with(None, None, None, {"row_hash": "char(32)"})
+        drop_column.assert_called_with(None, None, None, [])
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.check_columns.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_held(self, acquire):
+        acquire.return_value = False
+        expected_output = {
+            'statusCode': 409,
+            'message': json.dumps('Table is being loaded by another execution')
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales", "tableName": "orders"}},
+                              context=None) == expected_output
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.check_columns.lambda_function.check_columns')
+    @patch('lambdas.check_columns.lambda_function.LeaseHelper.release')
+    @patch('lambdas.check_columns.lambda_function.LeaseHelper.detach')
+    @patch('lambdas.check_columns.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_handed_over(self, acquire, detach, release, check_columns):
+        acquire.return_value = True
+        check_columns.return_value = {'statusCode': 200, 'message': "SUCCESS"}
+        event = {"input": {"databaseName": "sales", "tableName": "orders", "executionId": "execution",
+                           "leaseToken": "create_table"}}
+        response = lambda_handler(event=event, context=None)
+        assert response.get("statusCode") == 200
+        assert response.get("leaseToken") not in (None, "create_table", "execution")
+        acquire.assert_called_with("sales", "orders", "create_table")
+        detach.assert_called_with("sales", "orders")
+        release.assert_not_called()
+
+        check_columns.return_value = {'statusCode': 500, 'message': "Error"}
+        lambda_handler(event=event, context=None)
+        release.assert_called_with("sales", "orders")
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.check_columns.lambda_function.LeaseHelper')
+    def test_get_table_lease_invocation_owner(self, lease_helper):
+        context = MagicMock(aws_request_id="request")
+        context.get_remaining_time_in_millis.return_value = 900000
+        get_table_lease(context)
+        assert lease_helper.call_args.kwargs.get("owner") == "request"
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.check_columns.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_unsuccessful(self, acquire):
+        acquire.return_value = None
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in acquiring table lease')
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales", "tableName": "orders"}},
+                              context=None) == expected_output
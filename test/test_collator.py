@@ -93,3 +93,58 @@ class TestCollator(unittest.TestCase):
         }
 
         assert lambda_handler(event=test_event, context=test_context) == expected_output
+
+    def test_lambda_handler_with_loaded_tables(self):
+        test_event = {
+            "input": {
+                "abc": "xyz"
+            },
+            "jobRunnerOutput": [
+                {
+                    "statusCode": 200,
+                    "tableName": "orders"
+                },
+                {
+                    "statusCode": 200
+                },
+                {
+                    "statusCode": 200,
+                    "tableName": "customers"
+                }
+            ]
+        }
+        test_context = None
+        expected_output = {
+            "input": {
+                "abc": "xyz"
+            },
+            "loadedTables": ["orders", "customers"]
+        }
+
+        assert lambda_handler(event=test_event, context=test_context) == expected_output
+
+    def test_lambda_handler_with_grouped_loaded_tables(self):
+        test_event = {
+            "input": {
+                "abc": "xyz"
+            },
+            "jobRunnerOutput": [
+                {
+                    "statusCode": 200,
+                    "tableName": "orders"
+                },
+                {
+                    "statusCode": 200,
+                    "loadedTables": ["regions", "currencies"]
+                }
+            ]
+        }
+        test_context = None
+        expected_output = {
+            "input": {
+                "abc": "xyz"
+            },
+            "loadedTables": ["orders", "regions", "currencies"]
+        }
+
+        assert lambda_handler(event=test_event, context=test_context) == expected_output
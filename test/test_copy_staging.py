@@ -0,0 +1,268 @@
+import json
+import unittest
+from unittest.mock import patch
+import boto3
+from aws_lambda_powertools import Logger
+from moto import mock_s3
+
+from lambdas.copy_staging.helpers.s3_helper import S3Helper
+from lambdas.copy_staging.services.redshift_service import RedshiftService
+from lambdas.copy_staging.lambda_function import lambda_handler
+
+logger = Logger()
+
+files = [
+    {"key": "staging/sales/orders/part-0000.csv.gz", "size": 100},
+    {"key": "staging/sales/orders/part-0001.csv.gz", "size": 110},
+    {"key": "staging/sales/orders/part-0002.csv.gz", "size": 95},
+    {"key": "staging/sales/orders/part-0003.csv.gz", "size": 300}
+]
+
+
+def get_redshift_service(**copy_params):
+    return RedshiftService(
+        redshift=None,
+        s3={
+            "data_bucket_name": "data_bucket",
+            "s3_data_prefix": "staging/sales/orders/",
+            "s3_manifest_key": "manifests/sales/orders.manifest"
+        },
+        redshift_params={},
+        copy_params=copy_params,
+        logger=logger
+    )
+
+
+class TestCopyStaging(unittest.TestCase):
+    @mock_s3
+    def test_helper_list_objects_without_exception(self):
+        s3 = boto3.resource('s3')
+        bucket = s3.Bucket('sample_bucket')
+        bucket.create(CreateBucketConfiguration={
+            'LocationConstraint': 'ap-south-1',
+        })
+        s3.Object('sample_bucket', 'staging/part-0000.csv').put(Body='1,2')
+        s3.Object('sample_bucket', 'other/part-0000.csv').put(Body='1,2')
+        s3_helper = S3Helper(logger=logger)
+        assert s3_helper.list_objects(s3, bucket_name='sample_bucket', prefix='staging/') == [
+            {"key": "staging/part-0000.csv", "size": 3}
+        ]
+
+    @mock_s3
+    def test_helper_list_objects_with_exception(self):
+        s3 = boto3.resource('s3')
+        s3_helper = S3Helper(logger=logger)
+        assert s3_helper.list_objects(s3, bucket_name='sample_bucket1', prefix='staging/') is None
+
+    @patch('lambdas.copy_staging.services.redshift_service.S3Helper.list_objects')
+    def test_get_data_files_skips_empty_objects(self, list_objects):
+        list_objects.return_value = [
+            {"key": "staging/sales/orders/", "size": 0},
+            {"key": "staging/sales/orders/_SUCCESS", "size": 0},
+            {"key": "staging/sales/orders/part-0000.csv", "size": 10}
+        ]
+        assert get_redshift_service().get_data_files() == [
+            {"key": "staging/sales/orders/part-0000.csv", "size": 10}
+        ]
+
+    @patch('lambdas.copy_staging.services.redshift_service.S3Helper.list_objects')
+    def test_get_data_files_no_files(self, list_objects):
+        list_objects.return_value = []
+        assert get_redshift_service().get_data_files() == -1
+
+    def test_check_file_layout(self):
+        assert get_redshift_service().check_file_layout(files, 4) == {
+            "sliceCount": 4,
+            "fileCount": 4,
+            "totalBytes": 605,
+            "fileCountAligned": True,
+            "recommendedFileCount": 4,
+            "flaggedFiles": ["staging/sales/orders/part-0003.csv.gz"]
+        }
+
+    def test_check_file_layout_not_aligned(self):
+        file_layout = get_redshift_service(size_tolerance_pct="100").check_file_layout(files[:3], 2)
+        assert file_layout.get("fileCountAligned") is False
+        assert file_layout.get("recommendedFileCount") == 4
+        assert file_layout.get("flaggedFiles") == []
+
+    def test_get_compression(self):
+        assert RedshiftService.get_compression(files) == "GZIP"
+        assert RedshiftService.get_compression([{"key": "part-0000.parquet"}]) == ""
+        assert RedshiftService.get_compression(files + [{"key": "part-0004.csv"}]) is None
+
+    def test_frame_manifest(self):
+        assert json.loads(get_redshift_service().frame_manifest(files[:1])) == {
+            "entries": [
+                {
+                    "url": "s3://data_bucket/staging/sales/orders/part-0000.csv.gz",
+                    "mandatory": True,
+                    "meta": {"content_length": 100}
+                }
+            ]
+        }
+
+    def test_frame_copy_query(self):
+        redshift = get_redshift_service(iam_role="arn:aws:iam::123:role/copy", copy_format="CSV IGNOREHEADER 1",
+                                        max_errors="10")
+        assert redshift.frame_copy_query("sales", "orders_staging", "GZIP") == \
+               "COPY sales.orders_staging FROM 's3://data_bucket/manifests/sales/orders.manifest' " \
+               "IAM_ROLE 'arn:aws:iam::123:role/copy' MANIFEST CSV IGNOREHEADER 1 GZIP MAXERROR 10 " \
+               "COMPUPDATE OFF STATUPDATE OFF;"
+
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftHelper.run_query')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftHelper.describe_query')
+    def test_get_load_statistics_with_errors(self, describe_query, run_query, get_query_results):
+        describe_query.return_value = {
+            "RedshiftQueryId": 0,
+            "SubStatements": [{"RedshiftQueryId": 1233}, {"RedshiftQueryId": 1234}]
+        }
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [[{"longValue": 1000}, {"longValue": 1}]],
+            [[{"stringValue": "s3://data_bucket/part-0000.csv.gz"}, {"longValue": 7},
+              {"stringValue": "amount"}, {"stringValue": "Invalid digit"}]]
+        ]
+        assert get_redshift_service().get_load_statistics("copy_id") == {
+            "linesScanned": 1000,
+            "loadErrors": 1,
+            "errors": [{
+                "fileName": "s3://data_bucket/part-0000.csv.gz",
+                "lineNumber": 7,
+                "columnName": "amount",
+                "reason": "Invalid digit"
+            }]
+        }
+        assert "WHERE query = 1234" in run_query.call_args.kwargs.get("query")
+
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_slice_count')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_data_files')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_staging_mode')
+    def test_copy_staging_table_mixed_compression(self, get_staging_mode, get_data_files, get_slice_count):
+        get_staging_mode.return_value = "permanent"
+        get_data_files.return_value = files + [{"key": "staging/sales/orders/part-0004.csv", "size": 100}]
+        get_slice_count.return_value = 4
+        assert get_redshift_service().copy_staging_table(schema="sales", staging_table="orders_staging") == -3
+
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.copy_staging.services.redshift_service.S3Helper.put_object')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_slice_count')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_data_files')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_staging_mode')
+    def test_copy_staging_table_copy_unsuccessful(self, get_staging_mode, get_data_files, get_slice_count, put_object,
+                                                  run_batch_query):
+        get_staging_mode.return_value = "permanent"
+        get_data_files.return_value = files
+        get_slice_count.return_value = 4
+        put_object.return_value = True
+        run_batch_query.return_value = None
+        assert get_redshift_service().copy_staging_table(schema="sales", staging_table="orders_staging") == -5
+
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_load_statistics')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.copy_staging.services.redshift_service.S3Helper.put_object')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_slice_count')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_data_files')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_staging_mode')
+    def test_copy_staging_table_successful(self, get_staging_mode, get_data_files, get_slice_count, put_object,
+                                           run_batch_query, get_load_statistics):
+        get_staging_mode.return_value = "permanent"
+        get_data_files.return_value = files
+        get_slice_count.return_value = 2
+        put_object.return_value = True
+        run_batch_query.return_value = "copy_id"
+        get_load_statistics.return_value = {"linesScanned": 1000, "loadErrors": 0, "errors": []}
+        response = get_redshift_service().copy_staging_table(schema="sales", staging_table="orders_staging")
+        assert response.get("fileCount") == 4
+        assert response.get("linesScanned") == 1000
+        queries = run_batch_query.call_args.kwargs.get("queries")
+        assert queries[0] == "DELETE FROM sales.orders_staging;"
+        assert queries[1].startswith("COPY sales.orders_staging FROM ")
+        get_load_statistics.assert_called_with("copy_id")
+
+    def test_lambda_handler_no_input(self):
+        expected_output = {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+        assert lambda_handler(event={}, context=None) == expected_output
+
+    @patch('lambdas.copy_staging.lambda_function.RedshiftService.copy_staging_table')
+    def test_lambda_handler_no_data_files(self, copy_staging_table):
+        copy_staging_table.return_value = -1
+        expected_output = {
+            'statusCode': 404,
+            'message': json.dumps('No data files found')
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch('lambdas.copy_staging.lambda_function.RedshiftService.copy_staging_table')
+    def test_lambda_handler_successful(self, copy_staging_table):
+        copy_staging_table.return_value = {"fileCount": 4, "loadErrors": 0}
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'loadStatistics': {"fileCount": 4, "loadErrors": 0}
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.copy_staging.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_held(self, acquire):
+        acquire.return_value = False
+        expected_output = {
+            'statusCode': 409,
+            'message': json.dumps('Table is being loaded by another execution')
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales", "tableName": "orders"}},
+                              context=None) == expected_output
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.copy_staging.lambda_function.RedshiftService.copy_staging_table')
+    @patch('lambdas.copy_staging.lambda_function.LeaseHelper.release')
+    @patch('lambdas.copy_staging.lambda_function.LeaseHelper.detach')
+    @patch('lambdas.copy_staging.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_handed_over(self, acquire, detach, release, copy_staging_table):
+        acquire.return_value = True
+        copy_staging_table.return_value = {"fileCount": 4, "loadErrors": 0}
+        event = {"input": {"databaseName": "sales", "tableName": "orders", "executionId": "execution"}}
+        response = lambda_handler(event=event, context=None)
+        assert response.get("statusCode") == 200
+        assert response.get("leaseToken")
+        detach.assert_called_with("sales", "orders")
+        release.assert_not_called()
+
+        copy_staging_table.return_value = -5
+        assert lambda_handler(event=event, context=None).get("statusCode") == 500
+        release.assert_called_with("sales", "orders")
+
+    @patch('lambdas.copy_staging.services.redshift_service.S3Helper.fetch_object')
+    def test_get_staging_mode(self, fetch_object):
+        fetch_object.return_value = json.dumps({"tableConfigurations": {"stagingMode": "TEMP"}})
+        assert get_redshift_service().get_staging_mode() == "temp"
+
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftHelper.run_query')
+    @patch('lambdas.copy_staging.services.redshift_service.S3Helper.put_object')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_slice_count')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_data_files')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_staging_mode')
+    def test_copy_staging_table_temp_staging_mode(self, get_staging_mode, get_data_files, get_slice_count,
+                                                  put_object, run_query):
+        get_staging_mode.return_value = "temp"
+        get_data_files.return_value = files
+        get_slice_count.return_value = 4
+        put_object.return_value = True
+        response = get_redshift_service().copy_staging_table(schema="sales", staging_table="orders_staging")
+        assert response.get("stagingMode") == "temp"
+        put_object.assert_called_once()
+        run_query.assert_not_called()
+
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_data_files')
+    @patch('lambdas.copy_staging.services.redshift_service.RedshiftService.get_staging_mode')
+    def test_copy_staging_table_spectrum_staging_mode(self, get_staging_mode, get_data_files):
+        get_staging_mode.return_value = "spectrum"
+        assert get_redshift_service().copy_staging_table(schema="sales", staging_table="orders_staging") == {
+            "stagingMode": "spectrum"
+        }
+        get_data_files.assert_not_called()
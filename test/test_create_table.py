@@ -252,13 +252,390 @@ class TestCreateTable(unittest.TestCase):
         }
         assert lambda_handler(event={"input": {}}, context=None) == expected_output
 
+    @patch('lambdas.create_table.lambda_function.RedshiftService.widen_staging_varchar_columns')
     @patch('lambdas.create_table.lambda_function.RedshiftService.execute_create_table_stored_procedure')
     @patch('lambdas.create_table.lambda_function.RedshiftService.frame_create_table_stored_procedure')
-    def test_lambda_handler_error_code_success(self, frame_create_table_stored_procedure, execute_create_table_stored_procedure):
+    def test_lambda_handler_error_code_success(self, frame_create_table_stored_procedure, execute_create_table_stored_procedure,
+                                               widen_staging_varchar_columns):
         frame_create_table_stored_procedure.return_value = True
         execute_create_table_stored_procedure.return_value = True
+        widen_staging_varchar_columns.return_value = True
         expected_output = {
             'statusCode': 200,
             'message': "SUCCESS"
         }
-        assert lambda_handler(event={"input": {}}, context=None) == expected_output
\ No newline at end of file
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch('lambdas.create_table.lambda_function.RedshiftService.widen_staging_varchar_columns')
+    @patch('lambdas.create_table.lambda_function.RedshiftService.execute_create_table_stored_procedure')
+    @patch('lambdas.create_table.lambda_function.RedshiftService.frame_create_table_stored_procedure')
+    def test_lambda_handler_error_in_widening_staging_columns(self, frame_create_table_stored_procedure,
+                                                              execute_create_table_stored_procedure,
+                                                              widen_staging_varchar_columns):
+        frame_create_table_stored_procedure.return_value = True
+        execute_create_table_stored_procedure.return_value = True
+        widen_staging_varchar_columns.return_value = -2
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in widening varchar columns')
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    def test_widen_staging_varchar_columns(self, fetch_object, run_query, get_query_results):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "name": "varchar", "city": "varchar", "code": "varchar(8)"}
+        })
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "id"}, {"stringValue": "bigint"}],
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "name"},
+             {"stringValue": "character varying(64)"}],
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "city"},
+             {"stringValue": "character varying(65535)"}],
+            [{"stringValue": "a"}, {"stringValue": "b"}, {"stringValue": "code"},
+             {"stringValue": "character varying(8)"}]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={"database_name": "dev"},
+            logger=logger
+        )
+        assert redshift.widen_staging_varchar_columns(schema="sales", staging_table="orders_staging") is True
+        assert run_query.call_count == 2
+        assert run_query.call_args.kwargs.get("query") == \
+            'ALTER TABLE sales.orders_staging ALTER COLUMN "name" TYPE varchar(65535);'
+
+    def test_varchar_headroom_pct_zero(self):
+        redshift = RedshiftService(redshift=None, s3={}, redshift_params={"varchar_headroom_pct": 0}, logger=logger)
+        assert redshift.varchar_headroom_pct == 0
+
+    def test_get_column_encodings_from_data_types(self):
+        schema = {
+            "columns": {
+                "id": "bigint",
+                "address_line_1": "varchar",
+                "created_at": "timestamp",
+                "is_active": "boolean"
+            },
+            "redshiftConfigurations": {
+                "compoundSortkey": "created_at"
+            }
+        }
+        expected_output = {
+            "id": "az64",
+            "address_line_1": "zstd",
+            "created_at": "raw",
+            "is_active": "raw"
+        }
+        assert RedshiftService.get_column_encodings(schema) == expected_output
+
+    def test_get_column_encodings_with_overrides(self):
+        schema = {
+            "columns": {
+                "id": "bigint",
+                "card_type_name": "varchar"
+            },
+            "redshiftConfigurations": {
+                "columnEncodings": {
+                    "card_type_name": "BYTEDICT",
+                    "unknown_column": "zstd"
+                }
+            }
+        }
+        expected_output = {
+            "id": "az64",
+            "card_type_name": "bytedict"
+        }
+        assert RedshiftService.get_column_encodings(schema) == expected_output
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_frame_create_table_stored_procedure_with_encodings(self, run_query, fetch_object):
+        fetch_object.side_effect = [
+            json.dumps({
+                "columns": {
+                    "id": "bigint",
+                    "created_at": "timestamp"
+                },
+                "redshiftConfigurations": {
+                    "compoundSortkey": "created_at",
+                    "columnEncodings": {
+                        "id": "delta"
+                    }
+                }
+            }),
+            "CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) {table_schema} {redshift_config}"
+        ]
+        run_query.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.frame_create_table_stored_procedure() == "procedure"
+        assert run_query.call_args.kwargs.get("query") == 'CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) ' \
+                                                          '"id" bigint encode delta,"created_at" timestamp encode raw ' \
+                                                          'compound sortkey("created_at")'
+
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_analyze_table_compression_query_unsuccessful(self, run_query):
+        run_query.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.analyze_table_compression(schema="schema", table="table") == -1
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.put_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_analyze_table_compression_successful(self, run_query, get_query_results, put_object):
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [
+                [{"stringValue": "id"}, {"stringValue": "az64"}],
+                [{"stringValue": "address_line_1"}, {"stringValue": "lzo"}]
+            ],
+            [
+                [{"stringValue": "table"}, {"stringValue": "id"}, {"stringValue": "az64"}, {"stringValue": "0.00"}],
+                [{"stringValue": "table"}, {"stringValue": "address_line_1"}, {"stringValue": "zstd"},
+                 {"stringValue": "41.25"}]
+            ]
+        ]
+        put_object.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        response = redshift.analyze_table_compression(schema="schema", table="table")
+        assert response.get("suggestions") == [{
+            "column": "address_line_1",
+            "currentEncoding": "lzo",
+            "suggestedEncoding": "zstd",
+            "estimatedReductionPct": 41.25
+        }]
+        assert response.get("columnEncodings") == {"address_line_1": "zstd"}
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.put_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_analyze_table_compression_report_unsuccessful(self, run_query, get_query_results, put_object):
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [[], []]
+        put_object.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.analyze_table_compression(schema="schema", table="table") == -2
+
+    @patch('lambdas.create_table.lambda_function.RedshiftService.analyze_table_compression')
+    def test_lambda_handler_analyze_compression_unsuccessful(self, analyze_table_compression):
+        analyze_table_compression.return_value = -1
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in analyzing compression')
+        }
+        assert lambda_handler(event={"input": {"mode": "ANALYZE_COMPRESSION"}}, context=None) == expected_output
+
+    @patch('lambdas.create_table.lambda_function.RedshiftService.analyze_table_compression')
+    def test_lambda_handler_analyze_compression_success(self, analyze_table_compression):
+        analyze_table_compression.return_value = {}
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS"
+        }
+        assert lambda_handler(event={"input": {"mode": "ANALYZE_COMPRESSION"}}, context=None) == expected_output
+
+    def test_get_varchar_length(self):
+        assert RedshiftService.get_varchar_length(100, 25) == 128
+        assert RedshiftService.get_varchar_length(0, 25) == 16
+        assert RedshiftService.get_varchar_length(60000, 25) == 65535
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_frame_create_table_stored_procedure_with_varchar_profile(self, run_query, fetch_object):
+        fetch_object.side_effect = [
+            json.dumps({
+                "columns": {
+                    "id": "varchar",
+                    "address_line_1": "varchar"
+                },
+                "redshiftConfigurations": {
+                    "columnEncodings": {
+                        "id": "zstd"
+                    }
+                }
+            }),
+            json.dumps({
+                "columns": {
+                    "id": 36
+                }
+            }),
+            "CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) {table_schema}"
+        ]
+        run_query.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={
+                "s3_varchar_profile_key": "profile.json"
+            },
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.frame_create_table_stored_procedure() == "procedure"
+        assert run_query.call_args.kwargs.get("query") == 'CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) ' \
+                                                          '"id" varchar(48) encode zstd,' \
+                                                          '"address_line_1" varchar(65535) encode zstd'
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    def test_profile_varchar_columns_no_varchar_columns(self, fetch_object):
+        fetch_object.return_value = json.dumps({
+            "columns": {
+                "id": "bigint"
+            }
+        })
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.profile_varchar_columns(schema="schema", staging_table="staging_table") == {}
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_profile_varchar_columns_query_unsuccessful(self, run_query, fetch_object):
+        fetch_object.return_value = json.dumps({
+            "columns": {
+                "id": "varchar"
+            }
+        })
+        run_query.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.profile_varchar_columns(schema="schema", staging_table="staging_table") == -2
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.put_object')
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_profile_varchar_columns_successful(self, run_query, get_query_results, fetch_object, put_object):
+        fetch_object.return_value = json.dumps({
+            "columns": {
+                "id": "varchar",
+                "address_line_1": "varchar",
+                "created_at": "timestamp"
+            }
+        })
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[{"longValue": 36}, {"isNull": True}]]
+        put_object.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        response = redshift.profile_varchar_columns(schema="schema", staging_table="staging_table")
+        assert response.get("columns") == {"id": 36}
+
+    @patch('lambdas.create_table.lambda_function.RedshiftService.profile_varchar_columns')
+    def test_lambda_handler_profile_varchar_unsuccessful(self, profile_varchar_columns):
+        profile_varchar_columns.return_value = -2
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in profiling varchar columns')
+        }
+        assert lambda_handler(event={"input": {"mode": "PROFILE_VARCHAR"}}, context=None) == expected_output
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_frame_create_table_stored_procedure_with_diststyle(self, run_query, fetch_object):
+        fetch_object.side_effect = [
+            json.dumps({
+                "columns": {
+                    "id": "bigint"
+                },
+                "redshiftConfigurations": {
+                    "diststyle": "all",
+                    "compoundSortkey": "id"
+                }
+            }),
+            "CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) {redshift_config}"
+        ]
+        run_query.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.frame_create_table_stored_procedure() == "procedure"
+        assert run_query.call_args.kwargs.get("query") == 'CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) ' \
+                                                          'diststyle all compound sortkey("id")'
+
+    @patch('lambdas.create_table.services.redshift_service.S3Helper.fetch_object')
+    @patch('lambdas.create_table.services.redshift_service.RedshiftHelper.run_query')
+    def test_frame_create_table_stored_procedure_with_composite_primary_key(self, run_query, fetch_object):
+        fetch_object.side_effect = [
+            json.dumps({
+                "columns": {
+                    "id": "bigint",
+                    "region": "char(2)"
+                },
+                "tableConfigurations": {
+                    "primaryKey": "id, region",
+                    "loadMode": "merge"
+                }
+            }),
+            "CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) {table_schema}"
+        ]
+        run_query.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.frame_create_table_stored_procedure() == "procedure"
+        assert run_query.call_args.kwargs.get("query") == 'CREATE OR REPLACE PROCEDURE procedure(dfvn odnfvk ldkfnfv) ' \
+                                                          '"id" bigint encode az64,"region" char(2) encode zstd,' \
+                                                          'primary key("id","region")'
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.create_table.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_held(self, acquire):
+        acquire.return_value = False
+        expected_output = {
+            'statusCode': 409,
+            'message': json.dumps('Table is being loaded by another execution')
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales", "tableName": "orders"}},
+                              context=None) == expected_output
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.create_table.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_unsuccessful(self, acquire):
+        acquire.return_value = None
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in acquiring table lease')
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales", "tableName": "orders"}},
+                              context=None) == expected_output
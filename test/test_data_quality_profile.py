@@ -0,0 +1,184 @@
+import json
+import unittest
+from unittest.mock import patch
+from aws_lambda_powertools import Logger
+
+from lambdas.data_quality_profile.services.data_quality_service import DataQualityService
+from lambdas.data_quality_profile.lambda_function import lambda_handler
+
+logger = Logger()
+
+
+def get_schema():
+    return {
+        "columns": {
+            "id": "INTEGER",
+            "name": "VARCHAR(256)",
+            "active": "BOOLEAN"
+        },
+        "tableConfigurations": {
+            "primaryKey": "id"
+        }
+    }
+
+
+def get_data_quality_service():
+    return DataQualityService(
+        redshift=None,
+        s3={"resource": None, "bucket_name": "bucket", "schema_path": "schemas"},
+        dynamodb=None,
+        redshift_params={},
+        thresholds={"row_drop_pct": 10, "null_increase_pct": 5},
+        logger=logger
+    )
+
+
+def get_profile_records():
+    return [[
+        {"longValue": 100},
+        {"longValue": 0}, {"longValue": 100}, {"stringValue": "1"}, {"stringValue": "100"},
+        {"longValue": 20}, {"longValue": 70}, {"stringValue": "a"}, {"stringValue": "z"},
+        {"longValue": 5}, {"longValue": 2}, {"isNull": True}, {"isNull": True},
+        {"longValue": 2}
+    ]]
+
+
+class TestDataQualityProfile(unittest.TestCase):
+
+    def test_frame_profile_query(self):
+        data_quality = get_data_quality_service()
+        assert data_quality.frame_profile_query(get_schema(), "sales", "orders") == \
+            'SELECT COUNT(*), COUNT(*) - COUNT("id"), APPROXIMATE COUNT(DISTINCT "id"), ' \
+            'CAST(MIN("id") AS VARCHAR), CAST(MAX("id") AS VARCHAR), COUNT(*) - COUNT("name"), ' \
+            'APPROXIMATE COUNT(DISTINCT "name"), CAST(MIN("name") AS VARCHAR), CAST(MAX("name") AS VARCHAR), ' \
+            'COUNT(*) - COUNT("active"), APPROXIMATE COUNT(DISTINCT "active"), NULL, NULL, ' \
+            'SUM(CASE WHEN dq_key_rows > 1 THEN 1 ELSE 0 END) FROM (SELECT *, COUNT(*) OVER ' \
+            '(PARTITION BY "id") AS dq_key_rows FROM sales.orders) AS p;'
+
+    def test_frame_profile_query_without_primary_key(self):
+        data_quality = get_data_quality_service()
+        schema = {"columns": {"payload": "SUPER"}}
+        assert data_quality.frame_profile_query(schema, "sales", "events") == \
+            'SELECT COUNT(*), COUNT(*) - COUNT("payload"), NULL, NULL, NULL, NULL FROM sales.events;'
+
+    @patch('lambdas.data_quality_profile.services.data_quality_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.RedshiftHelper.run_query')
+    def test_profile_table(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = get_profile_records()
+        data_quality = get_data_quality_service()
+        assert data_quality.profile_table(get_schema(), "sales", "orders") == {
+            "rowCount": 100,
+            "duplicateKeyRows": 2,
+            "columns": {
+                "id": {"nulls": 0, "distinct": 100, "min": "1", "max": "100"},
+                "name": {"nulls": 20, "distinct": 70, "min": "a", "max": "z"},
+                "active": {"nulls": 5, "distinct": 2, "min": None, "max": None}
+            }
+        }
+
+    @patch('lambdas.data_quality_profile.services.data_quality_service.RedshiftHelper.run_query')
+    def test_profile_table_unsuccessful(self, run_query):
+        run_query.return_value = None
+        data_quality = get_data_quality_service()
+        assert data_quality.profile_table(get_schema(), "sales", "orders") is None
+
+    def test_compare_profiles(self):
+        data_quality = get_data_quality_service()
+        profile = {
+            "rowCount": 80,
+            "duplicateKeyRows": 2,
+            "columns": {"id": {"nulls": 0}, "name": {"nulls": 20}}
+        }
+        previous_profile = {
+            "rowCount": 100,
+            "duplicateKeyRows": 0,
+            "columns": {"id": {"nulls": 0}, "name": {"nulls": 10}}
+        }
+        assert data_quality.compare_profiles(profile, previous_profile) == [
+            {"check": "duplicateKeyRows", "value": 2},
+            {"check": "rowCount", "value": 80, "previousValue": 100},
+            {"check": "nullPct", "column": "name", "value": 25.0, "previousValue": 10.0}
+        ]
+        assert data_quality.compare_profiles({**profile, "duplicateKeyRows": 0}, None) == []
+
+    def test_compare_profiles_zero_thresholds(self):
+        data_quality = DataQualityService(
+            redshift=None,
+            s3={},
+            dynamodb=None,
+            redshift_params={},
+            thresholds={"row_drop_pct": 0, "null_increase_pct": 0},
+            logger=logger
+        )
+        assert data_quality.compare_profiles(
+            {"rowCount": 99, "duplicateKeyRows": 0, "columns": {"name": {"nulls": 11}}},
+            {"rowCount": 100, "duplicateKeyRows": 0, "columns": {"name": {"nulls": 10}}}
+        ) == [
+            {"check": "rowCount", "value": 99, "previousValue": 100},
+            {"check": "nullPct", "column": "name", "value": 11.11, "previousValue": 10.0}
+        ]
+
+    @patch('lambdas.data_quality_profile.services.data_quality_service.DynamoDBHelper.put_item')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.DynamoDBHelper.get_latest_item')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.RedshiftHelper.run_query')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.S3Helper.fetch_object')
+    def test_profile_tables(self, fetch_object, run_query, get_query_results, get_latest_item, put_item):
+        fetch_object.return_value = json.dumps(get_schema())
+        run_query.return_value = "query_id"
+        get_query_results.return_value = get_profile_records()
+        get_latest_item.return_value = None
+        put_item.return_value = True
+        data_quality = get_data_quality_service()
+        assert data_quality.profile_tables(
+            schema_name="sales", table_names=["orders"], profile_table_name="profiles"
+        ) == [{
+            "tableName": "orders",
+            "rowCount": 100,
+            "duplicateKeyRows": 2,
+            "issues": [{"check": "duplicateKeyRows", "value": 2}]
+        }]
+        assert put_item.call_args.kwargs.get("item").get("tableKey") == "sales.orders"
+
+    @patch('lambdas.data_quality_profile.services.data_quality_service.DynamoDBHelper.put_item')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.DynamoDBHelper.get_latest_item')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.RedshiftHelper.run_query')
+    @patch('lambdas.data_quality_profile.services.data_quality_service.S3Helper.fetch_object')
+    def test_profile_tables_recording_unsuccessful(self, fetch_object, run_query, get_query_results,
+                                                   get_latest_item, put_item):
+        fetch_object.return_value = json.dumps(get_schema())
+        run_query.return_value = "query_id"
+        get_query_results.return_value = get_profile_records()
+        get_latest_item.return_value = None
+        put_item.return_value = None
+        data_quality = get_data_quality_service()
+        assert data_quality.profile_tables(
+            schema_name="sales", table_names=["orders"], profile_table_name="profiles"
+        ) == -3
+
+    @patch('lambdas.data_quality_profile.services.data_quality_service.S3Helper.fetch_object')
+    def test_profile_tables_schema_unsuccessful(self, fetch_object):
+        fetch_object.return_value = None
+        data_quality = get_data_quality_service()
+        assert data_quality.profile_tables(
+            schema_name="sales", table_names=["orders"], profile_table_name="profiles"
+        ) == -1
+
+    def test_lambda_handler_no_loaded_tables(self):
+        response = lambda_handler({"input": {"databaseName": "sales"}, "loadedTables": []}, None)
+        assert response == {'statusCode': 200, 'message': "SUCCESS"}
+
+    @patch('lambdas.data_quality_profile.lambda_function.DataQualityService.profile_tables')
+    def test_lambda_handler(self, profile_tables):
+        profile_tables.return_value = [{"tableName": "orders", "issues": []}]
+        response = lambda_handler({"input": {"databaseName": "sales"}, "loadedTables": ["orders"]}, None)
+        assert response.get("statusCode") == 200
+        assert response.get("profiles") == [{"tableName": "orders", "issues": []}]
+
+    @patch('lambdas.data_quality_profile.lambda_function.DataQualityService.profile_tables')
+    def test_lambda_handler_profiling_unsuccessful(self, profile_tables):
+        profile_tables.return_value = -2
+        response = lambda_handler({"input": {"databaseName": "sales"}, "loadedTables": ["orders"]}, None)
+        assert response == {'statusCode': 500, 'message': json.dumps('Error in profiling table')}
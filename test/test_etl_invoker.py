@@ -212,3 +212,41 @@ class TestETLInvoker(unittest.TestCase):
             'statusCode': 500,
             'message': json.dumps('Error in getting input for step functions')
         }
+
+    @freeze_time("2012-01-12")
+    @patch('lambdas.etl_invoker.services.etl_invoker.WLMHelper.get_queue_state')
+    @patch('lambdas.etl_invoker.services.etl_invoker.ETLInvokerService.get_databases_to_migrate')
+    def test_generate_input_for_step_functions_with_fan_out(self, databases, get_queue_state):
+        databases.return_value = ["a/b/c.json"]
+        get_queue_state.return_value = {"queuedQueries": 4, "runningQueries": 10, "longestQueueSeconds": 5}
+        etl_invoker_service = ETLInvokerService(
+            s3={},
+            redshift=None,
+            redshift_params={"cluster_identifier": "cluster"},
+            fan_out={"min_concurrency": 1, "max_concurrency": 10, "max_queue_seconds": 60},
+            logger=logger
+        )
+        assert etl_invoker_service.generate_input_for_step_functions() == [
+            {
+                "input": {
+                    "databaseName": "c",
+                    "environment": None,
+                    "configBucket": None,
+                    "configFileKey": "a/b/c.json",
+                    "monthlyBackUp": 0,
+                    "maxConcurrency": 6
+                }
+            }
+        ]
+
+    @patch('lambdas.etl_invoker.services.etl_invoker.WLMHelper.get_queue_state')
+    def test_get_max_concurrency_without_cluster(self, get_queue_state):
+        etl_invoker_service = ETLInvokerService(
+            s3={},
+            redshift=None,
+            redshift_params={},
+            fan_out={"min_concurrency": 1, "max_concurrency": 10, "max_queue_seconds": 60},
+            logger=logger
+        )
+        assert etl_invoker_service.get_max_concurrency() == 10
+        get_queue_state.assert_not_called()
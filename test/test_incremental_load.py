@@ -1,17 +1,57 @@
 import json
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 import boto3
 from aws_lambda_powertools import Logger
-from moto import mock_s3
+from botocore.exceptions import ClientError, ReadTimeoutError
+from moto import mock_s3, mock_dynamodb
 
+from lambdas.incremental_load.helpers.lease_helper import LeaseHelper
+from lambdas.incremental_load.helpers.redshift_helper import RedshiftHelper
+from lambdas.incremental_load.helpers.retry_policy import RetryPolicy, StatementError
+from lambdas.incremental_load.helpers.statement_semaphore import StatementSemaphore
 from lambdas.incremental_load.helpers.s3_helper import S3Helper
+from lambdas.incremental_load.helpers.swap_helper import SwapHelper
 from lambdas.incremental_load.services.redshift_service import RedshiftService
 from lambdas.incremental_load.lambda_function import lambda_handler
 
 logger = Logger()
 
 
+def create_lease_table():
+    dynamodb = boto3.resource('dynamodb')
+    dynamodb.create_table(
+        TableName='table_leases',
+        KeySchema=[
+            {'AttributeName': 'databaseName', 'KeyType': 'HASH'},
+            {'AttributeName': 'tableName', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'databaseName', 'AttributeType': 'S'},
+            {'AttributeName': 'tableName', 'AttributeType': 'S'}
+        ],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+    )
+    return dynamodb
+
+
+def create_semaphore_table():
+    dynamodb = boto3.resource('dynamodb')
+    dynamodb.create_table(
+        TableName='statement_semaphore',
+        KeySchema=[
+            {'AttributeName': 'semaphoreName', 'KeyType': 'HASH'},
+            {'AttributeName': 'slotId', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'semaphoreName', 'AttributeType': 'S'},
+            {'AttributeName': 'slotId', 'AttributeType': 'N'}
+        ],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+    )
+    return dynamodb
+
+
 class TestIncrementalLoad(unittest.TestCase):
     @mock_s3
     def test_helper_fetch_object_without_exception(self):
@@ -161,7 +201,19 @@ class TestIncrementalLoad(unittest.TestCase):
         assert lambda_handler(event={}, context=None) == expected_output
 
     @patch('lambdas.create_table.lambda_function.RedshiftService.create_incremental_load_procedure')
-    def test_lambda_handler_stored_proc_fetch_unsuccessful(self, create_incremental_load_procedure):
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_table_schema')
+    def test_lambda_handler_stored_proc_fetch_unsuccessful(self, get_table_schema, deduplicate_staging_table, get_watermark_predicate, get_load_chunks, plan_load_strategy, get_load_mode, create_incremental_load_procedure):
+        get_table_schema.return_value = {}
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_chunks.return_value = 1
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_mode.return_value = "upsert"
         create_incremental_load_procedure.return_value = -1
         expected_output = {
             'statusCode': 404,
@@ -170,7 +222,19 @@ class TestIncrementalLoad(unittest.TestCase):
         assert lambda_handler(event={"input": {}}, context=None) == expected_output
 
     @patch('lambdas.create_table.lambda_function.RedshiftService.create_incremental_load_procedure')
-    def test_lambda_handler_stored_proc_execution_unsuccessful(self, create_incremental_load_procedure):
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_table_schema')
+    def test_lambda_handler_stored_proc_execution_unsuccessful(self, get_table_schema, deduplicate_staging_table, get_watermark_predicate, get_load_chunks, plan_load_strategy, get_load_mode, create_incremental_load_procedure):
+        get_table_schema.return_value = {}
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_chunks.return_value = 1
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_mode.return_value = "upsert"
         create_incremental_load_procedure.return_value = -2
         expected_output = {
             'statusCode': 500,
@@ -180,8 +244,20 @@ class TestIncrementalLoad(unittest.TestCase):
 
     @patch('lambdas.create_table.lambda_function.RedshiftService.execute_incremental_load_stored_procedure')
     @patch('lambdas.create_table.lambda_function.RedshiftService.create_incremental_load_procedure')
-    def test_lambda_handler_schema_fetch_unsuccessful(self, create_incremental_load_procedure,
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_table_schema')
+    def test_lambda_handler_schema_fetch_unsuccessful(self, get_table_schema, deduplicate_staging_table, get_watermark_predicate, get_load_chunks, plan_load_strategy, get_load_mode, create_incremental_load_procedure,
                                                       execute_incremental_load_stored_procedure):
+        get_table_schema.return_value = {}
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_chunks.return_value = 1
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_mode.return_value = "upsert"
         create_incremental_load_procedure.return_value = True
         execute_incremental_load_stored_procedure.return_value = -1
         expected_output = {
@@ -192,8 +268,20 @@ class TestIncrementalLoad(unittest.TestCase):
 
     @patch('lambdas.create_table.lambda_function.RedshiftService.execute_incremental_load_stored_procedure')
     @patch('lambdas.create_table.lambda_function.RedshiftService.create_incremental_load_procedure')
-    def test_lambda_handler_primary_key_missing(self, create_incremental_load_procedure,
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_table_schema')
+    def test_lambda_handler_primary_key_missing(self, get_table_schema, deduplicate_staging_table, get_watermark_predicate, get_load_chunks, plan_load_strategy, get_load_mode, create_incremental_load_procedure,
                                                 execute_incremental_load_stored_procedure):
+        get_table_schema.return_value = {}
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_chunks.return_value = 1
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_mode.return_value = "upsert"
         create_incremental_load_procedure.return_value = True
         execute_incremental_load_stored_procedure.return_value = -2
         expected_output = {
@@ -204,8 +292,20 @@ class TestIncrementalLoad(unittest.TestCase):
 
     @patch('lambdas.create_table.lambda_function.RedshiftService.execute_incremental_load_stored_procedure')
     @patch('lambdas.create_table.lambda_function.RedshiftService.create_incremental_load_procedure')
-    def test_lambda_handler_stored_procedure_execution_unsuccessful(self, create_incremental_load_procedure,
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_table_schema')
+    def test_lambda_handler_stored_procedure_execution_unsuccessful(self, get_table_schema, deduplicate_staging_table, get_watermark_predicate, get_load_chunks, plan_load_strategy, get_load_mode, create_incremental_load_procedure,
                                                                     execute_incremental_load_stored_procedure):
+        get_table_schema.return_value = {}
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_chunks.return_value = 1
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_mode.return_value = "upsert"
         create_incremental_load_procedure.return_value = True
         execute_incremental_load_stored_procedure.return_value = -4
         expected_output = {
@@ -216,12 +316,1511 @@ class TestIncrementalLoad(unittest.TestCase):
 
     @patch('lambdas.create_table.lambda_function.RedshiftService.execute_incremental_load_stored_procedure')
     @patch('lambdas.create_table.lambda_function.RedshiftService.create_incremental_load_procedure')
-    def test_lambda_handler_successful(self, create_incremental_load_procedure,
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_table_schema')
+    def test_lambda_handler_successful(self, get_table_schema, deduplicate_staging_table, get_watermark_predicate, get_load_chunks, plan_load_strategy, get_load_mode, create_incremental_load_procedure,
                                        execute_incremental_load_stored_procedure):
+        get_table_schema.return_value = {}
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_chunks.return_value = 1
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_mode.return_value = "upsert"
         create_incremental_load_procedure.return_value = True
         execute_incremental_load_stored_procedure.return_value = True
         expected_output = {
             'statusCode': 200,
-            'message': "SUCCESS"
+            'message': "SUCCESS",
+            'tableName': None,
+            'duplicatesRemoved': 0
         }
         assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    def test_frame_merge_query_composite_primary_key(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {
+                "id": "bigint",
+                "region": "varchar",
+                "amount": "decimal(10,2)"
+            },
+            "tableConfigurations": {
+                "primaryKey": "id, region"
+            }
+        }
+        assert redshift.frame_merge_query(schema, "sales.orders", "sales.orders_staging") == \
+               'MERGE INTO sales.orders AS t USING sales.orders_staging AS s ' \
+               'ON t."id" = s."id" AND t."region" = s."region" ' \
+               'WHEN MATCHED THEN UPDATE SET "amount" = s."amount" ' \
+               'WHEN NOT MATCHED THEN INSERT ("id", "region", "amount") VALUES (s."id", s."region", s."amount");'
+
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_get_load_mode(self, fetch_object):
+        fetch_object.return_value = json.dumps({
+            "tableConfigurations": {
+                "primaryKey": "id",
+                "loadMode": "MERGE"
+            }
+        })
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.get_load_mode() == "merge"
+        assert redshift.get_load_mode() == "merge"
+        assert fetch_object.call_count == 1
+
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_get_load_mode_default(self, fetch_object):
+        fetch_object.return_value = json.dumps({"columns": {"id": "bigint"}})
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.get_load_mode() == "upsert"
+
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_merge_primary_key_missing(self, fetch_object):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"loadMode": "merge"}
+        })
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_merge(schema="sales", table="orders",
+                                                       staging_table="orders_staging") == -2
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_merge_query_unsuccessful(self, fetch_object, run_query, get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "loadMode": "merge"}
+        })
+        run_query.return_value = None
+        get_shared_columns.return_value = []
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_merge(schema="sales", table="orders",
+                                                       staging_table="orders_staging") == -3
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_merge_query_successful(self, fetch_object, run_query, get_query_results):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "amount": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "loadMode": "merge"}
+        })
+        run_query.return_value = True
+        get_query_results.side_effect = [
+            [[{"stringValue": "amount"}], [{"stringValue": "id"}], [{"stringValue": "migration_type"}]],
+            [[{"longValue": 1}, {"longValue": 10}]]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_merge(schema="sales", table="orders",
+                                                       staging_table="orders_staging") is True
+        assert "svv_columns" in run_query.call_args_list[0].kwargs.get("query")
+        assert run_query.call_args.kwargs.get("query") == \
+            'MERGE INTO sales.orders AS t USING sales.orders_staging AS s ' \
+            'ON t."id" = s."id" AND t."id" BETWEEN 1 AND 10 ' \
+            'WHEN MATCHED THEN UPDATE SET "amount" = s."amount", "migration_type" = s."migration_type" ' \
+            'WHEN NOT MATCHED THEN INSERT ("id", "amount", "migration_type") ' \
+            'VALUES (s."id", s."amount", s."migration_type");'
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_merge_shared_columns_unsuccessful(self, fetch_object, run_query):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "loadMode": "merge"}
+        })
+        run_query.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_merge(schema="sales", table="orders",
+                                                       staging_table="orders_staging") == -3
+        assert run_query.call_count == 1
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    def test_lambda_handler_load_mode_schema_fetch_unsuccessful(self, get_load_mode):
+        get_load_mode.return_value = -1
+        expected_output = {
+            'statusCode': 404,
+            'message': json.dumps('Error in fetching schema')
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.create_incremental_load_procedure')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_merge')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    def test_lambda_handler_merge_successful(self, deduplicate_staging_table, get_watermark_predicate, get_load_mode, execute_incremental_load_merge,
+                                             create_incremental_load_procedure):
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_mode.return_value = "merge"
+        execute_incremental_load_merge.return_value = True
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'tableName': "orders",
+            'duplicatesRemoved': 0
+        }
+        assert lambda_handler(event={"input": {"tableName": "orders"}}, context=None) == expected_output
+        create_incremental_load_procedure.assert_not_called()
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_execute_incremental_load_append_query_unsuccessful(self, run_query):
+        run_query.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_append(schema="sales", table="events",
+                                                        staging_table="events_staging") == -3
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_execute_incremental_load_append_query_successful(self, run_query):
+        run_query.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_append(schema="sales", table="events",
+                                                        staging_table="events_staging") is True
+        assert run_query.call_args.kwargs.get("query") == \
+               "ALTER TABLE sales.events APPEND FROM sales.events_staging;"
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_append')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    def test_lambda_handler_append_unsuccessful(self, deduplicate_staging_table, get_watermark_predicate, get_load_mode, execute_incremental_load_append):
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_mode.return_value = "append"
+        execute_incremental_load_append.return_value = -3
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in executing SQL query')
+        }
+        assert lambda_handler(event={"input": {"tableName": "events"}}, context=None) == expected_output
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.create_incremental_load_procedure')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_append')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    def test_lambda_handler_append_successful(self, deduplicate_staging_table, get_watermark_predicate, get_load_mode, execute_incremental_load_append,
+                                              create_incremental_load_procedure):
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_mode.return_value = "append"
+        execute_incremental_load_append.return_value = True
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'tableName': "events",
+            'duplicatesRemoved': 0
+        }
+        assert lambda_handler(event={"input": {"tableName": "events"}}, context=None) == expected_output
+        create_incremental_load_procedure.assert_not_called()
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_plan_load_strategy_swap(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [
+                [{"stringValue": "orders"}, {"longValue": 1000}],
+                [{"stringValue": "orders_staging"}, {"longValue": 800}]
+            ],
+            [[{"longValue": 0}, {"longValue": 0}]]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.plan_load_strategy(schema="sales", table="orders", staging_table="orders_staging") == {
+            "strategy": "swap",
+            "targetRows": 1000,
+            "stagingRows": 800,
+            "swapRowRatio": 0.5,
+            "dependentObjects": 0
+        }
+        assert "stv_mv_deps" in run_query.call_args.kwargs.get("query")
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_plan_load_strategy_swap_with_dependent_objects(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [
+                [{"stringValue": "orders"}, {"longValue": 1000}],
+                [{"stringValue": "orders_staging"}, {"longValue": 800}]
+            ],
+            [[{"longValue": 1}, {"longValue": 2}]]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        load_plan = redshift.plan_load_strategy(schema="sales", table="orders", staging_table="orders_staging")
+        assert load_plan.get("strategy") == "upsert"
+        assert load_plan.get("dependentObjects") == 3
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_plan_load_strategy_upsert(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [
+            [{"stringValue": "orders"}, {"longValue": 1000}],
+            [{"stringValue": "orders_staging"}, {"longValue": 100}]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={"swap_row_ratio": "0.2"},
+            logger=logger
+        )
+        assert redshift.plan_load_strategy(schema="sales", table="orders",
+                                           staging_table="orders_staging").get("strategy") == "upsert"
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_plan_load_strategy_row_counts_unavailable(self, run_query):
+        run_query.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.plan_load_strategy(schema="sales", table="orders",
+                                           staging_table="orders_staging").get("strategy") == "upsert"
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_swap_successful(self, fetch_object, run_batch_query, run_query,
+                                                      get_query_results):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "amount": "bigint"},
+            "tableConfigurations": {"primaryKey": "id"}
+        })
+        run_batch_query.return_value = "query_id"
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [[{"stringValue": "amount"}], [{"stringValue": "id"}], [{"stringValue": "migration_type"}]],
+            [[{"stringValue": "etl"}, {"stringValue": "etl"}, {"stringValue": "etl=arwdRxtDPA/etl~group bi=r/etl"}]]
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_swap(schema="sales", table="orders",
+                                                      staging_table="orders_staging") == "query_id"
+        assert run_batch_query.call_args.kwargs.get("queries") == [
+            "DROP TABLE IF EXISTS sales.orders__swap;",
+            "CREATE TABLE sales.orders__swap (LIKE sales.orders);",
+            'INSERT INTO sales.orders__swap ("id", "amount", "migration_type") SELECT "id", "amount", '
+            '"migration_type" FROM sales.orders AS t '
+            'WHERE NOT EXISTS (SELECT 1 FROM sales.orders_staging AS s WHERE t."id" = s."id");',
+            'INSERT INTO sales.orders__swap ("id", "amount", "migration_type") SELECT "id", "amount", '
+            '"migration_type" FROM sales.orders_staging AS s;',
+            "ALTER TABLE sales.orders RENAME TO orders__old;",
+            "ALTER TABLE sales.orders__swap RENAME TO orders;",
+            'GRANT SELECT ON sales.orders TO GROUP "bi";',
+            "DROP TABLE sales.orders__old;"
+        ]
+
+    def test_swap_helper_frame_grant_queries(self):
+        assert SwapHelper.frame_grant_queries(
+            "sales.orders", "owner=arwdRxtDPA/owner~=r/owner~analyst=r*a/owner~role loader=ad/owner", "owner"
+        ) == [
+            "GRANT SELECT ON sales.orders TO PUBLIC;",
+            'GRANT INSERT ON sales.orders TO "analyst";',
+            'GRANT SELECT ON sales.orders TO "analyst" WITH GRANT OPTION;',
+            'GRANT INSERT, DELETE ON sales.orders TO ROLE "loader";'
+        ]
+        assert SwapHelper.frame_grant_queries("sales.orders", None, "owner") == []
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_swap_helper_get_grant_queries_other_owner(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[{"stringValue": "owner"}, {"stringValue": "etl"}, {"isNull": True}]]
+        assert SwapHelper(redshift=None, logger=logger).get_grant_queries("sales", "orders") == [
+            'ALTER TABLE sales.orders OWNER TO "owner";'
+        ]
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.SwapHelper.get_grant_queries')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_swap_unsuccessful(self, fetch_object, run_batch_query, get_grant_queries,
+                                                        get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id"}
+        })
+        run_batch_query.return_value = None
+        get_grant_queries.return_value = []
+        get_shared_columns.return_value = []
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_swap(schema="sales", table="orders",
+                                                      staging_table="orders_staging") == -3
+        get_shared_columns.return_value = None
+        run_batch_query.reset_mock()
+        assert redshift.execute_incremental_load_swap(schema="sales", table="orders",
+                                                      staging_table="orders_staging") == -3
+        run_batch_query.assert_not_called()
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.create_incremental_load_procedure')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_swap')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    def test_lambda_handler_swap_successful(self, deduplicate_staging_table, get_watermark_predicate, get_load_mode, plan_load_strategy,
+                                            execute_incremental_load_swap, create_incremental_load_procedure):
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_mode.return_value = "upsert"
+        plan_load_strategy.return_value = {"strategy": "swap"}
+        execute_incremental_load_swap.return_value = "query_id"
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'tableName': "orders",
+            'duplicatesRemoved': 0
+        }
+        assert lambda_handler(event={"input": {"tableName": "orders"}}, context=None) == expected_output
+        create_incremental_load_procedure.assert_not_called()
+
+    def test_frame_chunk_queries_composite_primary_key(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "region": "char(2)", "amount": "bigint"},
+            "tableConfigurations": {"primaryKey": "id,region", "loadChunks": 4}
+        }
+        assert redshift.frame_chunk_queries(schema, "sales", "orders", "orders_staging", 2, 4) == [
+            'DELETE FROM sales.orders USING sales.orders_staging AS s '
+            'WHERE sales.orders."id" = s."id" AND sales.orders."region" = s."region" '
+            'AND ABS(MOD(FNV_HASH(s."region", FNV_HASH(s."id")), 4)) = 2;',
+            'INSERT INTO sales.orders ("id", "region", "amount") SELECT "id", "region", "amount" '
+            'FROM sales.orders_staging AS s WHERE ABS(MOD(FNV_HASH(s."region", FNV_HASH(s."id")), 4)) = 2;'
+        ]
+
+    def test_frame_chunk_queries_extra_columns(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "amount": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "rowHashColumn": "row_hash"}
+        }
+        queries = redshift.frame_chunk_queries(schema, "sales", "orders", "orders_staging", 0, 1,
+                                               extra_columns=["migration_type"])
+        assert queries[1].startswith(
+            'INSERT INTO sales.orders ("id", "amount", "migration_type", "row_hash") '
+            'SELECT s."id", s."amount", s."migration_type", '
+        )
+        del schema["tableConfigurations"]["rowHashColumn"]
+        queries = redshift.frame_chunk_queries(schema, "sales", "orders", "orders_staging", 0, 1,
+                                               extra_columns=["migration_type"])
+        assert queries[1] == 'INSERT INTO sales.orders ("id", "amount", "migration_type") ' \
+                             'SELECT "id", "amount", "migration_type" FROM sales.orders_staging AS s;'
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.update_item')
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.get_item')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_chunks_resumes_from_checkpoint(self, fetch_object, run_batch_query,
+                                                                     get_item, update_item, get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "loadChunks": 4}
+        })
+        run_batch_query.return_value = "query_id"
+        get_item.return_value = {
+            "redshiftMigrationCheckpoint": "2024-01-01 00:00:00",
+            "loadChunkProgress": {
+                "migrationCheckpoint": "2024-01-01 00:00:00",
+                "stagingTableName": "orders_staging",
+                "chunkCount": 4,
+                "nextChunk": 2
+            }
+        }
+        update_item.return_value = True
+        get_shared_columns.return_value = ["migration_type"]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_chunks(schema="sales", table="orders",
+                                                        staging_table="orders_staging") is True
+        assert run_batch_query.call_count == 2
+        assert '"migration_type"' in run_batch_query.call_args.kwargs.get("queries")[1]
+        assert update_item.call_args_list[-2].kwargs.get("expression_attribute_values") == {
+            ":loadChunkProgress": {
+                "migrationCheckpoint": "2024-01-01 00:00:00",
+                "stagingTableName": "orders_staging",
+                "chunkCount": 4,
+                "nextChunk": 4
+            }
+        }
+        assert update_item.call_args.kwargs.get("expression_attribute_values") == {":loadChunkProgress": None}
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.update_item')
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.get_item')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_chunks_new_migration(self, fetch_object, run_batch_query,
+                                                           get_item, update_item, get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "loadChunks": 3}
+        })
+        run_batch_query.side_effect = ["query_id", None]
+        get_shared_columns.return_value = []
+        get_item.return_value = {
+            "redshiftMigrationCheckpoint": "2024-01-02 00:00:00",
+            "loadChunkProgress": {
+                "migrationCheckpoint": "2024-01-01 00:00:00",
+                "stagingTableName": "orders_staging",
+                "chunkCount": 3,
+                "nextChunk": 2
+            }
+        }
+        update_item.return_value = True
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_chunks(schema="sales", table="orders",
+                                                        staging_table="orders_staging") == -3
+        assert update_item.call_count == 1
+        assert update_item.call_args.kwargs.get("expression_attribute_values").get(
+            ":loadChunkProgress").get("nextChunk") == 1
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.update_item')
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.get_item')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_chunks_checkpoint_unavailable(self, fetch_object, run_batch_query, get_item,
+                                                                    update_item, get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "rowHashColumn": "row_hash"}
+        })
+        run_batch_query.return_value = "query_id"
+        get_item.return_value = None
+        get_shared_columns.return_value = []
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_chunks(schema="sales", table="orders",
+                                                        staging_table="orders_staging") is True
+        assert run_batch_query.call_count == 1
+        update_item.assert_not_called()
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_chunks_shared_columns_unavailable(self, fetch_object, run_batch_query,
+                                                                        get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "loadChunks": 3}
+        })
+        get_shared_columns.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_chunks(schema="sales", table="orders",
+                                                        staging_table="orders_staging") == -3
+        run_batch_query.assert_not_called()
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    def test_lambda_handler_chunks_progress_unsuccessful(self, deduplicate_staging_table, get_watermark_predicate, get_load_mode, plan_load_strategy,
+                                                         get_load_chunks, execute_incremental_load_chunks):
+        deduplicate_staging_table.return_value = None
+        get_watermark_predicate.return_value = ""
+        get_load_mode.return_value = "upsert"
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_chunks.return_value = 4
+        execute_incremental_load_chunks.return_value = -4
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in recording load progress')
+        }
+        assert lambda_handler(event={"input": {"tableName": "orders"}}, context=None) == expected_output
+
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.get_item')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_get_watermark_predicate_after_previous_checkpoint(self, fetch_object, get_item):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "updated_at": "timestamp"},
+            "tableConfigurations": {
+                "primaryKey": "id",
+                "timestampCheckpointColumn": "updated_at",
+                "recordCheckpointColumn": "id"
+            }
+        })
+        get_item.return_value = {
+            "changeFlag": 1,
+            "redshiftTimestampCheckpoint": "2024-01-02 00:00:00",
+            "redshiftRecordCheckpoint": 200,
+            "prevRedshiftTimestampCheckpoint": "2024-01-01 00:00:00",
+            "prevRedshiftRecordCheckpoint": 100
+        }
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.get_watermark_predicate(schema="sales", table="orders") == \
+               's."updated_at" > \'2024-01-01 00:00:00\'::timestamp AND s."id" > 100'
+
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.get_item')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_get_watermark_predicate_checkpoint_unavailable(self, fetch_object, get_item):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "updated_at": "timestamp"},
+            "tableConfigurations": {"primaryKey": "id", "timestampCheckpointColumn": "updated_at"}
+        })
+        get_item.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.get_watermark_predicate(schema="sales", table="orders") == ""
+
+    @patch('lambdas.incremental_load.services.redshift_service.DynamoDBHelper.get_item')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_get_watermark_predicate_not_configured(self, fetch_object, get_item):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id"}
+        })
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.get_watermark_predicate(schema="sales", table="orders") == ""
+        get_item.assert_not_called()
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_merge_with_watermark(self, fetch_object, run_batch_query, get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "loadMode": "merge"}
+        })
+        run_batch_query.return_value = "query_id"
+        get_shared_columns.return_value = ["migration_type"]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_merge(schema="sales", table="orders", staging_table="orders_staging",
+                                                       watermark='s."id" > 100') == "query_id"
+        assert run_batch_query.call_args.kwargs.get("queries") == [
+            'CREATE TEMP TABLE orders_staging__delta AS SELECT s."id", s."migration_type" '
+            'FROM sales.orders_staging AS s WHERE (s."id" > 100);',
+            'MERGE INTO sales.orders AS t USING orders_staging__delta AS s ON t."id" = s."id" '
+            'WHEN MATCHED THEN UPDATE SET "migration_type" = s."migration_type" '
+            'WHEN NOT MATCHED THEN INSERT ("id", "migration_type") VALUES (s."id", s."migration_type");'
+        ]
+
+    def test_frame_chunk_queries_single_chunk_with_watermark(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "amount": "bigint"},
+            "tableConfigurations": {"primaryKey": "id"}
+        }
+        assert redshift.frame_chunk_queries(schema, "sales", "orders", "orders_staging", 0, 1,
+                                            's."id" > 100') == [
+            'DELETE FROM sales.orders USING sales.orders_staging AS s '
+            'WHERE sales.orders."id" = s."id" AND s."id" > 100;',
+            'INSERT INTO sales.orders ("id", "amount") SELECT "id", "amount" '
+            'FROM sales.orders_staging AS s WHERE s."id" > 100;'
+        ]
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_chunks')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.plan_load_strategy')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_table_schema')
+    def test_lambda_handler_watermark_upsert(self, get_table_schema, deduplicate_staging_table, get_load_mode, get_watermark_predicate, plan_load_strategy,
+                                             get_load_chunks, execute_incremental_load_chunks):
+        get_table_schema.return_value = {}
+        deduplicate_staging_table.return_value = None
+        get_load_mode.return_value = "upsert"
+        get_watermark_predicate.return_value = 's."id" > 100'
+        plan_load_strategy.return_value = {"strategy": "upsert"}
+        get_load_chunks.return_value = 1
+        execute_incremental_load_chunks.return_value = True
+        assert lambda_handler(event={"input": {"tableName": "orders"}}, context=None).get("statusCode") == 200
+        assert execute_incremental_load_chunks.call_args.kwargs.get("watermark") == 's."id" > 100'
+
+    def test_frame_deduplication_queries(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "updated_at": "timestamp"},
+            "tableConfigurations": {"primaryKey": "id", "dedupOrderColumn": "updated_at"}
+        }
+        assert redshift.frame_deduplication_queries(schema, "sales", "orders_staging") == [
+            'CREATE TEMP TABLE orders_staging__dedup AS SELECT * FROM sales.orders_staging '
+            'QUALIFY COUNT(*) OVER (PARTITION BY "id") > 1 '
+            'AND ROW_NUMBER() OVER (PARTITION BY "id" ORDER BY "updated_at" DESC NULLS LAST) = 1;',
+            'DELETE FROM sales.orders_staging USING orders_staging__dedup AS d '
+            'WHERE sales.orders_staging."id" = d."id";',
+            'INSERT INTO sales.orders_staging SELECT * FROM orders_staging__dedup;'
+        ]
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_deduplicate_staging_table_not_configured(self, fetch_object, run_batch_query):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id"}
+        })
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.deduplicate_staging_table(schema="sales", staging_table="orders_staging") is None
+        run_batch_query.assert_not_called()
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.describe_query')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_deduplicate_staging_table_successful(self, fetch_object, run_batch_query, describe_query):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "updated_at": "timestamp"},
+            "tableConfigurations": {"primaryKey": "id", "dedupOrderColumn": "updated_at"}
+        })
+        run_batch_query.return_value = "query_id"
+        describe_query.return_value = {
+            "SubStatements": [{"ResultRows": 0}, {"ResultRows": 12}, {"ResultRows": 5}]
+        }
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.deduplicate_staging_table(schema="sales", staging_table="orders_staging") == 7
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_deduplicate_staging_table_unsuccessful(self, fetch_object, run_batch_query):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "updated_at": "timestamp"},
+            "tableConfigurations": {"primaryKey": "id", "dedupOrderColumn": "updated_at"}
+        })
+        run_batch_query.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.deduplicate_staging_table(schema="sales", staging_table="orders_staging") == -3
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    def test_lambda_handler_deduplication_unsuccessful(self, get_load_mode, deduplicate_staging_table):
+        get_load_mode.return_value = "merge"
+        deduplicate_staging_table.return_value = -3
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in deduplicating staging table')
+        }
+        assert lambda_handler(event={"input": {"tableName": "orders"}}, context=None) == expected_output
+
+    def test_frame_row_hash(self):
+        schema = {
+            "columns": {"id": "bigint", "name": "varchar(64)", "updated_at": "timestamp"}
+        }
+        assert RedshiftService.frame_row_hash(schema, "s") == \
+               "MD5(NVL(CAST(s.\"id\" AS VARCHAR), '#NULL#') || '|' || NVL(s.\"name\", '#NULL#') || '|' || " \
+               "NVL(CAST(s.\"updated_at\" AS VARCHAR), '#NULL#'))"
+
+    def test_frame_row_hash_boolean(self):
+        schema = {
+            "columns": {"id": "bigint", "active": "boolean", "deleted": "bool"}
+        }
+        assert RedshiftService.frame_row_hash(schema, "s") == \
+               "MD5(NVL(CAST(s.\"id\" AS VARCHAR), '#NULL#') || '|' || " \
+               "NVL(CASE WHEN s.\"active\" THEN 't' WHEN NOT s.\"active\" THEN 'f' END, '#NULL#') || '|' || " \
+               "NVL(CASE WHEN s.\"deleted\" THEN 't' WHEN NOT s.\"deleted\" THEN 'f' END, '#NULL#'))"
+
+    def test_frame_delta_query_with_row_hash(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "name": "varchar"},
+            "tableConfigurations": {"primaryKey": "id", "rowHashColumn": "row_hash"}
+        }
+        row_hash = RedshiftService.frame_row_hash(schema, "s")
+        assert redshift.frame_delta_query(schema, "sales", "orders", "orders_staging") == \
+               f'SELECT s."id", s."name", {row_hash} AS "row_hash" FROM sales.orders_staging AS s ' \
+               f'LEFT JOIN sales.orders AS t ON t."id" = s."id" ' \
+               f'WHERE (t."row_hash" IS NULL OR t."row_hash" <> {row_hash})'
+
+    def test_frame_merge_query_with_row_hash(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "name": "varchar"},
+            "tableConfigurations": {"primaryKey": "id", "rowHashColumn": "row_hash"}
+        }
+        assert redshift.frame_merge_query(schema, "sales.orders", "orders_staging__delta") == \
+               'MERGE INTO sales.orders AS t USING orders_staging__delta AS s ON t."id" = s."id" ' \
+               'WHEN MATCHED THEN UPDATE SET "name" = s."name", "row_hash" = s."row_hash" ' \
+               'WHEN NOT MATCHED THEN INSERT ("id", "name", "row_hash") VALUES (s."id", s."name", s."row_hash");'
+
+    def test_frame_chunk_queries_with_row_hash(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "name": "varchar"},
+            "tableConfigurations": {"primaryKey": "id", "rowHashColumn": "row_hash"}
+        }
+        row_hash = RedshiftService.frame_row_hash(schema, "s")
+        assert redshift.frame_chunk_queries(schema, "sales", "orders", "orders_staging", 0, 1) == [
+            f'DELETE FROM sales.orders USING sales.orders_staging AS s WHERE sales.orders."id" = s."id" AND '
+            f'(sales.orders."row_hash" IS NULL OR sales.orders."row_hash" <> {row_hash});',
+            f'INSERT INTO sales.orders ("id", "name", "row_hash") SELECT s."id", s."name", {row_hash} '
+            f'FROM sales.orders_staging AS s LEFT JOIN sales.orders AS t ON t."id" = s."id" WHERE t."id" IS NULL;'
+        ]
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_get_primary_key_bounds(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[
+            {"longValue": 10}, {"longValue": 99}, {"stringValue": "AP"}, {"stringValue": "O'N"}
+        ]]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "region": "char(3)"},
+            "tableConfigurations": {"primaryKey": "id,region"}
+        }
+        assert redshift.get_primary_key_bounds(schema, "sales", "orders_staging", 's."id" > 5') == {
+            "id": ("10", "99"),
+            "region": ("'AP'", "'O''N'")
+        }
+        assert run_query.call_args.kwargs.get("query") == \
+               'SELECT MIN(s."id"), MAX(s."id"), MIN(s."region"), MAX(s."region") ' \
+               'FROM sales.orders_staging AS s WHERE s."id" > 5;'
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_get_primary_key_bounds_empty_staging(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[{"isNull": True}, {"isNull": True}]]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {"columns": {"id": "bigint"}, "tableConfigurations": {"primaryKey": "id"}}
+        assert redshift.get_primary_key_bounds(schema, "sales", "orders_staging") == {}
+
+    def test_frame_merge_query_with_bounds(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {"columns": {"id": "bigint", "amount": "bigint"}, "tableConfigurations": {"primaryKey": "id"}}
+        assert redshift.frame_merge_query(schema, "sales.orders", "sales.orders_staging",
+                                          bounds={"id": ("10", "99")}) == \
+               'MERGE INTO sales.orders AS t USING sales.orders_staging AS s ' \
+               'ON t."id" = s."id" AND t."id" BETWEEN 10 AND 99 ' \
+               'WHEN MATCHED THEN UPDATE SET "amount" = s."amount" ' \
+               'WHEN NOT MATCHED THEN INSERT ("id", "amount") VALUES (s."id", s."amount");'
+
+    def test_frame_chunk_queries_with_bounds_and_sort_key(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        schema = {
+            "columns": {"id": "bigint", "created_at": "timestamp"},
+            "tableConfigurations": {"primaryKey": "id"},
+            "redshiftConfigurations": {"distkey": "id", "compoundSortkey": "created_at, id"}
+        }
+        assert redshift.frame_chunk_queries(schema, "sales", "orders", "orders_staging", 0, 1,
+                                            bounds={"id": ("10", "99")}) == [
+            'DELETE FROM sales.orders USING sales.orders_staging AS s '
+            'WHERE sales.orders."id" = s."id" AND sales.orders."id" BETWEEN 10 AND 99;',
+            'INSERT INTO sales.orders ("id", "created_at") SELECT "id", "created_at" '
+            'FROM sales.orders_staging AS s ORDER BY s."created_at", s."id";'
+        ]
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_temp_staging_append(self, fetch_object, get_shared_columns, run_batch_query):
+        fetch_object.side_effect = lambda s3, bucket_name, key: {
+            "schema.json": json.dumps({
+                "columns": {"id": "bigint"},
+                "tableConfigurations": {"stagingMode": "temp"},
+                "redshiftConfigurations": {"sortkey": "id"}
+            }),
+            "orders.manifest": json.dumps({"entries": [{"url": "s3://data_bucket/part-0000.csv.gz"}]})
+        }.get(key)
+        get_shared_columns.return_value = ["migration_type"]
+        run_batch_query.return_value = "query_id"
+        redshift = RedshiftService(
+            redshift=None,
+            s3={"s3_schema_key": "schema.json", "data_bucket_name": "data_bucket",
+                "s3_manifest_key": "orders.manifest"},
+            redshift_params={},
+            copy_params={"iam_role": "arn:aws:iam::123:role/copy"},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_temp_staging(schema="sales", table="orders",
+                                                              staging_table="orders_staging",
+                                                              load_mode="append") == {"duplicatesRemoved": 0}
+        assert run_batch_query.call_args.kwargs.get("queries") == [
+            'CREATE TEMP TABLE orders_staging__temp (LIKE sales.orders_staging);',
+            'COPY orders_staging__temp FROM \'s3://data_bucket/orders.manifest\' '
+            'IAM_ROLE \'arn:aws:iam::123:role/copy\' MANIFEST CSV GZIP MAXERROR 0 COMPUPDATE OFF STATUPDATE OFF;',
+            'INSERT INTO sales.orders ("id", "migration_type") SELECT "id", "migration_type" '
+            'FROM orders_staging__temp AS s ORDER BY s."id";'
+        ]
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_temp_staging_merge_extra_columns(self, fetch_object, get_shared_columns,
+                                                                       run_batch_query):
+        fetch_object.side_effect = lambda s3, bucket_name, key: {
+            "schema.json": json.dumps({
+                "columns": {"id": "bigint"},
+                "tableConfigurations": {"primaryKey": "id", "stagingMode": "temp"}
+            }),
+            "orders.manifest": json.dumps({"entries": [{"url": "s3://data_bucket/part-0000.csv.gz"}]})
+        }.get(key)
+        get_shared_columns.return_value = ["migration_type"]
+        run_batch_query.return_value = "query_id"
+        redshift = RedshiftService(
+            redshift=None,
+            s3={"s3_schema_key": "schema.json", "data_bucket_name": "data_bucket",
+                "s3_manifest_key": "orders.manifest"},
+            redshift_params={},
+            copy_params={"iam_role": "arn:aws:iam::123:role/copy"},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_temp_staging(schema="sales", table="orders",
+                                                              staging_table="orders_staging",
+                                                              load_mode="merge") == {"duplicatesRemoved": 0}
+        assert get_shared_columns.call_args.args[1:] == ("sales", "orders", "orders_staging")
+        assert run_batch_query.call_args.kwargs.get("queries")[-1] == (
+            'MERGE INTO sales.orders AS t USING orders_staging__temp AS s ON t."id" = s."id" '
+            'WHEN MATCHED THEN UPDATE SET "migration_type" = s."migration_type" '
+            'WHEN NOT MATCHED THEN INSERT ("id", "migration_type") VALUES (s."id", s."migration_type");'
+        )
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_temp_staging_shared_columns_unavailable(self, fetch_object,
+                                                                              get_shared_columns,
+                                                                              run_batch_query):
+        fetch_object.side_effect = [
+            json.dumps({
+                "columns": {"id": "bigint"},
+                "tableConfigurations": {"primaryKey": "id", "stagingMode": "temp"}
+            }),
+            json.dumps({"entries": [{"url": "s3://data_bucket/part-0000.csv.gz"}]})
+        ]
+        get_shared_columns.return_value = None
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_temp_staging(schema="sales", table="orders",
+                                                              staging_table="orders_staging",
+                                                              load_mode="merge") == -3
+        run_batch_query.assert_not_called()
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_temp_staging_manifest_unavailable(self, fetch_object, run_batch_query):
+        fetch_object.side_effect = [
+            json.dumps({"columns": {"id": "bigint"}, "tableConfigurations": {"primaryKey": "id"}}),
+            None
+        ]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_temp_staging(schema="sales", table="orders",
+                                                              staging_table="orders_staging",
+                                                              load_mode="merge") == -5
+        run_batch_query.assert_not_called()
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_temp_staging')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_staging_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    def test_lambda_handler_temp_staging_successful(self, deduplicate_staging_table, get_load_mode,
+                                                    get_watermark_predicate, get_staging_mode,
+                                                    execute_incremental_load_temp_staging):
+        deduplicate_staging_table.return_value = None
+        get_load_mode.return_value = "merge"
+        get_watermark_predicate.return_value = ""
+        get_staging_mode.return_value = "temp"
+        execute_incremental_load_temp_staging.return_value = {"duplicatesRemoved": 3}
+        response = lambda_handler(event={"input": {"tableName": "orders"}}, context=None)
+        assert response.get("statusCode") == 200
+        assert response.get("duplicatesRemoved") == 3
+        assert execute_incremental_load_temp_staging.call_args.kwargs.get("load_mode") == "merge"
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_shared_columns')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_frame_group_load_queries_merge(self, fetch_object, get_watermark_predicate, get_shared_columns):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint", "amount": "bigint"},
+            "tableConfigurations": {"primaryKey": "id"}
+        })
+        get_watermark_predicate.return_value = ""
+        get_shared_columns.return_value = []
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.frame_group_load_queries(schema="sales", table="regions", staging_table="regions_staging") == [
+            'MERGE INTO sales.regions AS t USING sales.regions_staging AS s ON t."id" = s."id" '
+            'WHEN MATCHED THEN UPDATE SET "amount" = s."amount" '
+            'WHEN NOT MATCHED THEN INSERT ("id", "amount") VALUES (s."id", s."amount");'
+        ]
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_frame_group_load_queries_append(self, fetch_object, get_watermark_predicate):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"loadMode": "append"}
+        })
+        get_watermark_predicate.return_value = 's."id" > 100'
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.frame_group_load_queries(schema="sales", table="events", staging_table="events_staging") == [
+            'INSERT INTO sales.events ("id") SELECT "id" FROM sales.events_staging AS s WHERE s."id" > 100;'
+        ]
+
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_frame_group_load_queries_temp_staging(self, fetch_object):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "stagingMode": "temp"}
+        })
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.frame_group_load_queries(schema="sales", table="regions", staging_table="regions_staging") == -6
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    def test_execute_incremental_load_group_successful(self, run_batch_query):
+        run_batch_query.return_value = "query_id"
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_group(loads=[
+            {"tableName": "regions", "queries": ["q1;"]},
+            {"tableName": "currencies", "queries": ["q2;", "q3;"]}
+        ], retry_attempts=1) == [
+            {"tableName": "regions", "statusCode": 200, "message": "SUCCESS", "attempts": 1},
+            {"tableName": "currencies", "statusCode": 200, "message": "SUCCESS", "attempts": 1}
+        ]
+        assert run_batch_query.call_args.kwargs.get("queries") == ["q1;", "q2;", "q3;"]
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    def test_execute_incremental_load_group_retries_tables(self, run_batch_query):
+        run_batch_query.side_effect = [None, "query_id", None, None]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_group(loads=[
+            {"tableName": "regions", "queries": ["q1;"]},
+            {"tableName": "currencies", "queries": ["q2;"]}
+        ], retry_attempts=2) == [
+            {"tableName": "regions", "statusCode": 200, "message": "SUCCESS", "attempts": 2},
+            {"tableName": "currencies", "statusCode": 500, "message": "Error in executing SQL query", "attempts": 3}
+        ]
+        assert run_batch_query.call_args_list[1].kwargs.get("queries") == ["q1;"]
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_group')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.frame_group_load_queries')
+    def test_lambda_handler_group_load(self, frame_group_load_queries, execute_incremental_load_group):
+        frame_group_load_queries.side_effect = [["q1;"], -2, ["q2;"], ["q3;"]]
+        execute_incremental_load_group.side_effect = [
+            [
+                {"tableName": "regions", "statusCode": 200, "message": "SUCCESS", "attempts": 1},
+                {"tableName": "currencies", "statusCode": 200, "message": "SUCCESS", "attempts": 1}
+            ],
+            [{"tableName": "products", "statusCode": 200, "message": "SUCCESS", "attempts": 1}]
+        ]
+        response = lambda_handler(event={"input": {
+            "databaseName": "sales",
+            "groupBatchSize": 2,
+            "tables": [
+                {"tableName": "regions", "stagingTableName": "regions_staging"},
+                {"tableName": "orders", "stagingTableName": "orders_staging"},
+                {"tableName": "currencies", "stagingTableName": "currencies_staging"},
+                {"tableName": "products", "stagingTableName": "products_staging"}
+            ]
+        }}, context=None)
+        assert response.get("statusCode") == 500
+        assert response.get("loadedTables") == ["regions", "currencies", "products"]
+        assert response.get("tableOutcomes")[0] == {
+            "tableName": "orders", "statusCode": 404, "message": "No primary key found"
+        }
+        assert execute_incremental_load_group.call_args_list[0].kwargs.get("loads") == [
+            {"tableName": "regions", "queries": ["q1;"]},
+            {"tableName": "currencies", "queries": ["q2;"]}
+        ]
+
+    def test_frame_external_table_query(self):
+        redshift = RedshiftService(
+            redshift=None,
+            s3={"data_bucket_name": "data_bucket", "s3_data_prefix": "staging/sales/orders/"},
+            redshift_params={},
+            spectrum_params={"external_schema": "spectrum"},
+            logger=logger
+        )
+        schema = {"columns": {"id": "int8", "amount": "numeric(12,2)", "note": "text", "city": "varchar(40)"}}
+        assert redshift.frame_external_table_query(schema, "orders") == \
+               'CREATE EXTERNAL TABLE spectrum.orders ("id" bigint, "amount" decimal(12,2), ' \
+               '"note" varchar(65535), "city" varchar(40)) PARTITIONED BY (delta_date varchar(10)) ' \
+               "STORED AS PARQUET LOCATION 's3://data_bucket/staging/sales/orders/';"
+
+    def test_frame_external_data_type_varchar_without_length(self):
+        assert RedshiftService.frame_external_data_type("varchar") == "varchar(65535)"
+        assert RedshiftService.frame_external_data_type("character varying") == "varchar(65535)"
+        assert RedshiftService.frame_external_data_type("nvarchar") == "varchar(65535)"
+        assert RedshiftService.frame_external_data_type("varchar(40)") == "varchar(40)"
+        assert RedshiftService.frame_external_data_type("character varying(40)") == "character varying(40)"
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_prepare_external_table_reuses_existing_table(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[{"longValue": 1}]]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={"data_bucket_name": "data_bucket", "s3_data_prefix": "staging/sales/orders/"},
+            redshift_params={},
+            spectrum_params={"external_schema": "spectrum"},
+            logger=logger
+        )
+        assert redshift.prepare_external_table({"columns": {"id": "bigint"}}, "orders", "2026-10-19") == \
+               "spectrum.orders"
+        assert run_query.call_count == 2
+        assert run_query.call_args.kwargs.get("query") == \
+               "ALTER TABLE spectrum.orders ADD IF NOT EXISTS PARTITION (delta_date = '2026-10-19') " \
+               "LOCATION 's3://data_bucket/staging/sales/orders/delta_date=2026-10-19/';"
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_query')
+    def test_prepare_external_table_create_unsuccessful(self, run_query, get_query_results):
+        run_query.side_effect = ["query_id", None]
+        get_query_results.return_value = [[{"longValue": 0}]]
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            spectrum_params={"external_schema": "spectrum"},
+            logger=logger
+        )
+        assert redshift.prepare_external_table({"columns": {"id": "bigint"}}, "orders", "2026-10-19") is None
+        assert run_query.call_args.kwargs.get("query").startswith("CREATE EXTERNAL TABLE spectrum.orders")
+
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.incremental_load.services.redshift_service.RedshiftService.prepare_external_table')
+    @patch('lambdas.incremental_load.services.redshift_service.S3Helper.fetch_object')
+    def test_execute_incremental_load_temp_staging_spectrum(self, fetch_object, prepare_external_table,
+                                                            run_batch_query):
+        fetch_object.return_value = json.dumps({
+            "columns": {"id": "bigint"},
+            "tableConfigurations": {"primaryKey": "id", "stagingMode": "spectrum"}
+        })
+        prepare_external_table.return_value = "spectrum.orders"
+        run_batch_query.return_value = "query_id"
+        redshift = RedshiftService(
+            redshift=None,
+            s3={},
+            redshift_params={},
+            logger=logger
+        )
+        assert redshift.execute_incremental_load_temp_staging(schema="sales", table="orders",
+                                                              staging_table="orders_staging", load_mode="merge",
+                                                              delta_date="2026-10-19") == {"duplicatesRemoved": 0}
+        assert run_batch_query.call_args.kwargs.get("queries") == [
+            'CREATE TEMP TABLE orders_staging__temp (LIKE sales.orders_staging);',
+            'INSERT INTO orders_staging__temp ("id") SELECT "id" FROM spectrum.orders '
+            "WHERE delta_date = '2026-10-19';",
+            'MERGE INTO sales.orders AS t USING orders_staging__temp AS s ON t."id" = s."id" '
+            'WHEN MATCHED THEN UPDATE SET "id" = s."id" '
+            'WHEN NOT MATCHED THEN INSERT ("id") VALUES (s."id");'
+        ]
+
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.execute_incremental_load_temp_staging')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_staging_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_watermark_predicate')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.deduplicate_staging_table')
+    def test_lambda_handler_spectrum_external_table_unsuccessful(self, deduplicate_staging_table, get_load_mode,
+                                                                 get_watermark_predicate, get_staging_mode,
+                                                                 execute_incremental_load_temp_staging):
+        deduplicate_staging_table.return_value = None
+        get_load_mode.return_value = "upsert"
+        get_watermark_predicate.return_value = ""
+        get_staging_mode.return_value = "spectrum"
+        execute_incremental_load_temp_staging.return_value = -7
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in preparing external table')
+        }
+        assert lambda_handler(event={"input": {"tableName": "orders", "deltaDate": "2026-10-19"}},
+                              context=None) == expected_output
+        assert execute_incremental_load_temp_staging.call_args.kwargs.get("delta_date") == "2026-10-19"
+
+    @mock_dynamodb
+    def test_lease_helper_acquire_and_release(self):
+        dynamodb = create_lease_table()
+        lease = LeaseHelper(dynamodb=dynamodb, table_name='table_leases', owner='first', logger=logger)
+        other_lease = LeaseHelper(dynamodb=dynamodb, table_name='table_leases', owner='second', logger=logger)
+        assert lease.acquire("sales", "orders") is True
+        assert lease.acquire("sales", "orders") is True
+        assert other_lease.acquire("sales", "orders") is False
+        assert other_lease.release("sales", "orders") is None
+        assert lease.release("sales", "orders") is True
+        assert other_lease.acquire("sales", "orders") is True
+        other_lease.release("sales", "orders")
+
+    @mock_dynamodb
+    def test_lease_helper_acquire_expired_lease(self):
+        dynamodb = create_lease_table()
+        dynamodb.Table('table_leases').put_item(Item={
+            "databaseName": "sales",
+            "tableName": "orders",
+            "ownerId": "crashed",
+            "acquiredAt": 0,
+            "expiresAt": 300
+        })
+        lease = LeaseHelper(dynamodb=dynamodb, table_name='table_leases', owner='first', logger=logger)
+        assert lease.acquire("sales", "orders") is True
+        assert lease.renew("sales", "orders") is True
+        lease.release("sales", "orders")
+
+    @mock_dynamodb
+    def test_lease_helper_hand_over(self):
+        dynamodb = create_lease_table()
+        lease = LeaseHelper(dynamodb=dynamodb, table_name='table_leases', owner='first', logger=logger)
+        next_step_lease = LeaseHelper(dynamodb=dynamodb, table_name='table_leases', owner='second', logger=logger)
+        retry_lease = LeaseHelper(dynamodb=dynamodb, table_name='table_leases', owner='retry', logger=logger)
+        assert lease.acquire("sales", "orders") is True
+        lease.detach("sales", "orders")
+        assert retry_lease.acquire("sales", "orders") is False
+        assert next_step_lease.acquire("sales", "orders", "first") is True
+        # A retry of the next step presenting the same token waits for the attempt holding the lease
+        assert retry_lease.acquire("sales", "orders", "first") is False
+        assert lease.release("sales", "orders") is None
+        assert next_step_lease.release("sales", "orders") is True
+
+    @mock_dynamodb
+    def test_lease_helper_acquire_unsuccessful(self):
+        dynamodb = boto3.resource('dynamodb')
+        lease = LeaseHelper(dynamodb=dynamodb, table_name='table_leases', owner='first', logger=logger)
+        assert lease.acquire("sales", "orders") is None
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.incremental_load.lambda_function.LeaseHelper.acquire')
+    def test_lambda_handler_lease_held(self, acquire):
+        acquire.return_value = False
+        expected_output = {
+            'statusCode': 409,
+            'message': json.dumps('Table is being loaded by another execution')
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales", "tableName": "orders"}},
+                              context=None) == expected_output
+
+    @patch.dict('os.environ', {"LEASE_TABLE_NAME": "table_leases"})
+    @patch('lambdas.incremental_load.lambda_function.LeaseHelper.release')
+    @patch('lambdas.incremental_load.lambda_function.LeaseHelper.acquire')
+    @patch('lambdas.incremental_load.lambda_function.RedshiftService.get_load_mode')
+    def test_lambda_handler_lease_released(self, get_load_mode, acquire, release):
+        get_load_mode.return_value = -1
+        acquire.return_value = True
+        assert lambda_handler(event={"input": {"databaseName": "sales", "tableName": "orders"}},
+                              context=None).get("statusCode") == 404
+        release.assert_called_once_with("sales", "orders")
+
+    def test_retry_policy_classification(self):
+        retry_policy = RetryPolicy(logger=logger)
+        assert retry_policy.is_transient(
+            ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "ExecuteStatement")
+        )
+        assert retry_policy.is_transient(
+            ClientError({"Error": {"Code": "ActiveStatementsExceededException", "Message": "Active statements "
+                                   "exceeded the allowed quota"}}, "ExecuteStatement")
+        )
+        assert not retry_policy.is_transient(
+            ClientError({"Error": {"Code": "ValidationException", "Message": "Invalid SQL"}}, "ExecuteStatement")
+        )
+        assert retry_policy.is_transient(
+            StatementError("ERROR: 1023 DETAIL: Serializable isolation violation on table - 100, transactions "
+                           "forming the cycle are: 200, 201")
+        )
+        assert not retry_policy.is_transient(StatementError('ERROR: syntax error at or near "SELEC"'))
+        assert not retry_policy.is_transient(StatementError("ERROR: permission denied for relation orders"))
+        assert not retry_policy.is_transient(Exception("Unexpected error"))
+
+    @patch('lambdas.incremental_load.helpers.retry_policy.time.sleep')
+    def test_retry_policy_call_within_budget(self, sleep):
+        throttled = ClientError({"Error": {"Code": "ThrottlingException", "Message": ""}}, "ExecuteStatement")
+        function = MagicMock(side_effect=[throttled, throttled, "query_id"])
+        assert RetryPolicy(logger=logger, max_attempts=3).call(function, Sql="SELECT 1;") == "query_id"
+        assert function.call_count == 3
+        function = MagicMock(side_effect=[throttled, throttled, "query_id"])
+        with self.assertRaises(ClientError):
+            RetryPolicy(logger=logger, max_attempts=2).call(function, Sql="SELECT 1;")
+        assert function.call_count == 2
+
+    @patch('lambdas.incremental_load.helpers.retry_policy.time.sleep')
+    def test_helper_run_query_retries_serializable_isolation_violation(self, sleep):
+        redshift = MagicMock()
+        redshift.execute_statement.return_value = {"Id": "query_id"}
+        redshift.describe_statement.side_effect = [
+            {"Status": "FAILED", "Error": "ERROR: 1023 DETAIL: Serializable isolation violation on table - 100"},
+            {"Status": "STARTED"},
+            {"Status": "FINISHED"}
+        ]
+        assert RedshiftHelper(redshift=redshift, logger=logger).run_query(query="SELECT 1;") == "query_id"
+        assert redshift.execute_statement.call_count == 2
+
+    @patch('lambdas.incremental_load.helpers.retry_policy.time.sleep')
+    def test_helper_run_query_submit_timeout_not_resubmitted(self, sleep):
+        redshift = MagicMock()
+        redshift.execute_statement.side_effect = ReadTimeoutError(endpoint_url="https://redshift-data")
+        assert RedshiftHelper(redshift=redshift, logger=logger).run_query(query="SELECT 1;") is None
+        assert redshift.execute_statement.call_count == 1
+        redshift.batch_execute_statement.side_effect = ReadTimeoutError(endpoint_url="https://redshift-data")
+        assert RedshiftHelper(redshift=redshift, logger=logger).run_batch_query(queries=["SELECT 1;"]) is None
+        assert redshift.batch_execute_statement.call_count == 1
+
+    @patch('lambdas.incremental_load.helpers.retry_policy.time.sleep')
+    def test_helper_run_query_retries_rejected_submit(self, sleep):
+        redshift = MagicMock()
+        redshift.execute_statement.side_effect = [
+            ClientError({"Error": {"Code": "ActiveStatementsExceededException", "Message": ""}}, "ExecuteStatement"),
+            {"Id": "query_id"}
+        ]
+        redshift.describe_statement.return_value = {"Status": "FINISHED"}
+        assert RedshiftHelper(redshift=redshift, logger=logger).run_query(query="SELECT 1;") == "query_id"
+        assert redshift.execute_statement.call_count == 2
+
+    def test_helper_run_batch_query_fails_fast(self):
+        redshift = MagicMock()
+        redshift.batch_execute_statement.return_value = {"Id": "query_id"}
+        redshift.describe_statement.return_value = {"Status": "FAILED", "Error": 'ERROR: syntax error at or near "SELEC"'}
+        assert RedshiftHelper(redshift=redshift, logger=logger).run_batch_query(queries=["SELEC 1;"]) is None
+        assert redshift.batch_execute_statement.call_count == 1
+
+    @mock_dynamodb
+    def test_statement_semaphore_limit(self):
+        dynamodb = create_semaphore_table()
+        semaphore = StatementSemaphore(dynamodb=dynamodb, table_name='statement_semaphore', limit=2,
+                                       wait_seconds=0.1, logger=logger)
+        first_slot = semaphore.acquire()
+        second_slot = semaphore.acquire()
+        assert {first_slot.get("slot"), second_slot.get("slot")} == {0, 1}
+        with self.assertRaisesRegex(Exception, "No statement slot of redshift-data-api freed up"):
+            semaphore.acquire()
+        semaphore.release(first_slot)
+        assert semaphore.acquire().get("slot") == first_slot.get("slot")
+
+    @mock_dynamodb
+    def test_statement_semaphore_expired_slot(self):
+        dynamodb = create_semaphore_table()
+        dynamodb.Table('statement_semaphore').put_item(Item={
+            "semaphoreName": "redshift-data-api",
+            "slotId": 0,
+            "ownerId": "crashed",
+            "expiresAt": 300
+        })
+        semaphore = StatementSemaphore(dynamodb=dynamodb, table_name='statement_semaphore', limit=1,
+                                       wait_seconds=0.1, logger=logger)
+        assert semaphore.acquire().get("slot") == 0
+
+    def test_statement_semaphore_disabled(self):
+        semaphore = StatementSemaphore(table_name=None, logger=logger)
+        assert semaphore.acquire() is None
+        semaphore.release(None)
+
+    def test_helper_run_query_holds_semaphore_slot(self):
+        redshift = MagicMock()
+        redshift.execute_statement.return_value = {"Id": "query_id"}
+        redshift.describe_statement.return_value = {"Status": "FAILED", "Error": "ERROR: permission denied"}
+        semaphore = MagicMock()
+        semaphore.acquire.return_value = {"slot": 3, "ownerId": "owner", "renewedAt": 0}
+        assert RedshiftHelper(redshift=redshift, semaphore=semaphore, logger=logger).run_query(
+            query="SELECT 1;"
+        ) is None
+        semaphore.release.assert_called_once_with({"slot": 3, "ownerId": "owner", "renewedAt": 0})
+
+    def test_helper_run_query_semaphore_timeout(self):
+        redshift = MagicMock()
+        semaphore = MagicMock()
+        semaphore.acquire.side_effect = StatementError("No statement slot freed up", transient=False)
+        assert RedshiftHelper(redshift=redshift, semaphore=semaphore, logger=logger).run_query(
+            query="SELECT 1;"
+        ) is None
+        redshift.execute_statement.assert_not_called()
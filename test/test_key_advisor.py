@@ -0,0 +1,253 @@
+import json
+import unittest
+from unittest.mock import patch
+import boto3
+from aws_lambda_powertools import Logger
+from moto import mock_s3
+
+from lambdas.key_advisor.helpers.s3_helper import S3Helper
+from lambdas.key_advisor.services.key_advisor_service import KeyAdvisorService
+from lambdas.key_advisor.lambda_function import lambda_handler
+
+logger = Logger()
+
+schema = {
+    "columns": {
+        "id": "bigint",
+        "customer_id": "bigint",
+        "created_at": "timestamp",
+        "status": "varchar"
+    },
+    "tableConfigurations": {
+        "primaryKey": "id"
+    },
+    "redshiftConfigurations": {
+        "distkey": "id",
+        "compoundSortkey": "id"
+    }
+}
+
+history = {
+    "table": {
+        "diststyle": "KEY(id)",
+        "sortkey1": "id",
+        "tblRows": 5000000
+    },
+    "queries": [
+        {
+            "query": 1,
+            "queryText": "select * from sales.orders o join sales.customers c on o.customer_id = c.customer_id "
+                         "where o.created_at >= '2023-01-01'",
+            "rows": 100,
+            "rowsPreFilter": 1000,
+            "bytes": 10000,
+            "redistributedBytes": 4000
+        },
+        {
+            "query": 2,
+            "queryText": 'select status, count(*) from sales.orders where "created_at" between 1 and 2 group by status',
+            "rows": 500,
+            "rowsPreFilter": 1000,
+            "bytes": 2000,
+            "redistributedBytes": 0
+        }
+    ]
+}
+
+
+class TestKeyAdvisor(unittest.TestCase):
+    @mock_s3
+    def test_helper_put_object_without_exception(self):
+        s3 = boto3.resource('s3')
+        bucket = s3.Bucket('sample_bucket')
+        bucket.create(CreateBucketConfiguration={
+            'LocationConstraint': 'ap-south-1',
+        })
+        s3_helper = S3Helper(logger=logger)
+        assert s3_helper.put_object(s3, bucket_name='sample_bucket', key='object_name.txt', body='Hello') is True
+        assert s3_helper.fetch_object(s3, bucket_name='sample_bucket', key='object_name.txt') == 'Hello'
+
+    @mock_s3
+    def test_helper_put_object_with_exception(self):
+        s3 = boto3.resource('s3')
+        s3_helper = S3Helper(logger=logger)
+        assert s3_helper.put_object(s3, bucket_name='sample_bucket1', key='object_name.txt', body='Hello') is None
+
+    def test_get_predicate_columns(self):
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        filter_columns, join_columns = key_advisor.get_predicate_columns(
+            history.get("queries")[0].get("queryText"), list(schema.get("columns").keys())
+        )
+        assert filter_columns == {"created_at"}
+        assert join_columns == {"customer_id"}
+
+    def test_recommend_keys(self):
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        recommendation = key_advisor.recommend_keys(schema, history)
+        assert recommendation.get("queriesAnalyzed") == 2
+        assert recommendation.get("sortKey") == {
+            "current": "id",
+            "recommended": "created_at",
+            "estimatedScanSavingsBytes": 10000,
+            "estimatedScanSavingsPct": 83.33
+        }
+        assert recommendation.get("distribution") == {
+            "currentStyle": "key",
+            "currentKey": "id",
+            "recommendedStyle": "key",
+            "recommendedKey": "customer_id",
+            "estimatedRedistributionSavingsBytes": 4000
+        }
+
+    def test_recommend_keys_small_table(self):
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        recommendation = key_advisor.recommend_keys(
+            schema, {"table": {"tblRows": 10}, "queries": history.get("queries")[1:]}
+        )
+        assert recommendation.get("distribution").get("recommendedStyle") == "all"
+
+    def test_recommend_keys_without_evidence(self):
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        recommendation = key_advisor.recommend_keys(schema, {"table": {"tblRows": 10}, "queries": []})
+        assert recommendation.get("queriesAnalyzed") == 0
+        assert recommendation.get("sortKey").get("recommended") == "id"
+        assert recommendation.get("distribution") == {
+            "currentStyle": "key",
+            "currentKey": "id",
+            "recommendedStyle": "key",
+            "recommendedKey": "id",
+            "estimatedRedistributionSavingsBytes": 0
+        }
+
+        no_join_history = {"table": history.get("table"), "queries": history.get("queries")[1:]}
+        recommendation = key_advisor.recommend_keys(schema, no_join_history)
+        assert recommendation.get("distribution").get("recommendedStyle") == "key"
+        assert recommendation.get("distribution").get("recommendedKey") == "id"
+
+        no_savings_history = {
+            "table": history.get("table"),
+            "queries": [{**history.get("queries")[0], "redistributedBytes": 0}]
+        }
+        recommendation = key_advisor.recommend_keys(schema, no_savings_history)
+        assert recommendation.get("distribution").get("recommendedKey") == "id"
+        assert recommendation.get("distribution").get("estimatedRedistributionSavingsBytes") == 0
+        assert KeyAdvisorService.apply_recommendation(schema, recommendation).get("redshiftConfigurations") == {
+            "distkey": "id",
+            "compoundSortkey": "created_at"
+        }
+
+    def test_apply_recommendation(self):
+        recommendation = {
+            "sortKey": {"current": "id", "recommended": "created_at"},
+            "distribution": {"currentStyle": "key", "currentKey": "id", "recommendedStyle": "all",
+                             "recommendedKey": None}
+        }
+        updated_schema = KeyAdvisorService.apply_recommendation(schema, recommendation)
+        assert updated_schema.get("redshiftConfigurations") == {
+            "compoundSortkey": "created_at",
+            "diststyle": "all"
+        }
+        assert schema.get("redshiftConfigurations").get("distkey") == "id"
+        assert KeyAdvisorService.get_alter_statements("sales", "orders", schema, recommendation) == [
+            'ALTER TABLE sales.orders ALTER COMPOUND SORTKEY ("created_at");',
+            'ALTER TABLE sales.orders ALTER DISTSTYLE ALL;'
+        ]
+
+    def test_apply_recommendation_composite_sort_key(self):
+        composite_schema = {**schema, "redshiftConfigurations": {"distkey": "id", "compoundSortkey": "id, status"}}
+        recommendation = {
+            "sortKey": {"current": "id", "recommended": "created_at"},
+            "distribution": {"currentStyle": "key", "currentKey": "id", "recommendedStyle": "key",
+                             "recommendedKey": "id"}
+        }
+        assert KeyAdvisorService.apply_recommendation(composite_schema, recommendation).get(
+            "redshiftConfigurations") == {"distkey": "id", "compoundSortkey": "created_at, status"}
+        assert KeyAdvisorService.get_alter_statements("sales", "orders", composite_schema, recommendation) == [
+            'ALTER TABLE sales.orders ALTER COMPOUND SORTKEY ("created_at", "status");'
+        ]
+
+        recommendation["sortKey"]["recommended"] = "id"
+        assert KeyAdvisorService.apply_recommendation(composite_schema, recommendation) == composite_schema
+        assert KeyAdvisorService.get_alter_statements("sales", "orders", composite_schema, recommendation) == []
+
+    def test_apply_recommendation_interleaved_sort_key(self):
+        interleaved_schema = {**schema, "redshiftConfigurations": {"interleavedSortkey": "id, created_at"}}
+        recommendation = {
+            "sortKey": {"current": "id", "recommended": "status"},
+            "distribution": {"currentStyle": "auto", "currentKey": None, "recommendedStyle": "all",
+                             "recommendedKey": None}
+        }
+        assert KeyAdvisorService.apply_recommendation(interleaved_schema, recommendation).get(
+            "redshiftConfigurations") == {"interleavedSortkey": "id, created_at", "diststyle": "all"}
+        assert KeyAdvisorService.get_alter_statements("sales", "orders", interleaved_schema, recommendation) == [
+            'ALTER TABLE sales.orders ALTER DISTSTYLE ALL;'
+        ]
+
+    @patch('lambdas.key_advisor.services.key_advisor_service.S3Helper.fetch_object')
+    def test_advise_table_keys_schema_fetch_unsuccessful(self, fetch_object):
+        fetch_object.return_value = None
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        assert key_advisor.advise_table_keys(schema="sales", table="orders") == -1
+
+    @patch('lambdas.key_advisor.services.key_advisor_service.RedshiftHelper.run_query')
+    @patch('lambdas.key_advisor.services.key_advisor_service.S3Helper.fetch_object')
+    def test_advise_table_keys_history_unsuccessful(self, fetch_object, run_query):
+        fetch_object.return_value = json.dumps(schema)
+        run_query.return_value = None
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        assert key_advisor.advise_table_keys(schema="sales", table="orders") == -2
+
+    @patch('lambdas.key_advisor.services.key_advisor_service.S3Helper.put_object')
+    @patch('lambdas.key_advisor.services.key_advisor_service.S3Helper.fetch_object')
+    def test_advise_table_keys_offline_successful(self, fetch_object, put_object):
+        fetch_object.side_effect = [json.dumps(schema), json.dumps(history)]
+        put_object.return_value = True
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        response = key_advisor.advise_table_keys(schema="sales", table="orders", offline=True, apply=True)
+        assert response.get("schema").get("redshiftConfigurations") == {
+            "compoundSortkey": "created_at",
+            "distkey": "customer_id"
+        }
+        assert put_object.call_count == 2
+
+    @patch('lambdas.key_advisor.services.key_advisor_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.key_advisor.services.key_advisor_service.RedshiftHelper.run_query')
+    def test_get_query_history_successful(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [[{"longValue": 100}, {"stringValue": "KEY(id)"}, {"stringValue": "id"}, {"longValue": 10}]],
+            [[{"longValue": 1}, {"stringValue": "select 1"}, {"longValue": 1}, {"longValue": 2},
+              {"longValue": 30}, {"isNull": True}]]
+        ]
+        key_advisor = KeyAdvisorService(redshift=None, s3={}, redshift_params={}, logger=logger)
+        assert key_advisor.get_query_history("sales", "orders") == {
+            "table": {"diststyle": "KEY(id)", "sortkey1": "id", "tblRows": 10},
+            "queries": [{"query": 1, "queryText": "select 1", "rows": 1, "rowsPreFilter": 2, "bytes": 30,
+                         "redistributedBytes": 0}]
+        }
+
+    def test_lambda_handler_no_input(self):
+        expected_output = {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+        assert lambda_handler(event={}, context=None) == expected_output
+
+    @patch('lambdas.key_advisor.lambda_function.KeyAdvisorService.advise_table_keys')
+    def test_lambda_handler_history_unsuccessful(self, advise_table_keys):
+        advise_table_keys.return_value = -2
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting query history')
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch('lambdas.key_advisor.lambda_function.KeyAdvisorService.advise_table_keys')
+    def test_lambda_handler_success(self, advise_table_keys):
+        advise_table_keys.return_value = {"sortKey": {}, "distribution": {}}
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'recommendation': {"sortKey": {}, "distribution": {}}
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
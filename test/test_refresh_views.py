@@ -0,0 +1,114 @@
+import json
+import unittest
+from unittest.mock import patch
+from aws_lambda_powertools import Logger
+
+from lambdas.refresh_views.services.view_refresh_service import ViewRefreshService
+from lambdas.refresh_views.lambda_function import lambda_handler
+
+logger = Logger()
+
+
+def get_view_dependencies():
+    return {
+        "reports.daily_sales": {"dependsOn": {"sales.orders"}, "stale": True},
+        "reports.customer_sales": {"dependsOn": {"sales.orders", "sales.customers"}, "stale": True},
+        "reports.monthly_sales": {"dependsOn": {"reports.daily_sales"}, "stale": False},
+        "reports.inventory": {"dependsOn": {"sales.products"}, "stale": True}
+    }
+
+
+class TestRefreshViews(unittest.TestCase):
+
+    def test_plan_refresh(self):
+        view_refresh = ViewRefreshService(redshift=None, redshift_params={}, logger=logger)
+        assert view_refresh.plan_refresh(get_view_dependencies(), ["sales.orders"]) == ([
+            ["reports.customer_sales", "reports.daily_sales"],
+            ["reports.monthly_sales"]
+        ], [])
+        assert view_refresh.plan_refresh(get_view_dependencies(), ["sales.regions"]) == ([], [])
+
+    @patch('lambdas.refresh_views.services.view_refresh_service.ViewRefreshService.refresh_view')
+    @patch('lambdas.refresh_views.services.view_refresh_service.ViewRefreshService.get_view_dependencies')
+    def test_refresh_views_skips_circular_dependencies(self, get_view_dependencies_mock, refresh_view):
+        view_dependencies = get_view_dependencies()
+        view_dependencies["reports.daily_sales"]["dependsOn"].add("reports.monthly_sales")
+        get_view_dependencies_mock.return_value = view_dependencies
+        refresh_view.return_value = True
+        view_refresh = ViewRefreshService(redshift=None, redshift_params={}, logger=logger)
+        assert view_refresh.refresh_views(schema_name="sales", table_names=["orders"]) == {
+            "refreshed": ["reports.customer_sales"],
+            "failed": [],
+            "skipped": ["reports.daily_sales", "reports.monthly_sales"],
+            "upToDate": []
+        }
+
+    @patch('lambdas.refresh_views.services.view_refresh_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.refresh_views.services.view_refresh_service.RedshiftHelper.run_query')
+    def test_get_view_dependencies(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.side_effect = [
+            [[{"stringValue": "reports"}, {"stringValue": "daily_sales"}, {"stringValue": "f"}]],
+            [[{"stringValue": "reports"}, {"stringValue": "daily_sales"},
+              {"stringValue": "sales"}, {"stringValue": "orders"}]]
+        ]
+        view_refresh = ViewRefreshService(redshift=None, redshift_params={}, logger=logger)
+        assert view_refresh.get_view_dependencies() == {
+            "reports.daily_sales": {"dependsOn": {"sales.orders"}, "stale": False}
+        }
+
+    @patch('lambdas.refresh_views.services.view_refresh_service.RedshiftHelper.run_query')
+    @patch('lambdas.refresh_views.services.view_refresh_service.ViewRefreshService.get_view_dependencies')
+    def test_refresh_views_in_order(self, get_view_dependencies_mock, run_query):
+        get_view_dependencies_mock.return_value = get_view_dependencies()
+        run_query.return_value = "query_id"
+        view_refresh = ViewRefreshService(redshift=None, redshift_params={}, logger=logger)
+        assert view_refresh.refresh_views(schema_name="sales", table_names=["orders"]) == {
+            "refreshed": ["reports.customer_sales", "reports.daily_sales", "reports.monthly_sales"],
+            "failed": [],
+            "skipped": [],
+            "upToDate": []
+        }
+        assert run_query.call_args.kwargs.get("query") == "REFRESH MATERIALIZED VIEW reports.monthly_sales;"
+
+    @patch('lambdas.refresh_views.services.view_refresh_service.ViewRefreshService.refresh_view')
+    @patch('lambdas.refresh_views.services.view_refresh_service.ViewRefreshService.get_view_dependencies')
+    def test_refresh_views_skips_dependents_of_failed_views(self, get_view_dependencies_mock, refresh_view):
+        get_view_dependencies_mock.return_value = get_view_dependencies()
+        refresh_view.side_effect = lambda view: view != "reports.daily_sales"
+        view_refresh = ViewRefreshService(redshift=None, redshift_params={}, logger=logger)
+        assert view_refresh.refresh_views(schema_name="sales", table_names=["orders"]) == {
+            "refreshed": ["reports.customer_sales"],
+            "failed": ["reports.daily_sales"],
+            "skipped": ["reports.monthly_sales"],
+            "upToDate": []
+        }
+
+    @patch('lambdas.refresh_views.services.view_refresh_service.ViewRefreshService.refresh_view')
+    @patch('lambdas.refresh_views.services.view_refresh_service.ViewRefreshService.get_view_dependencies')
+    def test_refresh_views_leaves_views_up_to_date(self, get_view_dependencies_mock, refresh_view):
+        view_dependencies = get_view_dependencies()
+        view_dependencies["reports.daily_sales"]["stale"] = False
+        get_view_dependencies_mock.return_value = view_dependencies
+        refresh_view.return_value = True
+        view_refresh = ViewRefreshService(redshift=None, redshift_params={}, logger=logger)
+        response = view_refresh.refresh_views(schema_name="sales", table_names=["orders"])
+        assert response.get("refreshed") == ["reports.customer_sales"]
+        assert response.get("upToDate") == ["reports.daily_sales", "reports.monthly_sales"]
+
+    def test_lambda_handler_no_loaded_tables(self):
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS"
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales"}}, context=None) == expected_output
+
+    @patch('lambdas.refresh_views.lambda_function.ViewRefreshService.refresh_views')
+    def test_lambda_handler_dependencies_unavailable(self, refresh_views):
+        refresh_views.return_value = -1
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting materialized view dependencies')
+        }
+        assert lambda_handler(event={"input": {"databaseName": "sales"}, "loadedTables": ["orders"]},
+                              context=None) == expected_output
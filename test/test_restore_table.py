@@ -0,0 +1,185 @@
+import json
+import unittest
+from unittest.mock import patch
+from aws_lambda_powertools import Logger
+
+from lambdas.restore_table.services.restore_service import RestoreService
+from lambdas.restore_table.lambda_function import lambda_handler
+
+logger = Logger()
+
+manifest = {
+    "watermarkColumn": "updated_at",
+    "watermark": "2026-10-01 00:00:00",
+    "fullImage": {
+        "backupId": "full-1",
+        "path": "s3://backup_bucket/backups/sales/orders/full-1/",
+        "backedUpAt": "2026-09-01 00:00:00"
+    },
+    "increments": [
+        {"backupId": "incremental-2", "path": "s3://backup_bucket/backups/sales/orders/incremental-2/"}
+    ]
+}
+
+
+def get_restore_service():
+    return RestoreService(
+        redshift=None,
+        s3={},
+        redshift_params={},
+        dynamodb={"checkpoint_table_name": "checkpoints"},
+        restore_params={"iam_role": "arn:aws:iam::123:role/restore"},
+        logger=logger
+    )
+
+
+class TestRestoreTable(unittest.TestCase):
+    def test_frame_restore_queries(self):
+        schema = {"columns": {"id": "bigint"}, "tableConfigurations": {"primaryKey": "id"}}
+        assert get_restore_service().frame_restore_queries(schema, "sales", "orders", manifest) == [
+            "DROP TABLE IF EXISTS sales.orders__restore;",
+            "CREATE TABLE sales.orders__restore (LIKE sales.orders);",
+            "COPY sales.orders__restore FROM 's3://backup_bucket/backups/sales/orders/full-1/manifest' "
+            "IAM_ROLE 'arn:aws:iam::123:role/restore' FORMAT AS PARQUET MANIFEST;",
+            "CREATE TEMP TABLE orders__increment (LIKE sales.orders);",
+            "DELETE FROM orders__increment;",
+            "COPY orders__increment FROM 's3://backup_bucket/backups/sales/orders/incremental-2/manifest' "
+            "IAM_ROLE 'arn:aws:iam::123:role/restore' FORMAT AS PARQUET MANIFEST;",
+            'DELETE FROM sales.orders__restore USING orders__increment AS i '
+            'WHERE sales.orders__restore."id" = i."id";',
+            "INSERT INTO sales.orders__restore SELECT * FROM orders__increment;",
+            "ALTER TABLE sales.orders RENAME TO orders__old;",
+            "ALTER TABLE sales.orders__restore RENAME TO orders;",
+            "DROP TABLE sales.orders__old;"
+        ]
+
+    def test_frame_restore_queries_without_primary_key(self):
+        queries = get_restore_service().frame_restore_queries({"columns": {"id": "bigint"}}, "sales", "events",
+                                                              manifest)
+        assert queries[3] == "COPY sales.events__restore FROM " \
+                             "'s3://backup_bucket/backups/sales/orders/incremental-2/manifest' " \
+                             "IAM_ROLE 'arn:aws:iam::123:role/restore' FORMAT AS PARQUET MANIFEST;"
+        assert len(queries) == 7
+
+    @patch('lambdas.restore_table.services.restore_service.S3Helper.fetch_object')
+    def test_restore_table_no_backup(self, fetch_object):
+        fetch_object.side_effect = [json.dumps({"columns": {"id": "bigint"}}), None]
+        assert get_restore_service().restore_table(schema="sales", table="orders") == -2
+
+    def test_frame_restore_queries_grants(self):
+        schema = {"columns": {"id": "bigint"}, "primary_key": ["id"]}
+        queries = get_restore_service().frame_restore_queries(
+            schema, "sales", "orders", manifest, grant_queries=['GRANT SELECT ON sales.orders TO "analyst";']
+        )
+        assert queries[-3:] == [
+            "ALTER TABLE sales.orders__restore RENAME TO orders;",
+            'GRANT SELECT ON sales.orders TO "analyst";',
+            "DROP TABLE sales.orders__old;"
+        ]
+
+    def test_frame_restore_queries_in_place(self):
+        schema = {"columns": {"id": "bigint"}, "primary_key": ["id"]}
+        queries = get_restore_service().frame_restore_queries(schema, "sales", "orders", manifest, in_place=True)
+        assert queries[-3:] == [
+            "DELETE FROM sales.orders;",
+            "INSERT INTO sales.orders SELECT * FROM sales.orders__restore;",
+            "DROP TABLE sales.orders__restore;"
+        ]
+        assert not [query for query in queries if "RENAME" in query]
+
+    def test_get_rewound_checkpoint(self):
+        assert RestoreService.get_rewound_checkpoint("2026-09-30", "2026-10-01 00:00:00") == "2026-09-30"
+        assert RestoreService.get_rewound_checkpoint("2026-10-15 08:00:00", "2026-10-01 00:00:00") == \
+            "2026-10-01 00:00:00"
+        assert RestoreService.get_rewound_checkpoint(None, "2026-10-01 00:00:00") == "2026-10-01 00:00:00"
+        assert RestoreService.get_rewound_checkpoint("unknown", "2026-10-01 00:00:00") == "2026-10-01 00:00:00"
+
+    @patch('lambdas.restore_table.services.restore_service.SwapHelper.get_grant_queries')
+    @patch('lambdas.restore_table.services.restore_service.SwapHelper.get_dependent_objects')
+    @patch('lambdas.restore_table.services.restore_service.DynamoDBHelper.update_item')
+    @patch('lambdas.restore_table.services.restore_service.DynamoDBHelper.get_item')
+    @patch('lambdas.restore_table.services.restore_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.restore_table.services.restore_service.S3Helper.fetch_object')
+    def test_restore_table_successful(self, fetch_object, run_batch_query, get_item, update_item,
+                                      get_dependent_objects, get_grant_queries):
+        fetch_object.side_effect = [json.dumps({"columns": {"id": "bigint"}}), json.dumps(manifest)]
+        run_batch_query.return_value = "query_id"
+        get_item.return_value = {
+            "changeFlag": 0,
+            "redshiftTimestampCheckpoint": "2026-10-15 08:00:00",
+            "prevRedshiftTimestampCheckpoint": "2026-10-14 08:00:00"
+        }
+        update_item.return_value = True
+        get_dependent_objects.return_value = 0
+        get_grant_queries.return_value = ['GRANT SELECT ON sales.orders TO "analyst";']
+        assert get_restore_service().restore_table(schema="sales", table="orders") == {
+            "fullImage": "full-1",
+            "increments": ["incremental-2"],
+            "watermark": "2026-10-01 00:00:00",
+            "checkpoint": "2026-10-01 00:00:00",
+            "hardDeletesRestoredSince": "2026-09-01 00:00:00"
+        }
+        assert update_item.call_args.kwargs.get("expression_attribute_values") == {
+            ":redshiftRecordCheckpoint": None,
+            ":redshiftTimestampCheckpoint": "2026-10-01 00:00:00",
+            ":changeFlag": 0
+        }
+        queries = run_batch_query.call_args.kwargs.get("queries")
+        assert queries[-2] == 'GRANT SELECT ON sales.orders TO "analyst";'
+
+    @patch('lambdas.restore_table.services.restore_service.SwapHelper.get_grant_queries')
+    @patch('lambdas.restore_table.services.restore_service.SwapHelper.get_dependent_objects')
+    @patch('lambdas.restore_table.services.restore_service.DynamoDBHelper.update_item')
+    @patch('lambdas.restore_table.services.restore_service.DynamoDBHelper.get_item')
+    @patch('lambdas.restore_table.services.restore_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.restore_table.services.restore_service.S3Helper.fetch_object')
+    def test_restore_table_dependent_views(self, fetch_object, run_batch_query, get_item, update_item,
+                                           get_dependent_objects, get_grant_queries):
+        fetch_object.side_effect = [json.dumps({"columns": {"id": "bigint"}}), json.dumps(manifest)]
+        run_batch_query.return_value = "query_id"
+        get_item.return_value = {"changeFlag": 1, "prevRedshiftTimestampCheckpoint": "2026-09-30"}
+        update_item.return_value = True
+        get_dependent_objects.return_value = 2
+        assert get_restore_service().restore_table(schema="sales", table="orders").get("checkpoint") == \
+            "2026-09-30"
+        get_grant_queries.assert_not_called()
+        assert run_batch_query.call_args.kwargs.get("queries")[-3] == "DELETE FROM sales.orders;"
+
+    @patch('lambdas.restore_table.services.restore_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.restore_table.services.restore_service.S3Helper.fetch_object')
+    def test_restore_table_no_watermark(self, fetch_object, run_batch_query):
+        fetch_object.side_effect = [
+            json.dumps({"columns": {"id": "bigint"}}), json.dumps({**manifest, "watermark": None})
+        ]
+        assert get_restore_service().restore_table(schema="sales", table="orders") == -5
+        run_batch_query.assert_not_called()
+
+    @patch('lambdas.restore_table.services.restore_service.SwapHelper.get_grant_queries')
+    @patch('lambdas.restore_table.services.restore_service.SwapHelper.get_dependent_objects')
+    @patch('lambdas.restore_table.services.restore_service.DynamoDBHelper.get_item')
+    @patch('lambdas.restore_table.services.restore_service.RedshiftHelper.run_batch_query')
+    @patch('lambdas.restore_table.services.restore_service.S3Helper.fetch_object')
+    def test_restore_table_unsuccessful(self, fetch_object, run_batch_query, get_item, get_dependent_objects,
+                                        get_grant_queries):
+        fetch_object.side_effect = [json.dumps({"columns": {"id": "bigint"}}), json.dumps(manifest)]
+        run_batch_query.return_value = None
+        get_dependent_objects.return_value = 0
+        get_grant_queries.return_value = []
+        assert get_restore_service().restore_table(schema="sales", table="orders") == -3
+        get_item.assert_not_called()
+
+    def test_lambda_handler_no_input(self):
+        expected_output = {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+        assert lambda_handler(event={}, context=None) == expected_output
+
+    @patch('lambdas.restore_table.lambda_function.RestoreService.restore_table')
+    def test_lambda_handler_checkpoint_unsuccessful(self, restore_table):
+        restore_table.return_value = -4
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in rewinding checkpoint')
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
@@ -0,0 +1,173 @@
+import json
+import unittest
+from unittest.mock import patch
+import boto3
+from aws_lambda_powertools import Logger
+from moto import mock_dynamodb
+
+from lambdas.table_health_monitor.helpers.dynamodb_helper import DynamoDBHelper
+from lambdas.table_health_monitor.services.table_health_service import TableHealthService
+from lambdas.table_health_monitor.lambda_function import lambda_handler
+
+logger = Logger()
+
+
+class TestTableHealthMonitor(unittest.TestCase):
+
+    @mock_dynamodb
+    def test_helper_put_item_without_exception(self):
+        dynamodb_client = boto3.client('dynamodb')
+        dynamodb_client.create_table(
+            TableName='sample_table',
+            KeySchema=[
+                {
+                    'AttributeName': 'tableKey',
+                    'KeyType': 'HASH'
+                },
+                {
+                    'AttributeName': 'capturedAt',
+                    'KeyType': 'RANGE'
+                },
+            ],
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'tableKey',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'capturedAt',
+                    'AttributeType': 'S'
+                },
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        dynamodb = boto3.resource('dynamodb')
+        dynamodb_helper = DynamoDBHelper(dynamodb=dynamodb, logger=logger)
+        assert dynamodb_helper.put_item(
+            table_name='sample_table',
+            item={
+                'tableKey': 'x.y',
+                'capturedAt': '2023-01-01T00:00:00'
+            }
+        ) is True
+
+    @mock_dynamodb
+    def test_helper_put_item_with_exception(self):
+        dynamodb = boto3.resource('dynamodb')
+        dynamodb_helper = DynamoDBHelper(dynamodb=dynamodb, logger=logger)
+        assert dynamodb_helper.put_item(
+            table_name='sample_table',
+            item={
+                'tableKey': 'x.y'
+            }
+        ) is None
+
+    def test_get_recommended_actions(self):
+        table_health = TableHealthService(redshift=None, redshift_params={}, logger=logger)
+        actions = table_health.get_recommended_actions({
+            "skewRows": 5.5,
+            "unsortedPct": 10.0,
+            "statsOff": 25.0
+        })
+        assert [action.get("action") for action in actions] == [
+            "Change the distribution key or use DISTSTYLE EVEN",
+            "ANALYZE"
+        ]
+
+    def test_get_recommended_actions_healthy_table(self):
+        table_health = TableHealthService(redshift=None, redshift_params={}, logger=logger)
+        assert table_health.get_recommended_actions({
+            "skewRows": 1.0,
+            "unsortedPct": 0.0,
+            "statsOff": 0.0
+        }) == []
+
+    def test_get_recommended_actions_zero_thresholds(self):
+        table_health = TableHealthService(
+            redshift=None,
+            redshift_params={},
+            thresholds={"skew_rows": 0, "unsorted_pct": 0, "stats_off": 0},
+            logger=logger
+        )
+        assert len(table_health.get_recommended_actions({
+            "skewRows": 1.0,
+            "unsortedPct": 0.5,
+            "statsOff": 0.5
+        })) == 3
+
+    @patch('lambdas.table_health_monitor.services.table_health_service.RedshiftHelper.run_query')
+    def test_monitor_tables_health_query_unsuccessful(self, run_query):
+        run_query.return_value = None
+        table_health = TableHealthService(redshift=None, redshift_params={}, logger=logger)
+        assert table_health.monitor_tables(schema_name="sales", table_names=["orders"]) == -1
+
+    @patch('lambdas.table_health_monitor.services.table_health_service.DynamoDBHelper.put_item')
+    @patch('lambdas.table_health_monitor.services.table_health_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.table_health_monitor.services.table_health_service.RedshiftHelper.run_query')
+    def test_monitor_tables_record_unsuccessful(self, run_query, get_query_results, put_item):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [
+            [{"stringValue": "orders"}, {"longValue": 10}, {"stringValue": "1.00"}, {"stringValue": "0.00"},
+             {"stringValue": "0.00"}, {"longValue": 5}]
+        ]
+        put_item.return_value = None
+        table_health = TableHealthService(redshift=None, redshift_params={}, logger=logger)
+        assert table_health.monitor_tables(schema_name="sales", table_names=["orders"]) == -2
+
+    @patch('lambdas.table_health_monitor.services.table_health_service.DynamoDBHelper.put_item')
+    @patch('lambdas.table_health_monitor.services.table_health_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.table_health_monitor.services.table_health_service.RedshiftHelper.run_query')
+    def test_monitor_tables_successful(self, run_query, get_query_results, put_item):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [
+            [{"stringValue": "orders"}, {"longValue": 10}, {"stringValue": "1.00"}, {"stringValue": "45.00"},
+             {"stringValue": "0.00"}, {"longValue": 5}],
+            [{"stringValue": "customers"}, {"longValue": 10}, {"isNull": True}, {"stringValue": "0.00"},
+             {"stringValue": "0.00"}, {"longValue": 5}]
+        ]
+        put_item.return_value = True
+        table_health = TableHealthService(redshift=None, redshift_params={}, logger=logger)
+        response = table_health.monitor_tables(schema_name="sales", table_names=["orders", "customers"])
+        assert response == [{
+            "tableName": "orders",
+            "actions": [{"metric": "unsortedPct", "value": 45.0, "action": "VACUUM SORT ONLY"}]
+        }]
+        assert put_item.call_count == 2
+        assert "'orders','customers'" in run_query.call_args.kwargs.get("query")
+
+    def test_lambda_handler_no_input(self):
+        expected_output = {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+        assert lambda_handler(event={}, context=None) == expected_output
+
+    def test_lambda_handler_no_loaded_tables(self):
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'flaggedTables': []
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch('lambdas.table_health_monitor.lambda_function.TableHealthService.monitor_tables')
+    def test_lambda_handler_health_query_unsuccessful(self, monitor_tables):
+        monitor_tables.return_value = -1
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting table health')
+        }
+        assert lambda_handler(event={"input": {}, "loadedTables": ["orders"]}, context=None) == expected_output
+
+    @patch('lambdas.table_health_monitor.lambda_function.TableHealthService.monitor_tables')
+    def test_lambda_handler_success(self, monitor_tables):
+        monitor_tables.return_value = []
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'flaggedTables': []
+        }
+        assert lambda_handler(event={"input": {}, "loadedTables": ["orders"]}, context=None) == expected_output
@@ -0,0 +1,127 @@
+import json
+import unittest
+from unittest.mock import patch
+from aws_lambda_powertools import Logger
+
+from lambdas.table_maintenance.services.maintenance_service import MaintenanceService
+from lambdas.table_maintenance.lambda_function import lambda_handler
+
+logger = Logger()
+
+statistics = [
+    {
+        "tableName": "orders",
+        "deletedPct": 30.0,
+        "unsortedPct": 50.0,
+        "statsOff": 0.0,
+        "sizeMb": 1000
+    },
+    {
+        "tableName": "customers",
+        "deletedPct": 0.0,
+        "unsortedPct": 0.0,
+        "statsOff": 40.0,
+        "sizeMb": 100
+    },
+    {
+        "tableName": "cards",
+        "deletedPct": 1.0,
+        "unsortedPct": 2.0,
+        "statsOff": 3.0,
+        "sizeMb": 100
+    }
+]
+
+
+class TestTableMaintenance(unittest.TestCase):
+
+    def test_plan_maintenance(self):
+        maintenance = MaintenanceService(redshift=None, redshift_params={}, logger=logger)
+        tasks = maintenance.plan_maintenance("sales", statistics)
+        assert [(task.get("tableName"), task.get("query")) for task in tasks] == [
+            ("orders", "VACUUM SORT ONLY sales.orders;"),
+            ("orders", "VACUUM DELETE ONLY sales.orders;"),
+            ("customers", "ANALYZE sales.customers PREDICATE COLUMNS;")
+        ]
+        assert tasks[0].get("estimatedSeconds") == 10
+
+    def test_plan_maintenance_zero_thresholds(self):
+        maintenance = MaintenanceService(
+            redshift=None,
+            redshift_params={},
+            thresholds={"unsorted_pct": 0, "deleted_pct": 0, "stats_off": 0},
+            logger=logger
+        )
+        tasks = maintenance.plan_maintenance("sales", [
+            {"tableName": "orders", "unsortedPct": 0.5, "deletedPct": 0.5, "statsOff": 0.5, "sizeMb": 100}
+        ])
+        assert len(tasks) == 3
+
+    @patch('lambdas.table_maintenance.services.maintenance_service.RedshiftHelper.get_query_results')
+    @patch('lambdas.table_maintenance.services.maintenance_service.RedshiftHelper.run_query')
+    def test_get_table_statistics(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [
+            [{"stringValue": "orders"}, {"longValue": 100}, {"longValue": 75}, {"stringValue": "12.50"},
+             {"isNull": True}, {"longValue": 20}]
+        ]
+        maintenance = MaintenanceService(redshift=None, redshift_params={}, logger=logger)
+        assert maintenance.get_table_statistics("sales", ["orders"]) == [{
+            "tableName": "orders",
+            "deletedPct": 25.0,
+            "unsortedPct": 12.5,
+            "statsOff": 0,
+            "sizeMb": 20
+        }]
+
+    @patch('lambdas.table_maintenance.services.maintenance_service.RedshiftHelper.run_query')
+    def test_run_maintenance_statistics_unsuccessful(self, run_query):
+        run_query.return_value = None
+        maintenance = MaintenanceService(redshift=None, redshift_params={}, logger=logger)
+        assert maintenance.run_maintenance(schema_name="sales", table_names=["orders"], time_budget=60) == -1
+
+    @patch('lambdas.table_maintenance.services.maintenance_service.RedshiftHelper.run_query')
+    @patch.object(MaintenanceService, 'get_table_statistics')
+    def test_run_maintenance_within_budget(self, get_table_statistics, run_query):
+        get_table_statistics.return_value = statistics
+        run_query.side_effect = ["query_id", None]
+        maintenance = MaintenanceService(redshift=None, redshift_params={}, logger=logger)
+        response = maintenance.run_maintenance(schema_name="sales", table_names=["orders"], time_budget=8)
+        assert response == {
+            "completed": [{"tableName": "orders", "operation": "VACUUM DELETE ONLY"}],
+            "failed": [{"tableName": "customers", "operation": "ANALYZE PREDICATE COLUMNS"}],
+            "deferred": [{"tableName": "orders", "operation": "VACUUM SORT ONLY"}]
+        }
+
+    def test_lambda_handler_no_input(self):
+        expected_output = {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }
+        assert lambda_handler(event={}, context=None) == expected_output
+
+    def test_lambda_handler_no_loaded_tables(self):
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS"
+        }
+        assert lambda_handler(event={"input": {}}, context=None) == expected_output
+
+    @patch('lambdas.table_maintenance.lambda_function.MaintenanceService.run_maintenance')
+    def test_lambda_handler_statistics_unsuccessful(self, run_maintenance):
+        run_maintenance.return_value = -1
+        expected_output = {
+            'statusCode': 500,
+            'message': json.dumps('Error in getting table statistics')
+        }
+        assert lambda_handler(event={"input": {}, "loadedTables": ["orders"]}, context=None) == expected_output
+
+    @patch('lambdas.table_maintenance.lambda_function.MaintenanceService.run_maintenance')
+    def test_lambda_handler_success(self, run_maintenance):
+        run_maintenance.return_value = {"completed": [], "failed": [], "deferred": []}
+        expected_output = {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            'maintenance': {"completed": [], "failed": [], "deferred": []}
+        }
+        assert lambda_handler(event={"input": {}, "loadedTables": ["orders"]}, context=None) == expected_output
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch
+from aws_lambda_powertools import Logger
+
+from lambdas.wlm_gate.helpers.wlm_helper import WLMHelper
+from lambdas.wlm_gate.services.wlm_gate_service import WLMGateService
+from lambdas.wlm_gate.lambda_function import lambda_handler
+
+logger = Logger()
+
+
+def get_wlm_gate_service():
+    return WLMGateService(
+        redshift=None,
+        redshift_params={},
+        gate_params={
+            "max_queued": 2,
+            "max_queue_seconds": 60,
+            "wait_seconds": 30,
+            "max_wait_seconds": 300,
+            "max_attempts": 3,
+            "min_concurrency": 2,
+            "max_concurrency": 10
+        },
+        logger=logger
+    )
+
+
+class TestWLMGate(unittest.TestCase):
+
+    @patch('lambdas.wlm_gate.helpers.wlm_helper.RedshiftHelper.get_query_results')
+    @patch('lambdas.wlm_gate.helpers.wlm_helper.RedshiftHelper.run_query')
+    def test_helper_get_queue_state(self, run_query, get_query_results):
+        run_query.return_value = "query_id"
+        get_query_results.return_value = [[{"longValue": 3}, {"longValue": 5}, {"longValue": 12500000}]]
+        assert WLMHelper(redshift=None, logger=logger).get_queue_state() == {
+            "queuedQueries": 3,
+            "runningQueries": 5,
+            "longestQueueSeconds": 12
+        }
+        assert "stv_wlm_service_class_state" in run_query.call_args.kwargs.get("query")
+        assert "stv_wlm_query_state" in run_query.call_args.kwargs.get("query")
+        assert "txn_owner = current_user" in run_query.call_args.kwargs.get("query")
+
+    @patch('lambdas.wlm_gate.helpers.wlm_helper.RedshiftHelper.run_query')
+    def test_helper_get_queue_state_unsuccessful(self, run_query):
+        run_query.return_value = None
+        assert WLMHelper(redshift=None, logger=logger).get_queue_state() is None
+
+    def test_helper_get_fan_out_width(self):
+        assert WLMHelper.get_fan_out_width({"queuedQueries": 0, "longestQueueSeconds": 0}, 2, 10, 60) == 10
+        assert WLMHelper.get_fan_out_width({"queuedQueries": 3, "longestQueueSeconds": 5}, 2, 10, 60) == 7
+        assert WLMHelper.get_fan_out_width({"queuedQueries": 20, "longestQueueSeconds": 5}, 2, 10, 60) == 2
+        assert WLMHelper.get_fan_out_width({"queuedQueries": 1, "longestQueueSeconds": 90}, 2, 10, 60) == 2
+        assert WLMHelper.get_fan_out_width(None, 2, 10, 60) == 10
+
+    @patch('lambdas.wlm_gate.services.wlm_gate_service.WLMHelper.get_queue_state')
+    def test_check_queue_state_quiet_cluster(self, get_queue_state):
+        get_queue_state.return_value = {"queuedQueries": 1, "runningQueries": 4, "longestQueueSeconds": 2}
+        assert get_wlm_gate_service().check_queue_state() == {
+            "proceed": True,
+            "gateAttempt": 0,
+            "waitSeconds": 0,
+            "maxConcurrency": 9,
+            "queueState": {"queuedQueries": 1, "runningQueries": 4, "longestQueueSeconds": 2}
+        }
+
+    @patch('lambdas.wlm_gate.services.wlm_gate_service.WLMHelper.get_queue_state')
+    def test_check_queue_state_busy_cluster(self, get_queue_state):
+        get_queue_state.return_value = {"queuedQueries": 6, "runningQueries": 15, "longestQueueSeconds": 20}
+        response = get_wlm_gate_service().check_queue_state(attempt=1)
+        assert response.get("proceed") is False
+        assert response.get("gateAttempt") == 2
+        assert response.get("waitSeconds") == 60
+        assert response.get("maxConcurrency") == 4
+        assert get_wlm_gate_service().check_queue_state(attempt=3).get("proceed") is True
+
+    def test_max_queued_default(self):
+        assert WLMGateService(redshift=None, redshift_params={}, gate_params={}, logger=logger).max_queued == 2
+        assert WLMGateService(redshift=None, redshift_params={}, gate_params={"max_queued": 0},
+                              logger=logger).max_queued == 0
+
+    @patch('lambdas.wlm_gate.services.wlm_gate_service.WLMHelper.get_queue_state')
+    def test_check_queue_state_unavailable(self, get_queue_state):
+        get_queue_state.return_value = None
+        response = get_wlm_gate_service().check_queue_state()
+        assert response.get("proceed") is True
+        assert response.get("maxConcurrency") == 10
+
+    @patch('lambdas.wlm_gate.lambda_function.WLMGateService.check_queue_state')
+    def test_lambda_handler(self, check_queue_state):
+        check_queue_state.return_value = {"proceed": False, "gateAttempt": 1, "waitSeconds": 30}
+        response = lambda_handler({"input": {"databaseName": "sales", "tableName": "orders"}}, None)
+        assert response == {
+            'statusCode': 200,
+            'message': "SUCCESS",
+            "proceed": False,
+            "gateAttempt": 1,
+            "waitSeconds": 30
+        }
+        assert check_queue_state.call_args.kwargs.get("attempt") == 0
+
+    def test_lambda_handler_no_input(self):
+        assert lambda_handler({}, None) == {
+            "statusCode": 500,
+            "message": "Exception encountered in lambda function"
+        }